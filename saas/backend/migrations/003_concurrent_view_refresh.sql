@@ -0,0 +1,89 @@
+-- Migration: Refresh analytics materialized views without blocking reads
+--
+-- PREREQUISITES:
+-- 1. Migration 002 must be run first (recreates the views with tenant_id)
+--
+-- This migration:
+-- 1. Creates the daily_reactions view (and its secure wrapper) if missing
+-- 2. Adds unique indexes over each view's grouping keys
+-- 3. Switches refresh_analytics_views() to REFRESH ... CONCURRENTLY
+-- 4. Schedules the refresh with pg_cron when the extension is installed,
+--    so it runs outside the sync and API request paths
+
+-- ============================================================================
+-- CREATE daily_reactions (added to schema.sql after migration 002)
+-- ============================================================================
+
+-- Daily reactions between users, per emoji (self-reactions excluded)
+CREATE MATERIALIZED VIEW IF NOT EXISTS daily_reactions AS
+SELECT
+    m.tenant_id,
+    date_trunc('day', r.reacted_at) AS day,
+    m.server_id,
+    r.user_id AS reactor_id,
+    m.author_id,
+    r.emoji_id,
+    COUNT(*) AS reaction_count
+FROM reactions r
+JOIN messages m ON r.message_id = m.id
+WHERE r.user_id != m.author_id
+GROUP BY m.tenant_id, 2, 3, 4, 5, 6;
+
+CREATE INDEX IF NOT EXISTS idx_daily_reactions_tenant ON daily_reactions(tenant_id);
+CREATE INDEX IF NOT EXISTS idx_daily_reactions_server_day ON daily_reactions(server_id, day);
+
+CREATE OR REPLACE VIEW daily_reactions_secure AS
+SELECT * FROM daily_reactions
+WHERE tenant_id = current_setting('app.current_tenant', TRUE);
+
+-- ============================================================================
+-- UNIQUE INDEXES (required by REFRESH MATERIALIZED VIEW CONCURRENTLY)
+-- ============================================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_interactions_key
+    ON user_interactions(tenant_id, from_user_id, to_user_id, server_id, interaction_type);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_stats_key
+    ON daily_stats(tenant_id, day, server_id, channel_id, author_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_reactions_key
+    ON daily_reactions(tenant_id, day, server_id, reactor_id, author_id, emoji_id);
+
+-- ============================================================================
+-- UPDATE refresh_analytics_views FUNCTION
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION refresh_analytics_views()
+RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY user_interactions;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY daily_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY daily_reactions;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- SCHEDULE THE REFRESH (pg_cron, if available)
+-- ============================================================================
+
+-- cron.schedule replaces an existing job of the same name, so this is
+-- safe to re-run. Without pg_cron, call refresh_analytics_views() from an
+-- external scheduler instead.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule(
+            'refresh-analytics-views',
+            '*/15 * * * *',
+            'SELECT refresh_analytics_views()'
+        );
+    END IF;
+END;
+$$;
+
+-- ============================================================================
+-- VERIFICATION QUERIES (run manually)
+-- ============================================================================
+
+-- To check the scheduled job:
+-- SELECT jobname, schedule, command FROM cron.job;
@@ -0,0 +1,66 @@
+-- Migration: Add the per-message derived columns the ingest path writes
+--
+-- PREREQUISITES:
+-- 1. Migration 001 must be run first (adds tenant_id columns)
+--
+-- This migration:
+-- 1. Adds created_hour and the laugh/link count columns to messages
+-- 2. Backfills them (and char_count) for rows stored before they existed
+-- 3. Indexes messages by (author_id, created_hour)
+--
+-- insert_message and copy_messages write every one of these columns, so
+-- run this before deploying an extractor that includes them.
+
+-- ============================================================================
+-- ADD COLUMNS
+-- ============================================================================
+
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS created_hour INTEGER,
+    ADD COLUMN IF NOT EXISTS lol_count INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS lmao_count INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS haha_count INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS hehe_count INTEGER DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS link_count INTEGER DEFAULT 0;
+
+-- ============================================================================
+-- BACKFILL EXISTING ROWS
+-- ============================================================================
+
+-- Same counting as insert_message: occurrences in the lower-cased content
+-- for laughs, and http:// plus https:// prefixes for links. Hours are UTC.
+-- RLS is forced on messages (migration 002), which would hide every row
+-- from the table owner, so lift it for the backfill only. One transaction,
+-- so a failed backfill can't leave RLS un-forced.
+BEGIN;
+
+ALTER TABLE messages NO FORCE ROW LEVEL SECURITY;
+
+UPDATE messages
+SET
+    created_hour = EXTRACT(HOUR FROM created_at AT TIME ZONE 'UTC')::INTEGER,
+    char_count = COALESCE(char_count, LENGTH(COALESCE(content, ''))),
+    lol_count = (LENGTH(LOWER(COALESCE(content, ''))) - LENGTH(REPLACE(LOWER(COALESCE(content, '')), 'lol', ''))) / 3,
+    lmao_count = (LENGTH(LOWER(COALESCE(content, ''))) - LENGTH(REPLACE(LOWER(COALESCE(content, '')), 'lmao', ''))) / 4,
+    haha_count = (LENGTH(LOWER(COALESCE(content, ''))) - LENGTH(REPLACE(LOWER(COALESCE(content, '')), 'haha', ''))) / 4,
+    hehe_count = (LENGTH(LOWER(COALESCE(content, ''))) - LENGTH(REPLACE(LOWER(COALESCE(content, '')), 'hehe', ''))) / 4,
+    link_count = (LENGTH(COALESCE(content, '')) - LENGTH(REPLACE(COALESCE(content, ''), 'http://', ''))) / 7
+        + (LENGTH(COALESCE(content, '')) - LENGTH(REPLACE(COALESCE(content, ''), 'https://', ''))) / 8
+WHERE created_hour IS NULL;
+
+ALTER TABLE messages FORCE ROW LEVEL SECURITY;
+
+COMMIT;
+
+-- ============================================================================
+-- INDEXES
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_messages_author_hour ON messages(author_id, created_hour);
+
+-- ============================================================================
+-- VERIFICATION QUERIES (run manually)
+-- ============================================================================
+
+-- Should return 0:
+-- SELECT COUNT(*) FROM messages WHERE created_hour IS NULL;
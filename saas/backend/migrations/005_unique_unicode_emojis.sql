@@ -0,0 +1,64 @@
+-- Migration: Make unicode emojis unique per tenant
+--
+-- PREREQUISITES:
+-- 1. Migration 002 must be run first (tenant_id NOT NULL, RLS enabled)
+--
+-- UNIQUE(tenant_id, name, server_id) never matches unicode emojis, since
+-- their server_id is NULL and NULLs never collide. Emoji upserts target a
+-- partial unique index on (tenant_id, name) WHERE server_id IS NULL
+-- instead, so this migration:
+-- 1. Merges duplicate unicode emoji rows into the lowest id per name,
+--    moving their reactions over
+-- 2. Creates idx_emojis_unicode_name
+
+BEGIN;
+
+-- RLS is forced on both tables (migration 002), which would hide every
+-- row from the table owner; lift it while rows are merged.
+ALTER TABLE emojis NO FORCE ROW LEVEL SECURITY;
+ALTER TABLE reactions NO FORCE ROW LEVEL SECURITY;
+
+-- ============================================================================
+-- MERGE DUPLICATE UNICODE EMOJIS
+-- ============================================================================
+
+CREATE TEMP TABLE emoji_duplicates ON COMMIT DROP AS
+SELECT id, keep_id FROM (
+    SELECT id, MIN(id) OVER (PARTITION BY tenant_id, name) AS keep_id
+    FROM emojis
+    WHERE server_id IS NULL
+) ranked
+WHERE id != keep_id;
+
+-- Re-point reactions at the kept emoji; a user's reaction that already
+-- exists there is kept as is
+INSERT INTO reactions (message_id, emoji_id, user_id, tenant_id, reacted_at, is_super_reaction)
+SELECT r.message_id, d.keep_id, r.user_id, r.tenant_id, r.reacted_at, r.is_super_reaction
+FROM reactions r
+JOIN emoji_duplicates d ON r.emoji_id = d.id
+ON CONFLICT DO NOTHING;
+
+-- Reactions on the duplicates go with them (ON DELETE CASCADE)
+DELETE FROM emojis e
+USING emoji_duplicates d
+WHERE e.id = d.id;
+
+ALTER TABLE emojis FORCE ROW LEVEL SECURITY;
+ALTER TABLE reactions FORCE ROW LEVEL SECURITY;
+
+-- ============================================================================
+-- UNIQUE INDEX
+-- ============================================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_emojis_unicode_name
+    ON emojis(tenant_id, name) WHERE server_id IS NULL;
+
+COMMIT;
+
+-- ============================================================================
+-- VERIFICATION QUERIES (run manually)
+-- ============================================================================
+
+-- Should return no rows:
+-- SELECT tenant_id, name, COUNT(*) FROM emojis
+-- WHERE server_id IS NULL GROUP BY tenant_id, name HAVING COUNT(*) > 1;
@@ -102,7 +102,13 @@ CREATE TABLE IF NOT EXISTS messages (
     has_poll BOOLEAN DEFAULT FALSE,
 
     word_count INTEGER,
-    char_count INTEGER
+    char_count INTEGER,
+    created_hour INTEGER,
+    lol_count INTEGER DEFAULT 0,
+    lmao_count INTEGER DEFAULT 0,
+    haha_count INTEGER DEFAULT 0,
+    hehe_count INTEGER DEFAULT 0,
+    link_count INTEGER DEFAULT 0
 );
 
 CREATE INDEX IF NOT EXISTS idx_messages_tenant ON messages(tenant_id);
@@ -111,6 +117,7 @@ CREATE INDEX IF NOT EXISTS idx_messages_tenant_author_time ON messages(tenant_id
 CREATE INDEX IF NOT EXISTS idx_messages_tenant_server_time ON messages(tenant_id, server_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_channel_time ON messages(channel_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_author_time ON messages(author_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_messages_author_hour ON messages(author_id, created_hour);
 CREATE INDEX IF NOT EXISTS idx_messages_server_time ON messages(server_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_reply_to ON messages(reply_to_message_id) WHERE reply_to_message_id IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_messages_reply_author ON messages(reply_to_author_id) WHERE reply_to_author_id IS NOT NULL;
@@ -128,7 +135,7 @@ CREATE TABLE IF NOT EXISTS message_mentions (
 );
 
 CREATE INDEX IF NOT EXISTS idx_mentions_tenant ON message_mentions(tenant_id);
-CREATE INDEX IF NOT EXISTS idx_mentions_user ON message_mentions(mentioned_user_id);
+CREATE INDEX IF NOT EXISTS idx_mentions_user ON message_mentions(mentioned_user_id, message_id);
 
 -- ============================================================================
 -- EMOJIS AND REACTIONS
@@ -146,6 +153,8 @@ CREATE TABLE IF NOT EXISTS emojis (
 );
 
 CREATE INDEX IF NOT EXISTS idx_emojis_tenant ON emojis(tenant_id);
+-- NULLs never collide in UNIQUE, so unicode emojis are unique by name
+CREATE UNIQUE INDEX IF NOT EXISTS idx_emojis_unicode_name ON emojis(tenant_id, name) WHERE server_id IS NULL;
 
 CREATE TABLE IF NOT EXISTS reactions (
     message_id BIGINT REFERENCES messages(id) ON DELETE CASCADE,
@@ -302,6 +311,9 @@ JOIN message_mentions mm ON m.id = mm.message_id
 WHERE m.author_id != mm.mentioned_user_id
 GROUP BY m.tenant_id, m.author_id, mm.mentioned_user_id, m.server_id;
 
+-- Unique over the grouping keys so the view can be refreshed CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_interactions_key
+    ON user_interactions(tenant_id, from_user_id, to_user_id, server_id, interaction_type);
 CREATE INDEX IF NOT EXISTS idx_user_interactions_tenant ON user_interactions(tenant_id);
 CREATE INDEX IF NOT EXISTS idx_user_interactions_from ON user_interactions(from_user_id);
 CREATE INDEX IF NOT EXISTS idx_user_interactions_to ON user_interactions(to_user_id);
@@ -323,11 +335,33 @@ SELECT
 FROM messages m
 GROUP BY m.tenant_id, 1, 2, 3, 4;
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_stats_key
+    ON daily_stats(tenant_id, day, server_id, channel_id, author_id);
 CREATE INDEX IF NOT EXISTS idx_daily_stats_tenant ON daily_stats(tenant_id);
 CREATE INDEX IF NOT EXISTS idx_daily_stats_day ON daily_stats(day);
 CREATE INDEX IF NOT EXISTS idx_daily_stats_author ON daily_stats(author_id);
 CREATE INDEX IF NOT EXISTS idx_daily_stats_server ON daily_stats(server_id);
 
+-- Daily reactions between users, per emoji (self-reactions excluded)
+CREATE MATERIALIZED VIEW IF NOT EXISTS daily_reactions AS
+SELECT
+    m.tenant_id,
+    date_trunc('day', r.reacted_at) AS day,
+    m.server_id,
+    r.user_id AS reactor_id,
+    m.author_id,
+    r.emoji_id,
+    COUNT(*) AS reaction_count
+FROM reactions r
+JOIN messages m ON r.message_id = m.id
+WHERE r.user_id != m.author_id
+GROUP BY m.tenant_id, 2, 3, 4, 5, 6;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_reactions_key
+    ON daily_reactions(tenant_id, day, server_id, reactor_id, author_id, emoji_id);
+CREATE INDEX IF NOT EXISTS idx_daily_reactions_tenant ON daily_reactions(tenant_id);
+CREATE INDEX IF NOT EXISTS idx_daily_reactions_server_day ON daily_reactions(server_id, day);
+
 -- ============================================================================
 -- SECURE VIEWS FOR MATERIALIZED VIEWS
 -- Materialized views don't support RLS, so wrap them in views that filter
@@ -341,19 +375,40 @@ CREATE OR REPLACE VIEW daily_stats_secure AS
 SELECT * FROM daily_stats
 WHERE tenant_id = current_setting('app.current_tenant', TRUE);
 
+CREATE OR REPLACE VIEW daily_reactions_secure AS
+SELECT * FROM daily_reactions
+WHERE tenant_id = current_setting('app.current_tenant', TRUE);
+
 -- ============================================================================
 -- HELPER FUNCTIONS
 -- ============================================================================
 
--- Function to refresh all materialized views
+-- Function to refresh all materialized views. CONCURRENTLY (backed by the
+-- unique key indexes) keeps them readable while they are rebuilt.
 CREATE OR REPLACE FUNCTION refresh_analytics_views()
 RETURNS void AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW user_interactions;
-    REFRESH MATERIALIZED VIEW daily_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY user_interactions;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY daily_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY daily_reactions;
 END;
 $$ LANGUAGE plpgsql;
 
+-- Refresh the views every 15 minutes when pg_cron is installed, keeping the
+-- rebuild out of the sync and request paths. Without pg_cron, run
+-- refresh_analytics_views() from an external scheduler.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule(
+            'refresh-analytics-views',
+            '*/15 * * * *',
+            'SELECT refresh_analytics_views()'
+        );
+    END IF;
+END;
+$$;
+
 -- Function to extract timestamp from Discord snowflake
 CREATE OR REPLACE FUNCTION snowflake_to_timestamp(snowflake BIGINT)
 RETURNS TIMESTAMPTZ AS $$
@@ -36,6 +36,7 @@ from src.db.queries import (
     insert_mention,
     upsert_emoji,
     insert_reaction,
+    refresh_year_stats,
 )
 from scripts.run_simulation import get_sqlite_schema
 
@@ -137,6 +138,9 @@ class YearExtractor:
             # 3. Sync channels with delays
             await self._sync_channels_with_delay(session, guild)
 
+            # 4. Refresh the precomputed stats the year-end report reads
+            refresh_year_stats(session, guild.id)
+
             session.commit()
         except Exception as e:
             session.rollback()
@@ -102,7 +102,13 @@ def get_sqlite_schema():
             embed_count INTEGER DEFAULT 0,
             has_poll INTEGER DEFAULT 0,
             word_count INTEGER,
-            char_count INTEGER
+            char_count INTEGER,
+            created_hour INTEGER,
+            lol_count INTEGER DEFAULT 0,
+            lmao_count INTEGER DEFAULT 0,
+            haha_count INTEGER DEFAULT 0,
+            hehe_count INTEGER DEFAULT 0,
+            link_count INTEGER DEFAULT 0
         );
 
         CREATE TABLE IF NOT EXISTS message_mentions (
@@ -121,6 +127,8 @@ def get_sqlite_schema():
             UNIQUE(name, server_id)
         );
 
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_emojis_unicode_name ON emojis(name) WHERE server_id IS NULL;
+
         CREATE TABLE IF NOT EXISTS reactions (
             message_id INTEGER REFERENCES messages(id) ON DELETE CASCADE,
             emoji_id INTEGER REFERENCES emojis(id) ON DELETE CASCADE,
@@ -130,6 +138,34 @@ def get_sqlite_schema():
             PRIMARY KEY (message_id, emoji_id, user_id)
         );
 
+        CREATE TABLE IF NOT EXISTS user_year_stats (
+            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            total_msgs INTEGER NOT NULL DEFAULT 0,
+            longest_msg INTEGER NOT NULL DEFAULT 0,
+            questions_asked INTEGER NOT NULL DEFAULT 0,
+            late_night INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (server_id, user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS channel_year_stats (
+            channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            server_id INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+            msgs INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (channel_id, user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS pair_year_stats (
+            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+            user_lo INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            user_hi INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            lo_to_hi INTEGER NOT NULL DEFAULT 0,
+            hi_to_lo INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (server_id, user_lo, user_hi)
+        );
+
         CREATE TABLE IF NOT EXISTS sync_state (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
@@ -147,11 +183,12 @@ def get_sqlite_schema():
 
         CREATE INDEX IF NOT EXISTS idx_messages_channel_time ON messages(channel_id, created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_messages_author_time ON messages(author_id, created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_messages_author_hour ON messages(author_id, created_hour);
         CREATE INDEX IF NOT EXISTS idx_messages_server_time ON messages(server_id, created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_messages_reply_author ON messages(reply_to_author_id);
         CREATE INDEX IF NOT EXISTS idx_reactions_user ON reactions(user_id);
         CREATE INDEX IF NOT EXISTS idx_reactions_message ON reactions(message_id);
-        CREATE INDEX IF NOT EXISTS idx_mentions_user ON message_mentions(mentioned_user_id);
+        CREATE INDEX IF NOT EXISTS idx_mentions_user ON message_mentions(mentioned_user_id, message_id);
     """
 
 
@@ -10,17 +10,30 @@ Usage:
 import argparse
 import os
 import sys
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from collections import defaultdict
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 
 # Configuration
 DEFAULT_DB = "discord_year.db"
 OUTPUT_FILE = "year_end_review_2024.txt"
 
+# Static part of the report footer, encoded once at import
+FOOTER_BANNER = """
+################################################################################
+#                                                                              #
+#                         END OF YEAR-END REVIEW                               #
+#                                                                              #
+################################################################################
+
+"""
+FOOTER_BANNER_BYTES = FOOTER_BANNER.encode('utf-8')
+
 
 def run_query(conn, query, params=None):
     """Execute a query and return results as a list of dicts."""
@@ -29,16 +42,60 @@ def run_query(conn, query, params=None):
     return [dict(zip(columns, row)) for row in result]
 
 
+def hour_expression(conn):
+    """SQL for a message's hour of day, on messages aliased as m."""
+    strftime_hour = "CAST(strftime('%H', m.created_at) AS INTEGER)"
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(messages)"))}
+    if "created_hour" not in columns:
+        return strftime_hour
+    return f"COALESCE(m.created_hour, {strftime_hour})"
+
+
 def format_section(title, content):
     """Format a section with title and content."""
     return f"\n{'='*60}\n{title}\n{'='*60}\n{content}\n"
 
 
+@contextmanager
+def replace_on_success(output_file):
+    """
+    Open a temp file to write output_file through.
+
+    The temp file replaces output_file if the block completes, and is
+    deleted if it raises.
+    """
+    tmp_file = output_file + ".tmp"
+    out = open(tmp_file, 'wb')
+    try:
+        with out:
+            yield out
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+    os.replace(tmp_file, output_file)
+
+
 def generate_report(engine, output_file):
-    """Generate the complete year-end review report."""
-    report = []
+    """
+    Generate the complete year-end review report.
+
+    Returns:
+        The report text, as written to output_file
+    """
+    # Sections go to a temp file (swapped in at the end, so a crash never
+    # leaves a half-written report behind) and to stdout as soon as each
+    # one is ready, instead of holding the whole report in memory.
+    with engine.connect() as conn, replace_on_success(output_file) as out:
+        def emit(fragment):
+            fragment += "\n"
+            out.write(fragment.encode('utf-8'))
+            sys.stdout.write(fragment)
+
+        # Hour-of-day predicates read the stored created_hour column. The
+        # report never writes to the database, so older ones without the
+        # column (or rows not yet backfilled) fall back to the timestamp.
+        hour = hour_expression(conn)
 
-    with engine.connect() as conn:
         # =====================================================================
         # HEADER
         # =====================================================================
@@ -46,7 +103,7 @@ def generate_report(engine, output_file):
         server_name = server[0]['name'] if server else "Unknown Server"
         member_count = server[0]['member_count'] if server else 0
 
-        report.append(f"""
+        emit(f"""
 ################################################################################
 #                                                                              #
 #                    {server_name.upper()} - YEAR IN REVIEW 2024                    #
@@ -87,7 +144,7 @@ Total Replies: {stats['total_replies']:,}
 
 Date Range: {date_range['first_msg']} to {date_range['last_msg']}
 """
-        report.append(format_section("THE BIG NUMBERS", content))
+        emit(format_section("THE BIG NUMBERS", content))
 
         # =====================================================================
         # SECTION 2: TOP MESSAGERS
@@ -110,7 +167,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, user in enumerate(top_users, 1):
             content += f"{i:2}.   {user['display_name']:<28} {user['message_count']:>8,}    {user['pct']:>5.1f}%\n"
 
-        report.append(format_section("TOP 10 MESSAGERS", content))
+        emit(format_section("TOP 10 MESSAGERS", content))
 
         # =====================================================================
         # SECTION 3: CHANNEL LEADERBOARD
@@ -132,7 +189,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for ch in channel_stats[:10]:
             content += f"#{ch['name']:<20} {ch['message_count']:>8,}    {ch['unique_users']:>5}    {ch['pct']:>5.1f}%\n"
 
-        report.append(format_section("CHANNEL LEADERBOARD", content))
+        emit(format_section("CHANNEL LEADERBOARD", content))
 
         # =====================================================================
         # SECTION 4: BEST FRIENDS (Most Back-and-Forth)
@@ -178,7 +235,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
             pair_name = f"{pair['user_1']} <-> {pair['user_2']}"
             content += f"{i:2}.   {pair_name:<40} {pair['exchanges']:>8}\n"
 
-        report.append(format_section("BEST FRIENDS (Most Reply Exchanges)", content))
+        emit(format_section("BEST FRIENDS (Most Reply Exchanges)", content))
 
         # =====================================================================
         # SECTION 5: MOST REPLIED-TO USERS
@@ -202,7 +259,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, user in enumerate(most_replied, 1):
             content += f"{i:2}.   {user['username']:<28} {user['times_replied_to']:>10,}\n"
 
-        report.append(format_section("MOST REPLIED-TO USERS", content))
+        emit(format_section("MOST REPLIED-TO USERS", content))
 
         # =====================================================================
         # SECTION 6: THE LONELY ONES (Low Reply Rate)
@@ -240,7 +297,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, user in enumerate(lonely_users, 1):
             content += f"{i:2}.   {user['username']:<22} {user['messages_sent']:>5}    {user['replies_received']:>7}    {user['reply_rate']:>8.1f}%\n"
 
-        report.append(format_section("LOOKING FOR ATTENTION (Low Reply Rate)", content))
+        emit(format_section("LOOKING FOR ATTENTION (Low Reply Rate)", content))
 
         # =====================================================================
         # SECTION 7: CONVERSATION STARTERS
@@ -268,16 +325,16 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, user in enumerate(convo_starters, 1):
             content += f"{i:2}.   {user['username']:<24} {user['conversations_started']:>7}    {user['pct_original']:>8.1f}%\n"
 
-        report.append(format_section("CONVERSATION STARTERS", content))
+        emit(format_section("CONVERSATION STARTERS", content))
 
         # =====================================================================
         # SECTION 8: PEAK ACTIVITY HOURS
         # =====================================================================
-        hourly = run_query(conn, """
+        hourly = run_query(conn, f"""
             SELECT
-                CAST(strftime('%H', created_at) AS INTEGER) as hour,
+                {hour} as hour,
                 COUNT(*) as messages
-            FROM messages
+            FROM messages m
             GROUP BY hour
             ORDER BY hour
         """)
@@ -295,7 +352,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         peak_hour = max(hourly, key=lambda x: x['messages']) if hourly else {'hour': 0, 'messages': 0}
         content += f"\nPeak Hour: {peak_hour['hour']:02d}:00 with {peak_hour['messages']:,} messages\n"
 
-        report.append(format_section("ACTIVITY BY HOUR", content))
+        emit(format_section("ACTIVITY BY HOUR", content))
 
         # =====================================================================
         # SECTION 9: DAY OF WEEK PATTERNS
@@ -334,18 +391,18 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         content += f"Weekend Messages: {weekend:,}\n"
         content += f"Weekend Ratio: {weekend / (weekday or 1) * 100:.1f}% of weekday activity\n"
 
-        report.append(format_section("ACTIVITY BY DAY OF WEEK", content))
+        emit(format_section("ACTIVITY BY DAY OF WEEK", content))
 
         # =====================================================================
         # SECTION 10: NIGHT OWLS vs EARLY BIRDS
         # =====================================================================
-        time_slots = run_query(conn, """
+        time_slots = run_query(conn, f"""
             SELECT
                 u.username,
-                SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 0 AND 5 THEN 1 ELSE 0 END) as night_owl,
-                SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 5 AND 9 THEN 1 ELSE 0 END) as early_bird,
-                SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 9 AND 17 THEN 1 ELSE 0 END) as work_hours,
-                SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 17 AND 24 THEN 1 ELSE 0 END) as evening,
+                SUM(CASE WHEN {hour} BETWEEN 0 AND 5 THEN 1 ELSE 0 END) as night_owl,
+                SUM(CASE WHEN {hour} BETWEEN 5 AND 9 THEN 1 ELSE 0 END) as early_bird,
+                SUM(CASE WHEN {hour} BETWEEN 9 AND 17 THEN 1 ELSE 0 END) as work_hours,
+                SUM(CASE WHEN {hour} BETWEEN 17 AND 24 THEN 1 ELSE 0 END) as evening,
                 COUNT(*) as total
             FROM messages m
             JOIN users u ON m.author_id = u.id
@@ -365,7 +422,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
             pct = u['early_bird'] / u['total'] * 100 if u['total'] > 0 else 0
             content += f"{i}. {u['username']}: {u['early_bird']} early morning messages ({pct:.1f}% of their total)\n"
 
-        report.append(format_section("NIGHT OWLS vs EARLY BIRDS", content))
+        emit(format_section("NIGHT OWLS vs EARLY BIRDS", content))
 
         # =====================================================================
         # SECTION 11: WEEKEND WARRIORS
@@ -396,7 +453,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
             ratio = u['weekend_ratio'] if u['weekend_ratio'] else 0
             content += f"{i:2}.   {u['username']:<22} {u['weekend_msgs']:>7}    {u['weekday_msgs']:>7}    {ratio:>5.1f}%\n"
 
-        report.append(format_section("WEEKEND WARRIORS", content))
+        emit(format_section("WEEKEND WARRIORS", content))
 
         # =====================================================================
         # SECTION 12: THE ESSAY WRITERS (Longest Messages)
@@ -422,7 +479,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, u in enumerate(long_msgs, 1):
             content += f"{i:2}.   {u['username']:<24} {u['avg_length']:>9.0f}    {u['max_length']:>9}    {u['total_msgs']:>8}\n"
 
-        report.append(format_section("THE ESSAY WRITERS", content))
+        emit(format_section("THE ESSAY WRITERS", content))
 
         # =====================================================================
         # SECTION 13: HYPE BUILDERS (Exclamation and Caps)
@@ -451,7 +508,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, u in enumerate(hype, 1):
             content += f"{i:2}.   {u['username']:<24} {u['exclamations']:>7}    {u['excl_per_msg']:>7.2f}\n"
 
-        report.append(format_section("HYPE BUILDERS", content))
+        emit(format_section("HYPE BUILDERS", content))
 
         # =====================================================================
         # SECTION 14: QUESTION ASKERS
@@ -459,10 +516,10 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         questioners = run_query(conn, """
             SELECT
                 u.username,
-                SUM(CASE WHEN m.content LIKE '%?' THEN 1 ELSE 0 END) as questions,
+                SUM(CASE WHEN substr(m.content, -1) = '?' THEN 1 ELSE 0 END) as questions,
                 COUNT(*) as total,
                 ROUND(
-                    SUM(CASE WHEN m.content LIKE '%?' THEN 1 ELSE 0 END) * 100.0 / COUNT(*),
+                    SUM(CASE WHEN substr(m.content, -1) = '?' THEN 1 ELSE 0 END) * 100.0 / COUNT(*),
                     1
                 ) as question_pct
             FROM messages m
@@ -479,7 +536,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, u in enumerate(questioners, 1):
             content += f"{i:2}.   {u['username']:<24} {u['questions']:>9}    {u['question_pct']:>8.1f}%\n"
 
-        report.append(format_section("THE CURIOUS ONES (Question Askers)", content))
+        emit(format_section("THE CURIOUS ONES (Question Askers)", content))
 
         # =====================================================================
         # SECTION 15: MOST MENTIONED USERS
@@ -501,7 +558,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, u in enumerate(mentioned, 1):
             content += f"{i:2}.   {u['username']:<28} {u['times_mentioned']:>8}\n"
 
-        report.append(format_section("MOST MENTIONED", content))
+        emit(format_section("MOST MENTIONED", content))
 
         # =====================================================================
         # SECTION 16: WHO MENTIONS OTHERS MOST
@@ -526,7 +583,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, u in enumerate(mentioners, 1):
             content += f"{i:2}.   {u['username']:<24} {u['mentions_given']:>8}    {u['mentions_per_msg']:>7.2f}\n"
 
-        report.append(format_section("TAG HAPPY (Who Mentions Others Most)", content))
+        emit(format_section("TAG HAPPY (Who Mentions Others Most)", content))
 
         # =====================================================================
         # SECTION 17: MONTHLY ACTIVITY TREND
@@ -556,7 +613,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
             content += f"\nPeak Month: {peak_month['month']} ({peak_month['messages']:,} messages)\n"
             content += f"Slowest Month: {low_month['month']} ({low_month['messages']:,} messages)\n"
 
-        report.append(format_section("MONTHLY ACTIVITY TREND", content))
+        emit(format_section("MONTHLY ACTIVITY TREND", content))
 
         # =====================================================================
         # SECTION 18: FIRST AND LAST MESSAGES
@@ -603,7 +660,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
             content += f"  Channel: #{lm['channel']}\n"
             content += f"  Message: \"{lm['content'][:100]}{'...' if len(lm['content']) > 100 else ''}\"\n"
 
-        report.append(format_section("FIRST AND LAST MESSAGES", content))
+        emit(format_section("FIRST AND LAST MESSAGES", content))
 
         # =====================================================================
         # SECTION 19: FAN RELATIONSHIPS (One-Sided Attention)
@@ -641,7 +698,7 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for f in fans:
             content += f"{f['fan']:<20} -> {f['idol']:<22} {f['fan_to_idol']:>8}    {f['idol_to_fan']:>8}\n"
 
-        report.append(format_section("FAN RELATIONSHIPS (One-Sided Attention)", content))
+        emit(format_section("FAN RELATIONSHIPS (One-Sided Attention)", content))
 
         # =====================================================================
         # SECTION 20: BUSIEST DAYS
@@ -663,33 +720,26 @@ Date Range: {date_range['first_msg']} to {date_range['last_msg']}
         for i, day in enumerate(busiest, 1):
             content += f"{i:2}.   {day['date']}    {day['messages']:>7}    {day['active_users']:>12}\n"
 
-        report.append(format_section("BUSIEST DAYS", content))
+        emit(format_section("BUSIEST DAYS", content))
 
         # =====================================================================
         # FOOTER
         # =====================================================================
-        report.append(f"""
-################################################################################
-#                                                                              #
-#                         END OF YEAR-END REVIEW                               #
-#                                                                              #
-################################################################################
-
-Thanks for a great year, {server_name}!
+        footer_tail = f"""Thanks for a great year, {server_name}!
 
 Report generated by Discord SQL Analytics
 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-""")
-
-    # Write report to file
-    full_report = "\n".join(report)
-    with open(output_file, 'w') as f:
-        f.write(full_report)
+"""
+        out.write(FOOTER_BANNER_BYTES)
+        out.write(footer_tail.encode('utf-8'))
+        sys.stdout.write(FOOTER_BANNER + footer_tail)
 
-    print(full_report)
-    print(f"\n\nReport saved to: {output_file}")
+    sys.stdout.write(f"\n\n\nReport saved to: {output_file}\n")
+    sys.stdout.flush()
 
-    return full_report
+    # Read back rather than kept in memory while the sections stream out
+    with open(output_file, encoding='utf-8') as f:
+        return f.read()
 
 
 def main():
@@ -698,7 +748,13 @@ def main():
     parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="Output file")
     args = parser.parse_args()
 
-    if not os.path.exists(args.db):
+    # mode=ro keeps the report from writing to the database, and makes
+    # SQLite refuse to create a missing file, so opening the first
+    # connection doubles as the existence check
+    engine = create_engine(f"sqlite:///file:{args.db}?mode=ro&uri=true", echo=False)
+    try:
+        engine.connect().close()
+    except OperationalError:
         print(f"Error: Database file not found: {args.db}")
         sys.exit(1)
 
@@ -706,8 +762,10 @@ def main():
     print(f"Output file: {args.output}")
     print()
 
-    engine = create_engine(f"sqlite:///{args.db}", echo=False)
-    generate_report(engine, args.output)
+    try:
+        generate_report(engine, args.output)
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
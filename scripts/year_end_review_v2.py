@@ -11,28 +11,306 @@ Usage:
     python scripts/year_end_review_v2.py [--db discord_year.db]
 """
 import argparse
+import heapq
+import io
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from collections import defaultdict
+from operator import itemgetter
+from collections import Counter, defaultdict, deque
 import re
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from src.db.queries import MESSAGE_DERIVED_COLUMNS
 
 # Configuration
 DEFAULT_DB = "discord_year.db"
 OUTPUT_FILE = "year_end_review_2024.txt"
 
+# Report sections run concurrently, each on its own connection. The
+# shared working set lives in an in-memory database every connection
+# attaches, since TEMP tables are only visible to the connection that
+# created them.
+MAX_WORKERS = 4
+SCRATCH_DB = "file:year_review_scratch?mode=memory&cache=shared"
+
+# The report is one long read-heavy pass over messages: keep hot pages
+# cached and memory-mapped, and keep sorts/temp indexes off disk. These
+# are per-connection settings; the database file itself (journal mode,
+# indexes, statistics) is left as the extractor created it.
+SQLITE_PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-524288",     # 512 MB
+    "PRAGMA mmap_size=1073741824",   # 1 GB
+    "PRAGMA temp_store=MEMORY",
+]
+
+# Year totals per user, per (user, channel) and per reply pair, rolled up
+# across servers. Built from the year stats snapshots the extractor keeps
+# when they cover every human message, otherwise straight from the
+# working set.
+YEAR_TOTALS_FROM_SNAPSHOTS = {
+    "user_year_totals": """
+        SELECT user_id, SUM(total_msgs) AS total_msgs, MAX(longest_msg) AS longest_msg,
+               SUM(questions_asked) AS questions_asked, SUM(late_night) AS late_night
+        FROM user_year_stats
+        GROUP BY user_id
+    """,
+    "channel_year_totals": """
+        SELECT user_id, channel_id, SUM(msgs) AS msgs
+        FROM channel_year_stats
+        GROUP BY user_id, channel_id
+    """,
+    "pair_year_totals": """
+        SELECT user_lo, user_hi, SUM(lo_to_hi) AS lo_to_hi, SUM(hi_to_lo) AS hi_to_lo,
+               SUM(total) AS total
+        FROM pair_year_stats
+        GROUP BY user_lo, user_hi
+    """,
+}
+YEAR_TOTALS_FROM_MESSAGES = {
+    "user_year_totals": """
+        SELECT author_id AS user_id, COUNT(*) AS total_msgs,
+               COALESCE(MAX(char_count), 0) AS longest_msg,
+               SUM(substr(content, -1) = '?') AS questions_asked,
+               SUM(created_hour BETWEEN 0 AND 5) AS late_night
+        FROM human_messages
+        GROUP BY author_id
+    """,
+    "channel_year_totals": """
+        SELECT author_id AS user_id, channel_id, COUNT(*) AS msgs
+        FROM human_messages
+        GROUP BY author_id, channel_id
+    """,
+    "pair_year_totals": """
+        SELECT
+            MIN(replier_id, orig_author_id) AS user_lo,
+            MAX(replier_id, orig_author_id) AS user_hi,
+            SUM(replier_id < orig_author_id) AS lo_to_hi,
+            SUM(replier_id > orig_author_id) AS hi_to_lo,
+            COUNT(*) AS total
+        FROM human_replies
+        GROUP BY 1, 2
+    """,
+}
+
+# Per-user roll-ups behind the "wrapped" stats that are not part of the
+# year totals, built in one pass each over the human
+# messages instead of re-scanning messages per user.
+WRAPPED_STATS_TABLES = {
+    "fav_channel_per_user": """
+        SELECT user_id as author_id, channel_id, msgs as cnt FROM (
+            SELECT user_id, channel_id, msgs,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY msgs DESC) as rn
+            FROM channel_year_totals
+        )
+        WHERE rn = 1
+    """,
+    "busiest_day_per_user": """
+        SELECT author_id, the_date, cnt FROM (
+            SELECT author_id, DATE(created_at) as the_date, COUNT(*) as cnt,
+                   ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY COUNT(*) DESC) as rn
+            FROM human_messages
+            GROUP BY author_id, DATE(created_at)
+        )
+        WHERE rn = 1
+    """,
+    "mentions_per_user": """
+        SELECT mm.mentioned_user_id as author_id,
+               COUNT(*) as times_mentioned,
+               COUNT(DISTINCT m.author_id) as by_people
+        FROM message_mentions mm
+        JOIN messages m ON mm.message_id = m.id
+        GROUP BY mm.mentioned_user_id
+    """,
+    # Everyone replied to counts towards unique_convos, bots included; only
+    # humans can be the best friend, so they sort ahead of the rest.
+    "best_friend_per_user": """
+        SELECT
+            author_id,
+            CASE WHEN human THEN partner_id END as partner_id,
+            CASE WHEN human THEN exchanges END as exchanges,
+            unique_convos
+        FROM (
+            SELECT m.author_id, orig.author_id as partner_id, COUNT(*) as exchanges,
+                   COALESCE(u.is_bot = 0, 0) as human,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY m.author_id ORDER BY COALESCE(u.is_bot = 0, 0) DESC, COUNT(*) DESC
+                   ) as rn,
+                   COUNT(*) OVER (PARTITION BY m.author_id) as unique_convos
+            FROM human_messages m
+            JOIN messages orig ON m.reply_to_message_id = orig.id
+            LEFT JOIN users u ON orig.author_id = u.id
+            WHERE orig.author_id != m.author_id
+            GROUP BY m.author_id, orig.author_id
+        )
+        WHERE rn = 1
+    """,
+}
+
+# (Re)build statements for the tables above, constructed once at import.
+# Temp tables are per connection and pooled connections are reused, so
+# each build drops whatever an earlier report left behind.
+WRAPPED_STATS_STATEMENTS = [
+    text(statement)
+    for table, query in WRAPPED_STATS_TABLES.items()
+    for statement in (
+        f"DROP TABLE IF EXISTS temp.{table}",
+        f"CREATE TEMP TABLE {table} AS {query}",
+        f"CREATE INDEX temp.idx_{table}_author ON {table}(author_id)",
+    )
+]
+
+# One row per top-10 user (100+ messages), with every wrapped stat.
+USER_WRAPPED_STATS = text("""
+    WITH top_users AS (
+        SELECT * FROM (
+            SELECT
+                user_id as author_id,
+                total_msgs,
+                longest_msg,
+                questions_asked,
+                late_night,
+                RANK() OVER (ORDER BY total_msgs DESC) as rank,
+                COUNT(*) OVER () as total_users
+            FROM user_year_totals
+        )
+        WHERE total_msgs >= 100
+        ORDER BY total_msgs DESC
+        LIMIT 10
+    )
+    SELECT
+        tu.*,
+        c.name as fav_channel,
+        ROUND(fc.cnt * 100.0 / tu.total_msgs, 1) as fav_channel_pct,
+        bf.partner_id as best_friend_id,
+        bf.exchanges as bf_exchanges,
+        COALESCE(bf.unique_convos, 0) as unique_convos,
+        COALESCE(mi.times_mentioned, 0) as times_mentioned,
+        COALESCE(mi.by_people, 0) as by_people,
+        bd.the_date as busiest_date,
+        bd.cnt as busiest_count
+    FROM top_users tu
+    LEFT JOIN fav_channel_per_user fc ON fc.author_id = tu.author_id
+    LEFT JOIN channels c ON c.id = fc.channel_id
+    LEFT JOIN busiest_day_per_user bd ON bd.author_id = tu.author_id
+    LEFT JOIN mentions_per_user mi ON mi.author_id = tu.author_id
+    LEFT JOIN best_friend_per_user bf ON bf.author_id = tu.author_id
+    ORDER BY tu.total_msgs DESC
+""")
+
+
+def create_review_engine(db_path):
+    """Create an engine with analytics pragmas and the scratch database attached."""
+    # mode=ro keeps the report from writing to the database, and makes
+    # opening the first connection double as the existence check
+    engine = create_engine(
+        f"sqlite:///file:{db_path}?mode=ro&uri=true",
+        echo=False,
+        connect_args={"cached_statements": 256},
+    )
+
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        for pragma in SQLITE_PRAGMAS:
+            dbapi_connection.execute(pragma)
+        dbapi_connection.execute(f"ATTACH DATABASE '{SCRATCH_DB}' AS scratch")
+
+    return engine
+
+
+def derived_columns(conn):
+    """Select list for the per-message values the extractor stores.
+
+    Databases (or rows) from before they were stored get them computed
+    from content here instead, so the report never has to alter the file.
+    """
+    stored = {row[1] for row in conn.execute(text("PRAGMA table_info(messages)"))}
+    return ", ".join(
+        f"COALESCE({column}, {expression}) AS {column}" if column in stored
+        else f"{expression} AS {column}"
+        for column, expression in MESSAGE_DERIVED_COLUMNS.items()
+    )
+
+
+def year_stats_current(conn):
+    """Whether the persisted year stats snapshots cover every human message.
+
+    The extractor refreshes them after every sync. Databases synced before
+    they existed (or before they were kept per server), or written to
+    without a refresh, don't add up to the human message count.
+    """
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(user_year_stats)"))}
+    if "server_id" not in columns:
+        return False
+    snapshot_total, human_total = conn.execute(text("""
+        SELECT
+            (SELECT COALESCE(SUM(total_msgs), 0) FROM user_year_stats),
+            (SELECT COUNT(*) FROM human_messages)
+    """)).one()
+    return snapshot_total == human_total
+
 
 def run_query(conn, query, params=None):
-    """Execute a query and return results as a list of dicts."""
-    result = conn.execute(text(query), params or {})
+    """Execute a query (SQL string or prebuilt text()) and return a list of dicts."""
+    if isinstance(query, str):
+        query = text(query)
+    result = conn.execute(query, params or {})
     columns = result.keys()
     return [dict(zip(columns, row)) for row in result]
 
 
+def find_sparks(messages):
+    """
+    Find conversation sparks and their follow-ups in one pass.
+
+    A spark is the first message in a channel after 30+ minutes of
+    silence; its follow-ups are the later messages within 30 minutes.
+    Expects rows ordered by (channel_id, created_at) and yields only
+    sparks that got at least one follow-up.
+    """
+    window = deque()
+    prev = None
+    for msg in messages:
+        if prev is None or prev['channel_id'] != msg['channel_id']:
+            yield from (s for s in window if s['follow_ups'])
+            window.clear()
+            prev = None
+
+        while window and (msg['created_at_jd'] - window[0]['created_at_jd']) * 1440.0 > 30:
+            spark = window.popleft()
+            if spark['follow_ups']:
+                yield spark
+
+        for spark in window:
+            if msg['created_at'] > spark['created_at']:
+                spark['follow_ups'] += 1
+                spark['responders'].add(msg['author_id'])
+
+        if prev is None or (msg['created_at_jd'] - prev['created_at_jd']) * 1440.0 > 30:
+            window.append({
+                'author_id': msg['author_id'],
+                'created_at': msg['created_at'],
+                'created_at_jd': msg['created_at_jd'],
+                'follow_ups': 0,
+                'responders': set(),
+            })
+        prev = msg
+
+    yield from (s for s in window if s['follow_ups'])
+
+
+def write_all(streams, fragment):
+    """Write a report fragment to every output stream."""
+    for stream in streams:
+        stream.write(fragment)
+
+
 def section(title):
     """Format a section header."""
     return f"\n{'='*70}\n{title}\n{'='*70}\n"
@@ -43,924 +321,885 @@ def subsection(title):
     return f"\n--- {title} ---\n"
 
 
-def generate_report(engine, output_file):
-    """Generate the complete creative year-end review report."""
-    report = []
+def response_dynamics(conn, usernames):
+    """Part 1: response speed, left-on-read, killers, revivers and catalysts."""
+    report = io.StringIO()
 
-    with engine.connect() as conn:
-        # =====================================================================
-        # HEADER
-        # =====================================================================
-        server = run_query(conn, "SELECT name, member_count FROM servers LIMIT 1")
-        server_name = server[0]['name'] if server else "Unknown Server"
+    report.write(section("PART 1: RESPONSE DYNAMICS"))
 
-        # Get stats excluding bots
-        stats = run_query(conn, """
+    # 1.1 Response Speed Leaderboard
+    report.write(subsection("1.1 RESPONSE SPEED LEADERBOARD"))
+    response_times = run_query(conn, """
+        WITH reply_times AS (
             SELECT
-                (SELECT COUNT(*) FROM messages m JOIN users u ON m.author_id = u.id WHERE u.is_bot = 0) as total_messages,
-                (SELECT COUNT(DISTINCT m.author_id) FROM messages m JOIN users u ON m.author_id = u.id WHERE u.is_bot = 0) as active_users,
-                (SELECT COUNT(*) FROM users WHERE is_bot = 0) as total_users,
-                (SELECT COUNT(*) FROM users WHERE is_bot = 1) as bot_count
-        """)[0]
-
-        report.append(f"""
-################################################################################
-#                                                                              #
-#            {server_name.upper()} - YEAR IN REVIEW 2024                       #
-#                        CREATIVE ANALYTICS EDITION                            #
-#                                                                              #
-################################################################################
-
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Server: {server_name}
-
-Total Messages (humans only): {stats['total_messages']:,}
-Active Human Users: {stats['active_users']}
-(Excluded {stats['bot_count']} bots from all analytics)
-""")
-
-        # =====================================================================
-        # PART 1: RESPONSE DYNAMICS
-        # =====================================================================
-        report.append(section("PART 1: RESPONSE DYNAMICS"))
-
-        # 1.1 Response Speed Leaderboard
-        report.append(subsection("1.1 RESPONSE SPEED LEADERBOARD"))
-        response_times = run_query(conn, """
-            WITH reply_times AS (
-                SELECT
-                    m.author_id,
-                    orig.author_id as original_author,
-                    (julianday(m.created_at) - julianday(orig.created_at)) * 24 * 60 as response_minutes
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                  AND m.author_id != orig.author_id
-                  AND (julianday(m.created_at) - julianday(orig.created_at)) * 24 * 60 BETWEEN 0.1 AND 1440
-            )
+                replier_id as author_id,
+                orig_author_id as original_author,
+                response_minutes
+            FROM human_replies
+            WHERE response_minutes BETWEEN 0.1 AND 1440
+        ),
+        per_user AS (
             SELECT
-                u.username,
+                author_id,
                 ROUND(AVG(response_minutes), 1) as avg_response_min,
                 COUNT(*) as reply_count
-            FROM reply_times rt
-            JOIN users u ON rt.author_id = u.id
-            GROUP BY rt.author_id
+            FROM reply_times
+            GROUP BY author_id
             HAVING COUNT(*) >= 10
-            ORDER BY avg_response_min ASC
-            LIMIT 10
-        """)
-
-        report.append("Fastest Fingers (quickest average response time):\n")
-        for i, u in enumerate(response_times[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['avg_response_min']:.1f} min avg ({u['reply_count']} replies)\n")
-
-        report.append("\nThe 'I'll Get Back To You' Club (slowest responders):\n")
-        slowest = sorted(response_times, key=lambda x: x['avg_response_min'], reverse=True)[:5]
-        for i, u in enumerate(slowest, 1):
-            report.append(f"  {i}. {u['username']}: {u['avg_response_min']:.1f} min avg\n")
-
-        # 1.2 Left on Read Index
-        report.append(subsection("1.2 THE 'LEFT ON READ' INDEX"))
-        left_on_read = run_query(conn, """
-            WITH mentions_received AS (
-                SELECT mm.mentioned_user_id as user_id, COUNT(*) as received
-                FROM message_mentions mm
-                JOIN users u ON mm.mentioned_user_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY mm.mentioned_user_id
-            ),
-            replies_received AS (
-                SELECT orig.author_id as user_id, COUNT(*) as received
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u ON orig.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY orig.author_id
-            ),
-            responses_given AS (
-                SELECT m.author_id as user_id, COUNT(*) as given
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0 AND m.reply_to_message_id IS NOT NULL
-                GROUP BY m.author_id
-            ),
-            total_received AS (
-                SELECT user_id, SUM(received) as total
-                FROM (
-                    SELECT user_id, received FROM mentions_received
-                    UNION ALL
-                    SELECT user_id, received FROM replies_received
-                ) GROUP BY user_id
-            )
+        )
+        SELECT * FROM per_user
+    """)
+    # One row per user: partial heaps pick both ends without a full sort.
+    fastest = heapq.nsmallest(5, response_times, key=itemgetter('avg_response_min'))
+    slowest = heapq.nlargest(5, response_times, key=itemgetter('avg_response_min'))
+
+    report.write("Fastest Fingers (quickest average response time):\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['avg_response_min']:.1f} min avg ({u['reply_count']} replies)\n"
+        for i, u in enumerate(fastest, 1)
+    ))
+
+    report.write("\nThe 'I'll Get Back To You' Club (slowest responders):\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['avg_response_min']:.1f} min avg\n"
+        for i, u in enumerate(slowest, 1)
+    ))
+
+    # 1.2 Left on Read Index
+    report.write(subsection("1.2 THE 'LEFT ON READ' INDEX"))
+    left_on_read = run_query(conn, """
+        WITH mentions_received AS MATERIALIZED (
+            SELECT mm.mentioned_user_id as user_id, COUNT(*) as received
+            FROM message_mentions mm
+            JOIN users u ON mm.mentioned_user_id = u.id
+            WHERE u.is_bot = 0
+            GROUP BY mm.mentioned_user_id
+        ),
+        replies_received AS MATERIALIZED (
+            -- Every reply counts as a ping, bots' and self-replies included,
+            -- matching the responses_given side below
+            SELECT orig.author_id as user_id, COUNT(*) as received
+            FROM messages m
+            JOIN human_messages orig ON m.reply_to_message_id = orig.id
+            GROUP BY orig.author_id
+        ),
+        responses_given AS MATERIALIZED (
+            SELECT m.author_id as user_id, COUNT(*) as given
+            FROM human_messages m
+            WHERE m.reply_to_message_id IS NOT NULL
+            GROUP BY m.author_id
+        ),
+        pings AS (
             SELECT
-                u.username,
-                COALESCE(tr.total, 0) as pings_received,
-                COALESCE(rg.given, 0) as responses_given,
-                CASE WHEN tr.total > 0
-                    THEN ROUND((1 - COALESCE(rg.given, 0) * 1.0 / tr.total) * 100, 1)
-                    ELSE 0
-                END as left_on_read_pct
+                u.id as author_id,
+                COALESCE(mr.received, 0) + COALESCE(rr.received, 0) as pings_received,
+                COALESCE(rg.given, 0) as responses_given
             FROM users u
-            LEFT JOIN total_received tr ON u.id = tr.user_id
+            LEFT JOIN mentions_received mr ON u.id = mr.user_id
+            LEFT JOIN replies_received rr ON u.id = rr.user_id
             LEFT JOIN responses_given rg ON u.id = rg.user_id
-            WHERE u.is_bot = 0 AND COALESCE(tr.total, 0) >= 20
-            ORDER BY left_on_read_pct DESC
-            LIMIT 10
-        """)
-
-        report.append("Who leaves people hanging the most?\n")
-        report.append("(Higher % = more likely to ignore you)\n\n")
-        for i, u in enumerate(left_on_read[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['left_on_read_pct']:.1f}% ignored ({u['pings_received']} pings received)\n")
-
-        # 1.3 Conversation Killers
-        report.append(subsection("1.3 CONVERSATION KILLERS"))
-        report.append("Users whose messages are followed by 30+ min of silence:\n\n")
-
-        convo_killers = run_query(conn, """
-            WITH msg_with_next AS (
-                SELECT
-                    m.id,
-                    m.author_id,
-                    m.channel_id,
-                    m.created_at as msg_time,
-                    LEAD(m.created_at) OVER (PARTITION BY m.channel_id ORDER BY m.created_at) as next_msg_time
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-            )
-            SELECT
-                u.username,
-                COUNT(*) as total_msgs,
-                SUM(CASE WHEN (julianday(next_msg_time) - julianday(msg_time)) * 24 * 60 > 30 THEN 1 ELSE 0 END) as kills,
-                ROUND(
-                    SUM(CASE WHEN (julianday(next_msg_time) - julianday(msg_time)) * 24 * 60 > 30 THEN 1 ELSE 0 END) * 100.0 / COUNT(*),
-                    1
-                ) as kill_rate
-            FROM msg_with_next mwn
-            JOIN users u ON mwn.author_id = u.id
-            WHERE next_msg_time IS NOT NULL
-            GROUP BY mwn.author_id
-            HAVING COUNT(*) >= 50
-            ORDER BY kill_rate DESC
-            LIMIT 10
-        """)
-
-        report.append("The 'Buzzkill' Leaderboard:\n")
-        for i, u in enumerate(convo_killers[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['kill_rate']:.1f}% of messages killed the chat ({u['kills']} times)\n")
-
-        # 1.4 Conversation Revivers
-        report.append(subsection("1.4 CONVERSATION REVIVERS"))
-
-        revivers = run_query(conn, """
-            WITH msg_with_prev AS (
-                SELECT
-                    m.id,
-                    m.author_id,
-                    m.channel_id,
-                    m.created_at as msg_time,
-                    LAG(m.created_at) OVER (PARTITION BY m.channel_id ORDER BY m.created_at) as prev_msg_time
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-            )
-            SELECT
-                u.username,
-                SUM(CASE WHEN (julianday(msg_time) - julianday(prev_msg_time)) * 24 * 60 > 60 THEN 1 ELSE 0 END) as revivals
-            FROM msg_with_prev mwp
-            JOIN users u ON mwp.author_id = u.id
-            WHERE prev_msg_time IS NOT NULL
-            GROUP BY mwp.author_id
-            ORDER BY revivals DESC
-            LIMIT 10
-        """)
-
-        report.append("The 'Spark Plug' Award - Who brings dead chats back to life:\n")
-        report.append("(First message after 1+ hour of silence)\n\n")
-        for i, u in enumerate(revivers[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['revivals']} revivals\n")
-
-        # 1.5 Conversation Catalysts
-        report.append(subsection("1.5 CONVERSATION CATALYSTS"))
-        report.append("Who sparks actual conversations (not just breaks silence)?\n\n")
-
-        catalysts = run_query(conn, """
-            WITH msg_ordered AS (
-                SELECT
-                    m.id,
-                    m.author_id,
-                    m.channel_id,
-                    m.created_at,
-                    LAG(m.created_at) OVER (PARTITION BY m.channel_id ORDER BY m.created_at) as prev_time,
-                    ROW_NUMBER() OVER (PARTITION BY m.channel_id ORDER BY m.created_at) as rn
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-            ),
-            potential_sparks AS (
-                SELECT
-                    mo.id as spark_id,
-                    mo.author_id as spark_author,
-                    mo.channel_id,
-                    mo.created_at as spark_time
-                FROM msg_ordered mo
-                WHERE (julianday(mo.created_at) - julianday(mo.prev_time)) * 24 * 60 > 30
-                   OR mo.prev_time IS NULL
-            ),
-            spark_results AS (
-                SELECT
-                    ps.spark_id,
-                    ps.spark_author,
-                    COUNT(DISTINCT m.id) as follow_up_count,
-                    COUNT(DISTINCT m.author_id) as unique_responders
-                FROM potential_sparks ps
-                JOIN messages m ON m.channel_id = ps.channel_id
-                    AND m.created_at > ps.spark_time
-                    AND (julianday(m.created_at) - julianday(ps.spark_time)) * 24 * 60 <= 30
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY ps.spark_id, ps.spark_author
-            )
-            SELECT
-                u.username,
-                COUNT(*) as spark_attempts,
-                SUM(CASE WHEN sr.follow_up_count >= 5 AND sr.unique_responders >= 2 THEN 1 ELSE 0 END) as successful_ignitions,
-                ROUND(
-                    SUM(CASE WHEN sr.follow_up_count >= 5 AND sr.unique_responders >= 2 THEN 1 ELSE 0 END) * 100.0 / COUNT(*),
-                    1
-                ) as success_rate,
-                ROUND(AVG(sr.follow_up_count), 1) as avg_chain_length
-            FROM spark_results sr
-            JOIN users u ON sr.spark_author = u.id
-            GROUP BY sr.spark_author
-            HAVING COUNT(*) >= 5
-            ORDER BY successful_ignitions DESC
-            LIMIT 10
-        """)
-
-        report.append("'Life of the Party' - Most successful conversation starters:\n")
-        for i, u in enumerate(catalysts[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['successful_ignitions']} ignitions ({u['success_rate']:.1f}% success, avg {u['avg_chain_length']:.1f} msgs)\n")
-
-        # =====================================================================
-        # PART 2: SOCIAL GRAPH INSIGHTS
-        # =====================================================================
-        report.append(section("PART 2: SOCIAL GRAPH INSIGHTS"))
-
-        # 2.1 Social Butterfly Score
-        report.append(subsection("2.1 SOCIAL BUTTERFLY SCORE"))
-
-        social_butterfly = run_query(conn, """
-            WITH interactions AS (
-                SELECT DISTINCT m.author_id, orig.author_id as interacted_with
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u1 ON m.author_id = u1.id
-                JOIN users u2 ON orig.author_id = u2.id
-                WHERE u1.is_bot = 0 AND u2.is_bot = 0 AND m.author_id != orig.author_id
-                UNION
-                SELECT DISTINCT m.author_id, mm.mentioned_user_id as interacted_with
-                FROM messages m
-                JOIN message_mentions mm ON m.id = mm.message_id
-                JOIN users u1 ON m.author_id = u1.id
-                JOIN users u2 ON mm.mentioned_user_id = u2.id
-                WHERE u1.is_bot = 0 AND u2.is_bot = 0 AND m.author_id != mm.mentioned_user_id
-            )
+            WHERE u.is_bot = 0
+        )
+        SELECT
+            author_id,
+            pings_received,
+            responses_given,
+            ROUND((1 - responses_given * 1.0 / pings_received) * 100, 1) as left_on_read_pct
+        FROM pings
+        WHERE pings_received >= 20
+        ORDER BY left_on_read_pct DESC
+        LIMIT 10
+    """)
+
+    report.write("Who leaves people hanging the most?\n")
+    report.write("(Higher % = more likely to ignore you)\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['left_on_read_pct']:.1f}% ignored ({u['pings_received']} pings received)\n"
+        for i, u in enumerate(left_on_read[:10], 1)
+    ))
+
+    # 1.3 Conversation Killers / 1.4 Conversation Revivers
+    # Both come from the same per-channel ordering, so compute the
+    # previous and next message times in one window pass.
+    neighbor_stats = run_query(conn, """
+        WITH msg_with_neighbors AS (
             SELECT
-                u.username,
-                COUNT(DISTINCT interacted_with) as unique_interactions,
-                (SELECT COUNT(*) FROM users WHERE is_bot = 0) as total_humans
-            FROM interactions i
-            JOIN users u ON i.author_id = u.id
-            GROUP BY i.author_id
-            ORDER BY unique_interactions DESC
-            LIMIT 15
-        """)
-
-        total_humans = social_butterfly[0]['total_humans'] if social_butterfly else 1
-        report.append(f"Who talks to the most different people? (out of {total_humans} humans)\n\n")
-        for i, u in enumerate(social_butterfly[:10], 1):
-            pct = u['unique_interactions'] / total_humans * 100
-            report.append(f"  {i}. {u['username']}: {u['unique_interactions']} people ({pct:.0f}% of server)\n")
-
-        # The loners
-        report.append("\nThe 'Selective Socializers' (fewest unique interactions):\n")
-        loners = sorted(social_butterfly, key=lambda x: x['unique_interactions'])[:5]
-        for i, u in enumerate(loners, 1):
-            report.append(f"  {i}. {u['username']}: only {u['unique_interactions']} people\n")
-
-        # 2.2 Reciprocity Index
-        report.append(subsection("2.2 RECIPROCITY INDEX"))
-
-        reciprocity = run_query(conn, """
-            WITH reply_counts AS (
-                SELECT
-                    m.author_id as user_a,
-                    orig.author_id as user_b,
-                    COUNT(*) as replies
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u1 ON m.author_id = u1.id
-                JOIN users u2 ON orig.author_id = u2.id
-                WHERE u1.is_bot = 0 AND u2.is_bot = 0 AND m.author_id != orig.author_id
-                GROUP BY m.author_id, orig.author_id
-            )
+                author_id,
+                created_at_jd,
+                LAG(created_at_jd) OVER w as prev_jd,
+                LEAD(created_at_jd) OVER w as next_jd
+            FROM human_messages
+            WINDOW w AS (PARTITION BY channel_id ORDER BY created_at)
+        ),
+        author_stats AS MATERIALIZED (
             SELECT
-                u1.username as user_a,
-                u2.username as user_b,
-                rc1.replies as a_to_b,
-                COALESCE(rc2.replies, 0) as b_to_a,
-                ABS(rc1.replies - COALESCE(rc2.replies, 0)) as imbalance
-            FROM reply_counts rc1
-            JOIN users u1 ON rc1.user_a = u1.id
-            JOIN users u2 ON rc1.user_b = u2.id
-            LEFT JOIN reply_counts rc2 ON rc1.user_a = rc2.user_b AND rc1.user_b = rc2.user_a
-            WHERE rc1.replies >= 10
-            ORDER BY imbalance DESC
-            LIMIT 10
-        """)
-
-        report.append("Most UNBALANCED relationships (one-sided attention):\n\n")
-        for i, r in enumerate(reciprocity[:10], 1):
-            report.append(f"  {i}. {r['user_a']} -> {r['user_b']}: {r['a_to_b']} replies vs {r['b_to_a']} back (imbalance: {r['imbalance']})\n")
-
-        # Most balanced
-        report.append(subsection("2.3 BEST FRIENDS FOREVER"))
-        bffs = run_query(conn, """
-            WITH reply_counts AS (
-                SELECT
-                    CASE WHEN m.author_id < orig.author_id THEN m.author_id ELSE orig.author_id END as user_a,
-                    CASE WHEN m.author_id < orig.author_id THEN orig.author_id ELSE m.author_id END as user_b,
-                    m.author_id as replier
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u1 ON m.author_id = u1.id
-                JOIN users u2 ON orig.author_id = u2.id
-                WHERE u1.is_bot = 0 AND u2.is_bot = 0 AND m.author_id != orig.author_id
-            ),
-            pair_counts AS (
-                SELECT
-                    user_a, user_b,
-                    SUM(CASE WHEN replier = user_a THEN 1 ELSE 0 END) as a_to_b,
-                    SUM(CASE WHEN replier = user_b THEN 1 ELSE 0 END) as b_to_a,
-                    COUNT(*) as total
-                FROM reply_counts
-                GROUP BY user_a, user_b
-            )
+                author_id,
+                COUNT(next_jd) as total_msgs,
+                SUM((next_jd - created_at_jd) * 1440.0 > 30) as kills,
+                COUNT(prev_jd) as msgs_with_prev,
+                SUM((created_at_jd - prev_jd) * 1440.0 > 60) as revivals
+            FROM msg_with_neighbors
+            GROUP BY author_id
+        ),
+        ranked AS (
             SELECT
-                u1.username as user_1,
-                u2.username as user_2,
-                pc.a_to_b,
-                pc.b_to_a,
-                pc.total,
-                ABS(pc.a_to_b - pc.b_to_a) as imbalance
-            FROM pair_counts pc
-            JOIN users u1 ON pc.user_a = u1.id
-            JOIN users u2 ON pc.user_b = u2.id
-            WHERE pc.total >= 20
-            ORDER BY pc.total DESC, imbalance ASC
-            LIMIT 10
-        """)
-
-        report.append("Strongest friendships (most mutual exchanges):\n\n")
-        for i, p in enumerate(bffs[:10], 1):
-            report.append(f"  {i}. {p['user_1']} <-> {p['user_2']}: {p['total']} total ({p['a_to_b']} / {p['b_to_a']})\n")
-
-        # =====================================================================
-        # PART 3: BEHAVIORAL PATTERNS
-        # =====================================================================
-        report.append(section("PART 3: BEHAVIORAL PATTERNS"))
-
-        # 3.1 Consistency Score
-        report.append(subsection("3.1 CONSISTENCY SCORE"))
-
-        consistency = run_query(conn, """
-            WITH daily_counts AS (
-                SELECT
-                    m.author_id,
-                    DATE(m.created_at) as msg_date,
-                    COUNT(*) as daily_msgs
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY m.author_id, DATE(m.created_at)
-            ),
-            user_stats AS (
-                SELECT
-                    author_id,
-                    AVG(daily_msgs) as avg_daily,
-                    COUNT(*) as active_days,
-                    SUM(daily_msgs) as total_msgs
-                FROM daily_counts
-                GROUP BY author_id
-            )
+                author_id,
+                total_msgs,
+                kills,
+                ROUND(kills * 100.0 / NULLIF(total_msgs, 0), 1) as kill_rate,
+                msgs_with_prev,
+                revivals,
+                ROW_NUMBER() OVER (
+                    ORDER BY total_msgs >= 50 DESC, kills * 100.0 / NULLIF(total_msgs, 0) DESC, author_id
+                ) as kill_rank,
+                ROW_NUMBER() OVER (ORDER BY msgs_with_prev > 0 DESC, revivals DESC, author_id) as revive_rank
+            FROM author_stats
+        )
+        SELECT *
+        FROM ranked
+        WHERE kill_rank <= 10 OR revive_rank <= 10
+    """)
+    convo_killers = sorted(
+        (r for r in neighbor_stats if r['kill_rank'] <= 10 and r['total_msgs'] >= 50),
+        key=lambda r: r['kill_rank'],
+    )
+    revivers = sorted(
+        (r for r in neighbor_stats if r['revive_rank'] <= 10 and r['msgs_with_prev'] > 0),
+        key=lambda r: r['revive_rank'],
+    )
+
+    report.write(subsection("1.3 CONVERSATION KILLERS"))
+    report.write("Users whose messages are followed by 30+ min of silence:\n\n")
+    report.write("The 'Buzzkill' Leaderboard:\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['kill_rate']:.1f}% of messages killed the chat ({u['kills']} times)\n"
+        for i, u in enumerate(convo_killers[:10], 1)
+    ))
+
+    report.write(subsection("1.4 CONVERSATION REVIVERS"))
+    report.write("The 'Spark Plug' Award - Who brings dead chats back to life:\n")
+    report.write("(First message after 1+ hour of silence)\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['revivals']} revivals\n"
+        for i, u in enumerate(revivers[:10], 1)
+    ))
+
+    # 1.5 Conversation Catalysts
+    report.write(subsection("1.5 CONVERSATION CATALYSTS"))
+    report.write("Who sparks actual conversations (not just breaks silence)?\n\n")
+
+    # Walk each channel once in time order; a sliding window tracks the
+    # sparks whose 30-minute follow-up window is still open.
+    channel_msgs = run_query(conn, """
+        SELECT channel_id, author_id, created_at, created_at_jd
+        FROM human_messages
+        ORDER BY channel_id, created_at
+    """)
+    spark_stats = defaultdict(lambda: {'attempts': 0, 'ignitions': 0, 'chain_total': 0})
+    for spark in find_sparks(channel_msgs):
+        stats = spark_stats[spark['author_id']]
+        stats['attempts'] += 1
+        stats['chain_total'] += spark['follow_ups']
+        if spark['follow_ups'] >= 5 and len(spark['responders']) >= 2:
+            stats['ignitions'] += 1
+
+    catalysts = heapq.nlargest(
+        10,
+        (
+            {
+                'author_id': author_id,
+                'successful_ignitions': stats['ignitions'],
+                'success_rate': stats['ignitions'] * 100.0 / stats['attempts'],
+                'avg_chain_length': stats['chain_total'] / stats['attempts'],
+            }
+            for author_id, stats in spark_stats.items()
+            if stats['attempts'] >= 5
+        ),
+        key=itemgetter('successful_ignitions'),
+    )
+
+    report.write("'Life of the Party' - Most successful conversation starters:\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['successful_ignitions']} ignitions ({u['success_rate']:.1f}% success, avg {u['avg_chain_length']:.1f} msgs)\n"
+        for i, u in enumerate(catalysts[:10], 1)
+    ))
+
+    return report.getvalue()
+
+
+def social_graph_insights(conn, usernames):
+    """Part 2: social butterflies, reciprocity and best friends."""
+    report = io.StringIO()
+
+    report.write(section("PART 2: SOCIAL GRAPH INSIGHTS"))
+
+    # 2.1 Social Butterfly Score
+    report.write(subsection("2.1 SOCIAL BUTTERFLY SCORE"))
+
+    # Dedupe reply and mention edges in a hash set rather than a SQL
+    # UNION, then count distinct partners per user.
+    edges = set(conn.execute(text("SELECT replier_id, orig_author_id FROM human_replies")))
+    edges.update(conn.execute(text("""
+        SELECT m.author_id, mm.mentioned_user_id
+        FROM human_messages m
+        JOIN message_mentions mm ON m.id = mm.message_id
+        JOIN users u2 ON mm.mentioned_user_id = u2.id
+        WHERE u2.is_bot = 0 AND m.author_id != mm.mentioned_user_id
+    """)))
+    degree = Counter(author_id for author_id, _ in edges)
+
+    butterflies = [
+        {'author_id': author_id, 'unique_interactions': count}
+        for author_id, count in heapq.nsmallest(10, degree.items(), key=lambda x: (-x[1], x[0]))
+    ]
+    loners = [
+        {'author_id': author_id, 'unique_interactions': count}
+        for author_id, count in heapq.nsmallest(5, degree.items(), key=lambda x: (x[1], x[0]))
+    ]
+
+    total_humans = conn.execute(text("SELECT COUNT(*) FROM users WHERE is_bot = 0")).scalar() or 1
+    report.write(f"Who talks to the most different people? (out of {total_humans} humans)\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['unique_interactions']} people "
+        f"({u['unique_interactions'] / total_humans * 100:.0f}% of server)\n"
+        for i, u in enumerate(butterflies, 1)
+    ))
+
+    # The loners
+    report.write("\nThe 'Selective Socializers' (fewest unique interactions):\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: only {u['unique_interactions']} people\n"
+        for i, u in enumerate(loners, 1)
+    ))
+
+    # 2.2 Reciprocity Index
+    report.write(subsection("2.2 RECIPROCITY INDEX"))
+
+    reciprocity = run_query(conn, """
+        SELECT * FROM (
+            SELECT user_lo as user_a, user_hi as user_b, lo_to_hi as a_to_b, hi_to_lo as b_to_a
+            FROM pair_year_totals
+            WHERE lo_to_hi >= 10
+            UNION ALL
+            SELECT user_hi as user_a, user_lo as user_b, hi_to_lo as a_to_b, lo_to_hi as b_to_a
+            FROM pair_year_totals
+            WHERE hi_to_lo >= 10
+        )
+        ORDER BY ABS(a_to_b - b_to_a) DESC
+        LIMIT 10
+    """)
+
+    report.write("Most UNBALANCED relationships (one-sided attention):\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[r['user_a']]} -> {usernames[r['user_b']]}: {r['a_to_b']} replies vs {r['b_to_a']} back (imbalance: {abs(r['a_to_b'] - r['b_to_a'])})\n"
+        for i, r in enumerate(reciprocity[:10], 1)
+    ))
+
+    # Most balanced
+    report.write(subsection("2.3 BEST FRIENDS FOREVER"))
+    bffs = run_query(conn, """
+        SELECT
+            user_lo as user_1,
+            user_hi as user_2,
+            lo_to_hi as a_to_b,
+            hi_to_lo as b_to_a,
+            total
+        FROM pair_year_totals
+        WHERE total >= 20
+        ORDER BY total DESC, ABS(lo_to_hi - hi_to_lo) ASC
+        LIMIT 10
+    """)
+
+    report.write("Strongest friendships (most mutual exchanges):\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[p['user_1']]} <-> {usernames[p['user_2']]}: {p['total']} total ({p['a_to_b']} / {p['b_to_a']})\n"
+        for i, p in enumerate(bffs[:10], 1)
+    ))
+
+    return report.getvalue()
+
+
+def behavioral_patterns(conn, usernames):
+    """Part 3: consistency, streaks, ghosts and channel loyalty."""
+    report = io.StringIO()
+
+    report.write(section("PART 3: BEHAVIORAL PATTERNS"))
+
+    # 3.1 Consistency Score
+    report.write(subsection("3.1 CONSISTENCY SCORE"))
+
+    # Consistency (3.1) and ghosting (3.3) both walk each user's messages
+    # in time order, so aggregate them together in one pass.
+    conn.execute(text("DROP TABLE IF EXISTS temp.author_stats"))
+    conn.execute(text("""
+        CREATE TEMP TABLE author_stats AS
+        WITH ordered AS (
             SELECT
-                u.username,
-                us.avg_daily,
-                us.active_days,
-                us.total_msgs,
-                ROUND(us.total_msgs * 1.0 / us.active_days, 1) as msgs_per_active_day
-            FROM user_stats us
-            JOIN users u ON us.author_id = u.id
-            WHERE us.active_days >= 10
-            ORDER BY us.active_days DESC
-            LIMIT 15
-        """)
-
-        report.append("Most CONSISTENT contributors (most active days):\n\n")
-        for i, u in enumerate(consistency[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['active_days']} days active, {u['msgs_per_active_day']:.1f} msgs/day\n")
-
-        # 3.2 Longest Streaks
-        report.append(subsection("3.2 LONGEST STREAK CHAMPIONS"))
-
-        # This requires a more complex query - we'll use a gaps and islands approach
-        streaks = run_query(conn, """
-            WITH daily_activity AS (
-                SELECT DISTINCT
-                    m.author_id,
-                    DATE(m.created_at) as activity_date
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-            ),
-            with_row_num AS (
-                SELECT
-                    author_id,
-                    activity_date,
-                    julianday(activity_date) - ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY activity_date) as grp
-                FROM daily_activity
-            ),
-            streaks AS (
-                SELECT
-                    author_id,
-                    MIN(activity_date) as streak_start,
-                    MAX(activity_date) as streak_end,
-                    COUNT(*) as streak_length
-                FROM with_row_num
-                GROUP BY author_id, grp
-            )
+                author_id,
+                created_at_jd,
+                DATE(created_at) as msg_date,
+                LAG(created_at_jd) OVER (PARTITION BY author_id ORDER BY created_at) as prev_jd
+            FROM human_messages
+        )
+        SELECT
+            author_id,
+            COUNT(DISTINCT msg_date) as active_days,
+            COUNT(*) as total_msgs,
+            MAX(created_at_jd - prev_jd) as longest_gap,
+            AVG(created_at_jd - prev_jd) as avg_gap
+        FROM ordered
+        GROUP BY author_id
+    """))
+
+    consistency = run_query(conn, """
+        SELECT
+            author_id,
+            active_days,
+            total_msgs,
+            ROUND(total_msgs * 1.0 / active_days, 1) as msgs_per_active_day
+        FROM author_stats
+        WHERE active_days >= 10
+        ORDER BY active_days DESC
+        LIMIT 15
+    """)
+
+    report.write("Most CONSISTENT contributors (most active days):\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['active_days']} days active, {u['msgs_per_active_day']:.1f} msgs/day\n"
+        for i, u in enumerate(consistency[:10], 1)
+    ))
+
+    # 3.2 Longest Streaks
+    report.write(subsection("3.2 LONGEST STREAK CHAMPIONS"))
+
+    # Gaps and islands in one linear pass over each user's active days
+    # (julian day numbers), ordered by user and day.
+    active_days = conn.execute(text("""
+        SELECT DISTINCT author_id, CAST(created_at_jd + 0.5 AS INTEGER) as day
+        FROM human_messages
+        ORDER BY author_id, day
+    """))
+    best = {}
+    prev_author = prev_day = None
+    for author_id, day in active_days:
+        if author_id == prev_author and day == prev_day + 1:
+            length += 1
+        else:
+            length = 1
+        if length > best.get(author_id, 0):
+            best[author_id] = length
+        prev_author, prev_day = author_id, day
+
+    streaks = [
+        {'author_id': author_id, 'longest_streak': length}
+        for author_id, length in heapq.nsmallest(10, best.items(), key=lambda x: (-x[1], x[0]))
+    ]
+
+    report.write("Longest consecutive days with activity:\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['longest_streak']} day streak!\n"
+        for i, u in enumerate(streaks[:10], 1)
+    ))
+
+    # 3.3 Ghost Probability
+    report.write(subsection("3.3 GHOST PROBABILITY"))
+
+    ghosts = run_query(conn, """
+        SELECT
+            author_id,
+            longest_gap as longest_absence_days,
+            ROUND(avg_gap, 1) as avg_gap_days
+        FROM author_stats
+        WHERE total_msgs - 1 >= 20
+        ORDER BY longest_absence_days DESC
+        LIMIT 10
+    """)
+
+    report.write("Longest disappearances (most likely to ghost):\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['longest_absence_days']:.0f} days gone at longest\n"
+        for i, u in enumerate(ghosts[:10], 1)
+    ))
+
+    # 3.4 Channel Loyalty
+    report.write(subsection("3.4 CHANNEL LOYALTY"))
+
+    loyalty = run_query(conn, """
+        WITH user_channel_counts AS MATERIALIZED (
             SELECT
-                u.username,
-                MAX(streak_length) as longest_streak,
-                (SELECT streak_start FROM streaks s2 WHERE s2.author_id = s.author_id ORDER BY streak_length DESC LIMIT 1) as best_streak_start
-            FROM streaks s
-            JOIN users u ON s.author_id = u.id
-            GROUP BY s.author_id
-            ORDER BY longest_streak DESC
-            LIMIT 10
-        """)
-
-        report.append("Longest consecutive days with activity:\n\n")
-        for i, u in enumerate(streaks[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['longest_streak']} day streak!\n")
-
-        # 3.3 Ghost Probability
-        report.append(subsection("3.3 GHOST PROBABILITY"))
-
-        ghosts = run_query(conn, """
-            WITH user_gaps AS (
-                SELECT
-                    m.author_id,
-                    m.created_at,
-                    LAG(m.created_at) OVER (PARTITION BY m.author_id ORDER BY m.created_at) as prev_msg,
-                    julianday(m.created_at) - julianday(LAG(m.created_at) OVER (PARTITION BY m.author_id ORDER BY m.created_at)) as gap_days
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-            )
+                cys.user_id as author_id,
+                cys.channel_id,
+                c.name as channel_name,
+                cys.msgs
+            FROM channel_year_totals cys
+            JOIN channels c ON cys.channel_id = c.id
+        ),
+        user_totals AS MATERIALIZED (
+            SELECT author_id, SUM(msgs) as total FROM user_channel_counts GROUP BY author_id
+        ),
+        user_home AS (
             SELECT
-                u.username,
-                MAX(gap_days) as longest_absence_days,
-                ROUND(AVG(gap_days), 1) as avg_gap_days
-            FROM user_gaps ug
-            JOIN users u ON ug.author_id = u.id
-            WHERE gap_days IS NOT NULL
-            GROUP BY ug.author_id
-            HAVING COUNT(*) >= 20
-            ORDER BY longest_absence_days DESC
-            LIMIT 10
-        """)
-
-        report.append("Longest disappearances (most likely to ghost):\n\n")
-        for i, u in enumerate(ghosts[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['longest_absence_days']:.0f} days gone at longest\n")
-
-        # 3.4 Channel Loyalty
-        report.append(subsection("3.4 CHANNEL LOYALTY"))
-
-        loyalty = run_query(conn, """
-            WITH user_channel_counts AS (
-                SELECT
-                    m.author_id,
-                    m.channel_id,
-                    c.name as channel_name,
-                    COUNT(*) as msgs
-                FROM messages m
-                JOIN channels c ON m.channel_id = c.id
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY m.author_id, m.channel_id
-            ),
-            user_totals AS (
-                SELECT author_id, SUM(msgs) as total FROM user_channel_counts GROUP BY author_id
-            ),
-            user_home AS (
-                SELECT
-                    ucc.author_id,
-                    ucc.channel_name as home_channel,
-                    ucc.msgs as home_msgs,
-                    ut.total,
-                    ROUND(ucc.msgs * 100.0 / ut.total, 1) as home_pct,
-                    ROW_NUMBER() OVER (PARTITION BY ucc.author_id ORDER BY ucc.msgs DESC) as rn
-                FROM user_channel_counts ucc
-                JOIN user_totals ut ON ucc.author_id = ut.author_id
-            )
-            SELECT u.username, uh.home_channel, uh.home_msgs, uh.total, uh.home_pct
-            FROM user_home uh
-            JOIN users u ON uh.author_id = u.id
-            WHERE uh.rn = 1 AND uh.total >= 50
-            ORDER BY uh.home_pct DESC
-            LIMIT 15
-        """)
-
-        report.append("Most loyal to their 'home' channel:\n\n")
-        for i, u in enumerate(loyalty[:10], 1):
-            report.append(f"  {i}. {u['username']}: #{u['home_channel']} ({u['home_pct']:.1f}% of {u['total']} msgs)\n")
-
-        report.append("\nMost spread out (least loyal):\n")
-        spread = sorted(loyalty, key=lambda x: x['home_pct'])[:5]
-        for i, u in enumerate(spread, 1):
-            report.append(f"  {i}. {u['username']}: only {u['home_pct']:.1f}% in #{u['home_channel']}\n")
-
-        # =====================================================================
-        # PART 4: ENGAGEMENT QUALITY
-        # =====================================================================
-        report.append(section("PART 4: ENGAGEMENT QUALITY"))
-
-        # 4.1 Engagement Magnetism
-        report.append(subsection("4.1 ENGAGEMENT MAGNETISM"))
-
-        magnetism = run_query(conn, """
-            WITH user_msgs AS (
-                SELECT author_id, COUNT(*) as sent
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY author_id
-            ),
-            replies_received AS (
-                SELECT orig.author_id, COUNT(*) as received
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u ON orig.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY orig.author_id
-            ),
-            mentions_received AS (
-                SELECT mentioned_user_id as author_id, COUNT(*) as received
-                FROM message_mentions mm
-                JOIN users u ON mm.mentioned_user_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY mentioned_user_id
-            )
+                ucc.author_id,
+                ucc.channel_name as home_channel,
+                ucc.msgs as home_msgs,
+                ut.total,
+                ROUND(ucc.msgs * 100.0 / ut.total, 1) as home_pct,
+                ROW_NUMBER() OVER (PARTITION BY ucc.author_id ORDER BY ucc.msgs DESC) as rn
+            FROM user_channel_counts ucc
+            JOIN user_totals ut ON ucc.author_id = ut.author_id
+        )
+        SELECT author_id, home_channel, home_msgs, total, home_pct
+        FROM user_home
+        WHERE rn = 1 AND total >= 50
+    """)
+    loyal = heapq.nlargest(10, loyalty, key=itemgetter('home_pct'))
+    spread = heapq.nsmallest(5, loyalty, key=itemgetter('home_pct'))
+
+    report.write("Most loyal to their 'home' channel:\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: #{u['home_channel']} ({u['home_pct']:.1f}% of {u['total']} msgs)\n"
+        for i, u in enumerate(loyal, 1)
+    ))
+
+    report.write("\nMost spread out (least loyal):\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: only {u['home_pct']:.1f}% in #{u['home_channel']}\n"
+        for i, u in enumerate(spread, 1)
+    ))
+
+    return report.getvalue()
+
+
+def engagement_quality(conn, usernames):
+    """Part 4: engagement magnetism and viral messages."""
+    report = io.StringIO()
+
+    report.write(section("PART 4: ENGAGEMENT QUALITY"))
+
+    # 4.1 Engagement Magnetism
+    report.write(subsection("4.1 ENGAGEMENT MAGNETISM"))
+
+    magnetism = run_query(conn, """
+        WITH user_msgs AS MATERIALIZED (
+            SELECT author_id, COUNT(*) as sent
+            FROM human_messages
+            GROUP BY author_id
+        ),
+        replies_received AS MATERIALIZED (
+            -- All replies, bots' and self-replies included, like mentions
+            SELECT orig.author_id, COUNT(*) as received
+            FROM messages m
+            JOIN human_messages orig ON m.reply_to_message_id = orig.id
+            GROUP BY orig.author_id
+        ),
+        mentions_received AS MATERIALIZED (
+            SELECT mentioned_user_id as author_id, COUNT(*) as received
+            FROM message_mentions mm
+            JOIN users u ON mm.mentioned_user_id = u.id
+            WHERE u.is_bot = 0
+            GROUP BY mentioned_user_id
+        ),
+        per_user AS (
             SELECT
-                u.username,
+                um.author_id,
                 um.sent,
                 COALESCE(rr.received, 0) as replies_received,
                 COALESCE(mr.received, 0) as mentions_received,
                 COALESCE(rr.received, 0) + COALESCE(mr.received, 0) as total_engagement,
                 ROUND((COALESCE(rr.received, 0) + COALESCE(mr.received, 0)) * 1.0 / um.sent, 2) as engagement_ratio
             FROM user_msgs um
-            JOIN users u ON um.author_id = u.id
             LEFT JOIN replies_received rr ON um.author_id = rr.author_id
             LEFT JOIN mentions_received mr ON um.author_id = mr.author_id
             WHERE um.sent >= 50
-            ORDER BY engagement_ratio DESC
-            LIMIT 15
-        """)
-
-        report.append("Who generates the most engagement per message?\n")
-        report.append("(replies + mentions received / messages sent)\n\n")
-        for i, u in enumerate(magnetism[:10], 1):
-            report.append(f"  {i}. {u['username']}: {u['engagement_ratio']:.2f} engagement/msg ({u['total_engagement']} from {u['sent']} msgs)\n")
-
-        report.append("\nLowest engagement (needs more love):\n")
-        low_engage = sorted(magnetism, key=lambda x: x['engagement_ratio'])[:5]
-        for i, u in enumerate(low_engage, 1):
-            report.append(f"  {i}. {u['username']}: {u['engagement_ratio']:.2f} engagement/msg\n")
-
-        # 4.2 Viral Messages
-        report.append(subsection("4.2 VIRAL MESSAGES"))
-
-        viral = run_query(conn, """
+        )
+        SELECT * FROM per_user
+    """)
+    high_engage = heapq.nlargest(10, magnetism, key=itemgetter('engagement_ratio'))
+    low_engage = heapq.nsmallest(5, magnetism, key=itemgetter('engagement_ratio'))
+
+    report.write("Who generates the most engagement per message?\n")
+    report.write("(replies + mentions received / messages sent)\n\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['engagement_ratio']:.2f} engagement/msg ({u['total_engagement']} from {u['sent']} msgs)\n"
+        for i, u in enumerate(high_engage, 1)
+    ))
+
+    report.write("\nLowest engagement (needs more love):\n")
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['engagement_ratio']:.2f} engagement/msg\n"
+        for i, u in enumerate(low_engage, 1)
+    ))
+
+    # 4.2 Viral Messages
+    report.write(subsection("4.2 VIRAL MESSAGES"))
+
+    viral = run_query(conn, """
+        WITH reply_counts AS MATERIALIZED (
+            SELECT reply_to_message_id as orig_id, COUNT(*) as reply_count
+            FROM messages
+            WHERE reply_to_message_id IS NOT NULL
+            GROUP BY reply_to_message_id
+        )
+        SELECT
+            m.author_id,
+            m.content,
+            c.name as channel,
+            m.created_at,
+            rc.reply_count
+        FROM reply_counts rc
+        JOIN human_messages m ON m.id = rc.orig_id
+        JOIN channels c ON m.channel_id = c.id
+        ORDER BY rc.reply_count DESC
+        LIMIT 5
+    """)
+
+    report.write("Messages that sparked the most replies:\n\n")
+    for i, v in enumerate(viral, 1):
+        content_preview = v['content'][:80] + "..." if len(v['content']) > 80 else v['content']
+        content_preview = content_preview.replace('\n', ' ')
+        report.write(f"  {i}. [{v['reply_count']} replies] {usernames[v['author_id']]} in #{v['channel']}:\n")
+        report.write(f"     \"{content_preview}\"\n\n")
+
+    return report.getvalue()
+
+
+def personal_wrapped_stats(conn, usernames):
+    """Part 5: personal wrapped stats for the most active users."""
+    report = io.StringIO()
+
+    report.write(section("PART 5: PERSONAL WRAPPED STATS"))
+
+    for statement in WRAPPED_STATS_STATEMENTS:
+        conn.execute(statement)
+
+    # Top 10 users by message count, all stats in a single round-trip
+    for s in run_query(conn, USER_WRAPPED_STATS):
+        percentile = round((1 - s['rank'] / s['total_users']) * 100)
+        report.write(f"\n{'~'*60}\n")
+        report.write(f"  {usernames[s['author_id']]}'s Year in Review\n")
+        report.write(f"{'~'*60}\n")
+        report.write(f"\n  You were in the TOP {percentile}% of messagers!\n")
+        report.write(f"  Total messages: {s['total_msgs']:,}\n")
+        report.write(f"\n  Your favorite channel: #{s['fav_channel']} ({s['fav_channel_pct']:.1f}% of your messages)\n")
+        if s['best_friend_id']:
+            report.write(f"  Your #1 conversation partner: {usernames[s['best_friend_id']]} ({s['bf_exchanges']} exchanges)\n")
+        report.write(f"  You talked to {s['unique_convos']} different people\n")
+        report.write(f"\n  You were mentioned {s['times_mentioned']} times by {s['by_people']} people\n")
+        report.write(f"  Your busiest day: {s['busiest_date']} ({s['busiest_count']} messages!)\n")
+        report.write(f"  You asked {s['questions_asked']} questions\n")
+        report.write(f"  Late night messages (12am-5am): {s['late_night']}\n")
+        report.write(f"  Longest message: {s['longest_msg']} characters\n")
+
+    return report.getvalue()
+
+
+def fun_quirky_awards(conn, usernames):
+    """Part 6: fun quirky awards."""
+    report = io.StringIO()
+
+    report.write(section("PART 6: FUN QUIRKY AWARDS"))
+
+    # Every award below is a per-user aggregate over the same messages,
+    # so compute them all in a single scan.
+    conn.execute(text("DROP TABLE IF EXISTS temp.quirky_stats"))
+    conn.execute(text("""
+        CREATE TEMP TABLE quirky_stats AS
+        SELECT
+            author_id,
+            COUNT(*) as total,
+            SUM(lol_count + lmao_count + haha_count + hehe_count) as laugh_count,
+            SUM(link_count) as link_count,
+            SUM(char_count > 0) as nonempty,
+            AVG(NULLIF(char_count, 0)) as avg_length,
+            MAX(char_count) as max_length,
+            SUM(created_hour BETWEEN 0 AND 5) as late_msgs
+        FROM human_messages
+        GROUP BY author_id
+    """))
+
+    # LOL Champion
+    report.write(subsection("THE 'LOL' CHAMPION"))
+    lol = run_query(conn, """
+        SELECT author_id, laugh_count
+        FROM quirky_stats
+        ORDER BY laugh_count DESC
+        LIMIT 5
+    """)
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['laugh_count']} lols/lmaos/hahas\n"
+        for i, u in enumerate(lol[:5], 1)
+    ))
+
+    # Link Sharer
+    report.write(subsection("LINK SHARER CHAMPION"))
+    links = run_query(conn, """
+        SELECT author_id, link_count
+        FROM quirky_stats
+        ORDER BY link_count DESC
+        LIMIT 5
+    """)
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['link_count']} links shared\n"
+        for i, u in enumerate(links[:5], 1)
+    ))
+
+    # The Rambler
+    report.write(subsection("THE RAMBLER (Longest Avg Messages)"))
+    rambler = run_query(conn, """
+        SELECT author_id, ROUND(avg_length, 1) as avg_length, max_length
+        FROM quirky_stats
+        WHERE nonempty >= 50
+        ORDER BY avg_length DESC
+        LIMIT 5
+    """)
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['avg_length']:.0f} chars avg (max: {u['max_length']})\n"
+        for i, u in enumerate(rambler[:5], 1)
+    ))
+
+    # The Succinct One
+    report.write(subsection("THE SUCCINCT ONE (Shortest Avg Messages)"))
+    succinct = run_query(conn, """
+        SELECT author_id, ROUND(avg_length, 1) as avg_length
+        FROM quirky_stats
+        WHERE nonempty >= 50
+        ORDER BY avg_length ASC
+        LIMIT 5
+    """)
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['avg_length']:.0f} chars avg\n"
+        for i, u in enumerate(succinct[:5], 1)
+    ))
+
+    # Night Owl vs Early Bird
+    report.write(subsection("NIGHT OWL CHAMPION (12am-5am)"))
+    night_owl = run_query(conn, """
+        SELECT
+            author_id,
+            late_msgs,
+            total,
+            ROUND(late_msgs * 100.0 / total, 1) as pct
+        FROM quirky_stats
+        WHERE total >= 50
+        ORDER BY pct DESC
+        LIMIT 5
+    """)
+    report.write("".join(
+        f"  {i}. {usernames[u['author_id']]}: {u['pct']:.1f}% of messages after midnight ({u['late_msgs']} msgs)\n"
+        for i, u in enumerate(night_owl[:5], 1)
+    ))
+
+    return report.getvalue()
+
+
+def community_health(conn, usernames):
+    """Part 7: community health."""
+    report = io.StringIO()
+
+    report.write(section("PART 7: COMMUNITY HEALTH"))
+
+    # Activity Concentration
+    report.write(subsection("ACTIVITY CONCENTRATION"))
+    concentration = run_query(conn, """
+        SELECT
+            user_id as author_id,
+            ROUND(total_msgs * 100.0 / SUM(total_msgs) OVER (), 1) as pct,
+            ROUND(
+                SUM(total_msgs) OVER (ORDER BY total_msgs DESC, user_id ROWS UNBOUNDED PRECEDING)
+                * 100.0 / SUM(total_msgs) OVER (),
+                1
+            ) as cumulative_pct,
+            ROW_NUMBER() OVER (ORDER BY total_msgs DESC, user_id) as rn
+        FROM user_year_totals
+        ORDER BY rn
+        LIMIT 5
+    """)
+
+    report.write("How concentrated is the activity?\n\n")
+    report.write("".join(
+        f"  Top {c['rn']}: {usernames[c['author_id']]} - {c['pct']:.1f}% (cumulative: {c['cumulative_pct']:.1f}%)\n"
+        for c in concentration
+    ))
+
+    top3 = concentration[min(3, len(concentration)) - 1]['cumulative_pct'] if concentration else 0.0
+    report.write(f"\n  Top 3 users account for {top3:.1f}% of all messages!\n")
+
+    return report.getvalue()
+
+
+def relationship_superlatives(conn, usernames):
+    """Part 8: relationship superlatives."""
+    report = io.StringIO()
+
+    report.write(section("PART 8: RELATIONSHIP SUPERLATIVES"))
+
+    # Late Night Crew
+    report.write(subsection("THE LATE NIGHT CREW"))
+    late_night_crew = run_query(conn, """
+        WITH late_night_pairs AS (
             SELECT
-                u.username,
-                m.content,
-                c.name as channel,
-                m.created_at,
-                COUNT(r.id) as reply_count
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            JOIN channels c ON m.channel_id = c.id
-            LEFT JOIN messages r ON r.reply_to_message_id = m.id
-            WHERE u.is_bot = 0
-            GROUP BY m.id
-            ORDER BY reply_count DESC
-            LIMIT 5
-        """)
-
-        report.append("Messages that sparked the most replies:\n\n")
-        for i, v in enumerate(viral, 1):
-            content_preview = v['content'][:80] + "..." if len(v['content']) > 80 else v['content']
-            content_preview = content_preview.replace('\n', ' ')
-            report.append(f"  {i}. [{v['reply_count']} replies] {v['username']} in #{v['channel']}:\n")
-            report.append(f"     \"{content_preview}\"\n\n")
+                CASE WHEN replier_id < orig_author_id THEN replier_id ELSE orig_author_id END as user_a,
+                CASE WHEN replier_id < orig_author_id THEN orig_author_id ELSE replier_id END as user_b,
+                COUNT(*) as exchanges
+            FROM human_replies
+            WHERE reply_hour BETWEEN 0 AND 5
+            GROUP BY user_a, user_b
+        )
+        SELECT u1.username as user_1, u2.username as user_2, exchanges
+        FROM late_night_pairs lnp
+        JOIN users u1 ON lnp.user_a = u1.id
+        JOIN users u2 ON lnp.user_b = u2.id
+        ORDER BY exchanges DESC
+        LIMIT 5
+    """)
+
+    report.write("Pairs who chat together after midnight:\n\n")
+    report.write("".join(
+        f"  {i}. {p['user_1']} & {p['user_2']}: {p['exchanges']} late-night exchanges\n"
+        for i, p in enumerate(late_night_crew[:5], 1)
+    ))
+
+    return report.getvalue()
+
+
+SECTIONS = [
+    response_dynamics,
+    social_graph_insights,
+    behavioral_patterns,
+    engagement_quality,
+    personal_wrapped_stats,
+    fun_quirky_awards,
+    community_health,
+    relationship_superlatives,
+]
+
+
+def run_section(engine, section_fn, usernames):
+    """Render one report section on its own pooled connection."""
+    with engine.connect() as conn:
+        return section_fn(conn, usernames)
 
-        # =====================================================================
-        # PART 5: SPOTIFY WRAPPED PERSONAL STATS
-        # =====================================================================
-        report.append(section("PART 5: PERSONAL WRAPPED STATS"))
 
-        # Get active users (top 10 by message count)
-        active_users = run_query(conn, """
-            SELECT u.id, u.username, COUNT(*) as msg_count
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            WHERE u.is_bot = 0
-            GROUP BY u.id
-            HAVING COUNT(*) >= 100
-            ORDER BY msg_count DESC
-            LIMIT 10
-        """)
-
-        for user in active_users:
-            report.append(f"\n{'~'*60}\n")
-            report.append(f"  {user['username']}'s Year in Review\n")
-            report.append(f"{'~'*60}\n")
-
-            stats = run_query(conn, """
-                WITH user_stats AS (
-                    SELECT
-                        COUNT(*) as total_msgs,
-                        MAX(LENGTH(content)) as longest_msg,
-                        SUM(CASE WHEN content LIKE '%?' THEN 1 ELSE 0 END) as questions_asked,
-                        SUM(CASE WHEN CAST(strftime('%H', created_at) AS INTEGER) BETWEEN 0 AND 5 THEN 1 ELSE 0 END) as late_night
-                    FROM messages WHERE author_id = :user_id
-                ),
-                rank_info AS (
-                    SELECT
-                        COUNT(*) + 1 as rank,
-                        (SELECT COUNT(DISTINCT author_id) FROM messages m JOIN users u ON m.author_id = u.id WHERE u.is_bot = 0) as total_users
-                    FROM (
-                        SELECT author_id, COUNT(*) as cnt
-                        FROM messages m JOIN users u ON m.author_id = u.id
-                        WHERE u.is_bot = 0
-                        GROUP BY author_id
-                        HAVING COUNT(*) > (SELECT COUNT(*) FROM messages WHERE author_id = :user_id)
-                    )
-                ),
-                fav_channel AS (
-                    SELECT c.name, COUNT(*) as cnt,
-                           ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM messages WHERE author_id = :user_id), 1) as pct
-                    FROM messages m
-                    JOIN channels c ON m.channel_id = c.id
-                    WHERE m.author_id = :user_id
-                    GROUP BY c.id
-                    ORDER BY cnt DESC LIMIT 1
-                ),
-                best_friend AS (
-                    SELECT u.username, COUNT(*) as exchanges
-                    FROM messages m
-                    JOIN messages orig ON m.reply_to_message_id = orig.id
-                    JOIN users u ON orig.author_id = u.id
-                    WHERE m.author_id = :user_id AND orig.author_id != :user_id AND u.is_bot = 0
-                    GROUP BY orig.author_id
-                    ORDER BY exchanges DESC LIMIT 1
-                ),
-                mentions_info AS (
-                    SELECT COUNT(*) as times_mentioned,
-                           COUNT(DISTINCT m.author_id) as by_people
-                    FROM message_mentions mm
-                    JOIN messages m ON mm.message_id = m.id
-                    WHERE mm.mentioned_user_id = :user_id
-                ),
-                busiest_day AS (
-                    SELECT DATE(created_at) as the_date, COUNT(*) as cnt
-                    FROM messages WHERE author_id = :user_id
-                    GROUP BY DATE(created_at)
-                    ORDER BY cnt DESC LIMIT 1
-                ),
-                unique_people AS (
-                    SELECT COUNT(DISTINCT orig.author_id) as cnt
-                    FROM messages m
-                    JOIN messages orig ON m.reply_to_message_id = orig.id
-                    WHERE m.author_id = :user_id AND orig.author_id != :user_id
-                )
-                SELECT
-                    us.*,
-                    ri.rank, ri.total_users,
-                    fc.name as fav_channel, fc.pct as fav_channel_pct,
-                    bf.username as best_friend, bf.exchanges as bf_exchanges,
-                    mi.times_mentioned, mi.by_people,
-                    bd.the_date as busiest_date, bd.cnt as busiest_count,
-                    up.cnt as unique_convos
-                FROM user_stats us, rank_info ri, fav_channel fc, mentions_info mi, busiest_day bd, unique_people up
-                LEFT JOIN best_friend bf ON 1=1
-            """, {"user_id": user['id']})
-
-            if stats:
-                s = stats[0]
-                percentile = round((1 - s['rank'] / s['total_users']) * 100)
-                report.append(f"\n  You were in the TOP {percentile}% of messagers!\n")
-                report.append(f"  Total messages: {s['total_msgs']:,}\n")
-                report.append(f"\n  Your favorite channel: #{s['fav_channel']} ({s['fav_channel_pct']:.1f}% of your messages)\n")
-                if s['best_friend']:
-                    report.append(f"  Your #1 conversation partner: {s['best_friend']} ({s['bf_exchanges']} exchanges)\n")
-                report.append(f"  You talked to {s['unique_convos']} different people\n")
-                report.append(f"\n  You were mentioned {s['times_mentioned']} times by {s['by_people']} people\n")
-                report.append(f"  Your busiest day: {s['busiest_date']} ({s['busiest_count']} messages!)\n")
-                report.append(f"  You asked {s['questions_asked']} questions\n")
-                report.append(f"  Late night messages (12am-5am): {s['late_night']}\n")
-                report.append(f"  Longest message: {s['longest_msg']} characters\n")
+def generate_report(engine, output_file):
+    """Generate the complete creative year-end review report."""
+    # Sections are written out as soon as they are ready, to the report
+    # file and to stdout, rather than collected into one big string.
+    with engine.connect() as conn, open(output_file, 'w', buffering=1 << 20) as out:
+        streams = (out, sys.stdout)
 
         # =====================================================================
-        # PART 6: FUN QUIRKY AWARDS
+        # SHARED WORKING SET
         # =====================================================================
-        report.append(section("PART 6: FUN QUIRKY AWARDS"))
-
-        # LOL Champion
-        report.append(subsection("THE 'LOL' CHAMPION"))
-        lol = run_query(conn, """
-            SELECT
-                u.username,
-                SUM(
-                    (LENGTH(LOWER(content)) - LENGTH(REPLACE(LOWER(content), 'lol', ''))) / 3 +
-                    (LENGTH(LOWER(content)) - LENGTH(REPLACE(LOWER(content), 'lmao', ''))) / 4 +
-                    (LENGTH(LOWER(content)) - LENGTH(REPLACE(LOWER(content), 'haha', ''))) / 4 +
-                    (LENGTH(LOWER(content)) - LENGTH(REPLACE(LOWER(content), 'hehe', ''))) / 4
-                ) as laugh_count
-            FROM messages m
+        # Almost every section below only looks at messages written by
+        # humans. Filter out bots once into a scratch table instead of
+        # re-joining users in every query.
+        conn.execute(text("DROP TABLE IF EXISTS scratch.human_messages"))
+        conn.execute(text("DROP TABLE IF EXISTS scratch.human_replies"))
+        conn.execute(text(f"""
+            CREATE TABLE scratch.human_messages AS
+            SELECT m.id, m.author_id, m.channel_id, m.created_at,
+                   julianday(m.created_at) AS created_at_jd,
+                   m.reply_to_message_id, m.content, m.char_count, m.created_hour,
+                   m.lol_count, m.lmao_count, m.haha_count, m.hehe_count, m.link_count
+            FROM (
+                SELECT id, author_id, channel_id, created_at, reply_to_message_id, content,
+                       {derived_columns(conn)}
+                FROM messages
+            ) m
             JOIN users u ON m.author_id = u.id
             WHERE u.is_bot = 0
-            GROUP BY m.author_id
-            ORDER BY laugh_count DESC
-            LIMIT 5
-        """)
-        for i, u in enumerate(lol[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['laugh_count']} lols/lmaos/hahas\n")
-
-        # Link Sharer
-        report.append(subsection("LINK SHARER CHAMPION"))
-        links = run_query(conn, """
-            SELECT
-                u.username,
-                SUM(
-                    (LENGTH(content) - LENGTH(REPLACE(content, 'http://', ''))) / 7 +
-                    (LENGTH(content) - LENGTH(REPLACE(content, 'https://', ''))) / 8
-                ) as link_count
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            WHERE u.is_bot = 0
-            GROUP BY m.author_id
-            ORDER BY link_count DESC
-            LIMIT 5
-        """)
-        for i, u in enumerate(links[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['link_count']} links shared\n")
-
-        # The Rambler
-        report.append(subsection("THE RAMBLER (Longest Avg Messages)"))
-        rambler = run_query(conn, """
+        """))
+        conn.execute(text("CREATE INDEX scratch.idx_hm_id ON human_messages(id)"))
+        conn.execute(text("CREATE INDEX scratch.idx_hm_channel_time ON human_messages(channel_id, created_at)"))
+        # Covering index for the per-author scans (activity, streaks,
+        # busiest day): they read only these columns, never the row.
+        conn.execute(text("""
+            CREATE INDEX scratch.idx_hm_author_time
+            ON human_messages(author_id, created_at, created_at_jd, char_count, created_hour)
+        """))
+        conn.execute(text("CREATE INDEX scratch.idx_hm_reply ON human_messages(reply_to_message_id)"))
+
+        # Human-to-human replies (self-replies excluded), shared by the
+        # response, reciprocity, friendship and late-night sections.
+        conn.execute(text("""
+            CREATE TABLE scratch.human_replies AS
             SELECT
-                u.username,
-                ROUND(AVG(LENGTH(content)), 1) as avg_length,
-                MAX(LENGTH(content)) as max_length
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            WHERE u.is_bot = 0 AND LENGTH(content) > 0
-            GROUP BY m.author_id
-            HAVING COUNT(*) >= 50
-            ORDER BY avg_length DESC
-            LIMIT 5
-        """)
-        for i, u in enumerate(rambler[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['avg_length']:.0f} chars avg (max: {u['max_length']})\n")
-
-        # The Succinct One
-        report.append(subsection("THE SUCCINCT ONE (Shortest Avg Messages)"))
-        succinct = run_query(conn, """
-            SELECT
-                u.username,
-                ROUND(AVG(LENGTH(content)), 1) as avg_length
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            WHERE u.is_bot = 0 AND LENGTH(content) > 0
-            GROUP BY m.author_id
-            HAVING COUNT(*) >= 50
-            ORDER BY avg_length ASC
-            LIMIT 5
-        """)
-        for i, u in enumerate(succinct[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['avg_length']:.0f} chars avg\n")
-
-        # Night Owl vs Early Bird
-        report.append(subsection("NIGHT OWL CHAMPION (12am-5am)"))
-        night_owl = run_query(conn, """
-            SELECT
-                u.username,
-                SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 0 AND 5 THEN 1 ELSE 0 END) as late_msgs,
-                COUNT(*) as total,
-                ROUND(SUM(CASE WHEN CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 0 AND 5 THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) as pct
-            FROM messages m
-            JOIN users u ON m.author_id = u.id
-            WHERE u.is_bot = 0
-            GROUP BY m.author_id
-            HAVING COUNT(*) >= 50
-            ORDER BY pct DESC
-            LIMIT 5
-        """)
-        for i, u in enumerate(night_owl[:5], 1):
-            report.append(f"  {i}. {u['username']}: {u['pct']:.1f}% of messages after midnight ({u['late_msgs']} msgs)\n")
+                m.author_id AS replier_id,
+                orig.author_id AS orig_author_id,
+                m.channel_id,
+                m.created_at AS reply_time,
+                m.created_hour AS reply_hour,
+                orig.created_at AS orig_time,
+                (m.created_at_jd - orig.created_at_jd) * 1440.0 AS response_minutes
+            FROM human_messages m
+            JOIN human_messages orig ON m.reply_to_message_id = orig.id
+            WHERE m.author_id != orig.author_id
+        """))
+        conn.execute(text("CREATE INDEX scratch.idx_hr_replier ON human_replies(replier_id)"))
+        conn.execute(text("CREATE INDEX scratch.idx_hr_orig_author ON human_replies(orig_author_id)"))
+        conn.execute(text("CREATE INDEX scratch.idx_hr_pair ON human_replies(replier_id, orig_author_id)"))
+
+        # The year stats snapshots are kept per server; the report covers
+        # the whole database, so roll them up across servers once.
+        year_totals = YEAR_TOTALS_FROM_SNAPSHOTS if year_stats_current(conn) else YEAR_TOTALS_FROM_MESSAGES
+        for table, query in year_totals.items():
+            conn.execute(text(f"DROP TABLE IF EXISTS scratch.{table}"))
+            conn.execute(text(f"CREATE TABLE scratch.{table} AS {query}"))
+
+        # Give the planner real row counts for the scratch working set
+        # before the sections start joining it.
+        conn.execute(text("ANALYZE scratch"))
+        conn.commit()
 
         # =====================================================================
-        # PART 7: COMMUNITY HEALTH
+        # HEADER
         # =====================================================================
-        report.append(section("PART 7: COMMUNITY HEALTH"))
-
-        # Activity Concentration
-        report.append(subsection("ACTIVITY CONCENTRATION"))
-        concentration = run_query(conn, """
-            WITH ranked AS (
-                SELECT
-                    u.username,
-                    COUNT(*) as msgs,
-                    SUM(COUNT(*)) OVER () as total,
-                    ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC) as rn
-                FROM messages m
-                JOIN users u ON m.author_id = u.id
-                WHERE u.is_bot = 0
-                GROUP BY m.author_id
-            )
+        server = run_query(conn, "SELECT name, member_count FROM servers LIMIT 1")
+        server_name = server[0]['name'] if server else "Unknown Server"
+
+        # Sections return bare user ids; resolve names from one lookup
+        # table instead of joining users in every query.
+        usernames = dict(conn.execute(text("SELECT id, username FROM users")).all())
+
+        # Get stats excluding bots
+        stats = run_query(conn, """
             SELECT
-                username,
-                msgs,
-                total,
-                ROUND(msgs * 100.0 / total, 1) as pct,
-                rn
-            FROM ranked
-            ORDER BY rn
-            LIMIT 5
-        """)
-
-        report.append("How concentrated is the activity?\n\n")
-        cumulative = 0
-        for c in concentration:
-            cumulative += c['pct']
-            report.append(f"  Top {c['rn']}: {c['username']} - {c['pct']:.1f}% (cumulative: {cumulative:.1f}%)\n")
-
-        report.append(f"\n  Top 3 users account for {sum(c['pct'] for c in concentration[:3]):.1f}% of all messages!\n")
+                (SELECT COUNT(*) FROM human_messages) as total_messages,
+                (SELECT COUNT(DISTINCT author_id) FROM human_messages) as active_users,
+                (SELECT COUNT(*) FROM users WHERE is_bot = 0) as total_users,
+                (SELECT COUNT(*) FROM users WHERE is_bot = 1) as bot_count
+        """)[0]
+
+        write_all(streams, f"""
+################################################################################
+#                                                                              #
+#            {server_name.upper()} - YEAR IN REVIEW 2024                       #
+#                        CREATIVE ANALYTICS EDITION                            #
+#                                                                              #
+################################################################################
+
+Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+Server: {server_name}
+
+Total Messages (humans only): {stats['total_messages']:,}
+Active Human Users: {stats['active_users']}
+(Excluded {stats['bot_count']} bots from all analytics)
+""")
 
         # =====================================================================
-        # PART 8: RELATIONSHIP SUPERLATIVES
+        # SECTIONS
         # =====================================================================
-        report.append(section("PART 8: RELATIONSHIP SUPERLATIVES"))
-
-        # Late Night Crew
-        report.append(subsection("THE LATE NIGHT CREW"))
-        late_night_crew = run_query(conn, """
-            WITH late_night_pairs AS (
-                SELECT
-                    CASE WHEN m.author_id < orig.author_id THEN m.author_id ELSE orig.author_id END as user_a,
-                    CASE WHEN m.author_id < orig.author_id THEN orig.author_id ELSE m.author_id END as user_b,
-                    COUNT(*) as exchanges
-                FROM messages m
-                JOIN messages orig ON m.reply_to_message_id = orig.id
-                JOIN users u1 ON m.author_id = u1.id
-                JOIN users u2 ON orig.author_id = u2.id
-                WHERE u1.is_bot = 0 AND u2.is_bot = 0
-                  AND m.author_id != orig.author_id
-                  AND CAST(strftime('%H', m.created_at) AS INTEGER) BETWEEN 0 AND 5
-                GROUP BY user_a, user_b
-            )
-            SELECT u1.username as user_1, u2.username as user_2, exchanges
-            FROM late_night_pairs lnp
-            JOIN users u1 ON lnp.user_a = u1.id
-            JOIN users u2 ON lnp.user_b = u2.id
-            ORDER BY exchanges DESC
-            LIMIT 5
-        """)
-
-        report.append("Pairs who chat together after midnight:\n\n")
-        for i, p in enumerate(late_night_crew[:5], 1):
-            report.append(f"  {i}. {p['user_1']} & {p['user_2']}: {p['exchanges']} late-night exchanges\n")
+        # The sections only read the shared working set, so run them in
+        # parallel on their own connections and stitch them back in order.
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = [pool.submit(run_section, engine, fn, usernames) for fn in SECTIONS]
+            for future in futures:
+                write_all(streams, future.result())
 
         # =====================================================================
         # FOOTER
         # =====================================================================
-        report.append(f"""
+        write_all(streams, f"""
 
 ################################################################################
 #                                                                              #
@@ -975,12 +1214,7 @@ Report generated by Discord SQL Analytics V2
 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """)
 
-    # Write report
-    full_report = "".join(report)
-    with open(output_file, 'w') as f:
-        f.write(full_report)
-
-    print(full_report)
+    print()
     print(f"\n\nReport saved to: {output_file}")
 
 
@@ -990,7 +1224,10 @@ def main():
     parser.add_argument("--output", type=str, default=OUTPUT_FILE, help="Output file")
     args = parser.parse_args()
 
-    if not os.path.exists(args.db):
+    engine = create_review_engine(args.db)
+    try:
+        engine.connect().close()
+    except OperationalError:
         print(f"Error: Database file not found: {args.db}")
         sys.exit(1)
 
@@ -999,8 +1236,10 @@ def main():
     print("(Excluding all bots from analytics)")
     print()
 
-    engine = create_engine(f"sqlite:///{args.db}", echo=False)
-    generate_report(engine, args.output)
+    try:
+        generate_report(engine, args.output)
+    finally:
+        engine.dispose()
 
 
 if __name__ == "__main__":
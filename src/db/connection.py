@@ -2,12 +2,43 @@
 from contextlib import contextmanager
 from typing import Generator
 
-from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 
 from ..config import DATABASE_URL, TEST_DATABASE_URL
 
+# Applied to every new SQLite connection. Analytics queries are read-heavy
+# and aggregate large tables, so favour fewer fsyncs, memory-mapped reads,
+# a bigger page cache and in-memory temp tables over the defaults.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",    # 64 MB
+)
+
+# Rows per multi-row INSERT when an executemany is rewritten into VALUES
+# pages ("insertmanyvalues"), as the bulk_* query helpers rely on.
+INSERT_PAGE_SIZE = 1000
+
+# Compiled statements kept per engine (SQLAlchemy's default is 500). The
+# write path reuses a handful of prebuilt statements; the headroom keeps them
+# from being evicted by report and ad-hoc queries.
+QUERY_CACHE_SIZE = 1200
+
+# Pooled connections kept open: the extractor syncs several channels at
+# once, each on its own session, so channel_concurrency should not exceed
+# POOL_SIZE. Overflow connections cover report queries run alongside a sync.
+POOL_SIZE = 16
+POOL_MAX_OVERFLOW = 16
+
+# Seconds before a pooled connection is replaced, ahead of server or proxy
+# idle timeouts dropping it mid-sync.
+POOL_RECYCLE = 1800
+
 
 def get_engine(test: bool = False) -> Engine:
     """
@@ -19,8 +50,50 @@ def get_engine(test: bool = False) -> Engine:
     Returns:
         SQLAlchemy engine
     """
-    url = TEST_DATABASE_URL if test else DATABASE_URL
-    return create_engine(url, echo=False, pool_pre_ping=True)
+    url = make_url(TEST_DATABASE_URL if test else DATABASE_URL)
+    options = {}
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() == "psycopg2":
+        # INSERTs go through insertmanyvalues; other executemany statements
+        # are grouped with execute_batch instead of one round-trip per row
+        options["executemany_mode"] = "values_plus_batch"
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        # In-memory SQLite gets a SingletonThreadPool, which has no size
+        options.update(
+            pool_size=POOL_SIZE,
+            max_overflow=POOL_MAX_OVERFLOW,
+            pool_recycle=POOL_RECYCLE,
+            # Reuse the most recently returned connection so idle ones age out
+            pool_use_lifo=True,
+        )
+
+    engine = create_engine(
+        url,
+        echo=False,
+        pool_pre_ping=True,
+        query_cache_size=QUERY_CACHE_SIZE,
+        insertmanyvalues_page_size=INSERT_PAGE_SIZE,
+        **options,
+    )
+
+    if engine.url.drivername.startswith("sqlite"):
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+
+    return engine
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Tune a new SQLite connection for analytics workloads."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# Shared by every engine: get_session binds each session it opens, so the
+# factory is built once without holding on to any engine.
+_SessionFactory = sessionmaker(expire_on_commit=False)
 
 
 def get_session_factory(engine: Engine) -> sessionmaker:
@@ -37,10 +110,9 @@ def get_session(engine: Engine) -> Generator[Session, None, None]:
 
     Usage:
         with get_session(engine) as session:
-            session.add(obj)
+            session.execute(stmt)
     """
-    SessionFactory = get_session_factory(engine)
-    session = SessionFactory()
+    session = _SessionFactory(bind=engine)
     try:
         yield session
         session.commit()
@@ -62,15 +134,15 @@ def init_database(engine: Engine, schema_path: str = "schema.sql") -> None:
     with open(schema_path) as f:
         schema_sql = f.read()
 
-    with engine.connect() as conn:
-        # Execute each statement separately
-        for statement in schema_sql.split(';'):
-            statement = statement.strip()
-            if statement:
-                try:
-                    conn.execute(statement)
-                except Exception as e:
-                    # Skip errors for IF NOT EXISTS statements
-                    if "already exists" not in str(e):
-                        print(f"Warning: {e}")
-        conn.commit()
+    # Run the whole script in one go: splitting on ';' breaks statements
+    # that contain semicolons themselves (function bodies, triggers)
+    if engine.dialect.name == "sqlite":
+        raw = engine.raw_connection()
+        try:
+            raw.driver_connection.executescript(schema_sql)
+            raw.commit()
+        finally:
+            raw.close()
+    else:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(schema_sql)
@@ -8,10 +8,13 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -100,6 +103,15 @@ class Message(Base):
     """Discord message model."""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Partial: most messages are not replies
+        Index(
+            "idx_messages_reply_to",
+            "reply_to_message_id",
+            sqlite_where=text("reply_to_message_id IS NOT NULL"),
+            postgresql_where=text("reply_to_message_id IS NOT NULL"),
+        ),
+    )
 
     id = Column(BigInteger, primary_key=True)
     server_id = Column(BigInteger, ForeignKey("servers.id", ondelete="CASCADE"))
@@ -127,6 +139,13 @@ class Message(Base):
 
     word_count = Column(Integer)
     char_count = Column(Integer)
+    created_hour = Column(Integer)
+
+    lol_count = Column(Integer, default=0)
+    lmao_count = Column(Integer, default=0)
+    haha_count = Column(Integer, default=0)
+    hehe_count = Column(Integer, default=0)
+    link_count = Column(Integer, default=0)
 
     # Relationships
     server = relationship("Server", back_populates="messages")
@@ -140,6 +159,10 @@ class MessageMention(Base):
     """User mention in a message."""
 
     __tablename__ = "message_mentions"
+    __table_args__ = (
+        # Mentions of a user, covering the message ids without a table lookup
+        Index("idx_mentions_user", "mentioned_user_id", "message_id"),
+    )
 
     message_id = Column(BigInteger, ForeignKey("messages.id", ondelete="CASCADE"), primary_key=True)
     mentioned_user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
@@ -152,6 +175,17 @@ class Emoji(Base):
     """Emoji model (unicode or custom)."""
 
     __tablename__ = "emojis"
+    __table_args__ = (
+        UniqueConstraint("name", "server_id"),
+        # NULLs never collide in UNIQUE, so unicode emojis are unique by name
+        Index(
+            "idx_emojis_unicode_name",
+            "name",
+            unique=True,
+            sqlite_where=text("server_id IS NULL"),
+            postgresql_where=text("server_id IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     discord_id = Column(BigInteger)
@@ -181,6 +215,43 @@ class Reaction(Base):
     user = relationship("User", back_populates="reactions")
 
 
+class UserYearStats(Base):
+    """Per-user message totals in a server (humans only), refreshed after each sync."""
+
+    __tablename__ = "user_year_stats"
+
+    server_id = Column(BigInteger, ForeignKey("servers.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_msgs = Column(Integer, nullable=False, default=0)
+    longest_msg = Column(Integer, nullable=False, default=0)
+    questions_asked = Column(Integer, nullable=False, default=0)
+    late_night = Column(Integer, nullable=False, default=0)
+
+
+class ChannelYearStats(Base):
+    """Messages per user per channel (humans only), refreshed after each sync."""
+
+    __tablename__ = "channel_year_stats"
+
+    channel_id = Column(BigInteger, ForeignKey("channels.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    server_id = Column(BigInteger, ForeignKey("servers.id", ondelete="CASCADE"), nullable=False)
+    msgs = Column(Integer, nullable=False, default=0)
+
+
+class PairYearStats(Base):
+    """Human-to-human reply counts per unordered user pair in a server, refreshed after each sync."""
+
+    __tablename__ = "pair_year_stats"
+
+    server_id = Column(BigInteger, ForeignKey("servers.id", ondelete="CASCADE"), primary_key=True)
+    user_lo = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    user_hi = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    lo_to_hi = Column(Integer, nullable=False, default=0)
+    hi_to_lo = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+
+
 class SyncState(Base):
     """Track sync progress for incremental updates."""
 
@@ -6,22 +6,33 @@ Works identically with real discord.py client or MockDiscordClient.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Protocol, Optional, AsyncIterator, List, Any, TYPE_CHECKING
+from collections import ChainMap
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Protocol, Optional, AsyncIterator, Dict, List, Set, Any, TYPE_CHECKING
 
 from sqlalchemy.orm import Session
 
 from .db.queries import (
     upsert_server,
-    upsert_user,
-    upsert_server_member,
     upsert_channel,
-    insert_message,
-    insert_mention,
     upsert_emoji,
-    insert_reaction,
+    bulk_upsert_users,
+    bulk_upsert_members,
+    bulk_insert_messages,
+    copy_messages,
+    disable_synchronous_commit,
+    get_server_members,
+    channel_has_messages,
+    bulk_insert_mentions,
+    bulk_insert_reactions,
+    backfill_reply_authors,
+    add_message_columns,
+    backfill_message_columns,
+    create_year_stats_tables,
+    refresh_year_stats,
 )
 
 if TYPE_CHECKING:
@@ -143,6 +154,55 @@ def extract_asset_hash(asset: Optional[Any]) -> Optional[str]:
     return str(asset.key) if asset else None
 
 
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert a datetime to naive UTC, so stored and Discord values compare.
+
+    discord.py timestamps are UTC-aware; SQLite hands stored ones back
+    naive. Naive values are taken to be UTC already.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def user_row(user: UserProtocol) -> dict:
+    """Build the bulk_upsert_users row for a Discord user."""
+    return {
+        "user_id": user.id,
+        "username": user.name,
+        "discriminator": user.discriminator,
+        "global_name": user.global_name,
+        "avatar_hash": extract_asset_hash(user.avatar),
+        "is_bot": user.bot,
+        "created_at": user.created_at,
+    }
+
+
+@dataclass
+class PendingWrites:
+    """Rows collected while syncing a channel, written out in bulk."""
+    # First sync of the channel: the bulk of its history, so load it with COPY
+    first_sync: bool = False
+    users: Dict[int, dict] = field(default_factory=dict)
+    # upsert_emoji arguments by (name, server_id); reactions refer to the key
+    emojis: Dict[tuple, dict] = field(default_factory=dict)
+    messages: List[dict] = field(default_factory=list)
+    mentions: List[dict] = field(default_factory=list)
+    reactions: List[dict] = field(default_factory=list)
+
+    def add_user(self, user: UserProtocol) -> None:
+        """Queue an upsert for a user (latest copy wins)."""
+        self.users[user.id] = user_row(user)
+
+    def clear(self) -> None:
+        """Drop everything queued."""
+        self.users.clear()
+        self.emojis.clear()
+        self.messages.clear()
+        self.mentions.clear()
+        self.reactions.clear()
+
+
 @dataclass
 class ExtractionStats:
     """Statistics from an extraction run."""
@@ -177,8 +237,15 @@ class DiscordExtractor:
     Works with either real discord.py client or MockDiscordClient.
     """
 
-    # Number of messages before committing transaction
-    COMMIT_INTERVAL = 100
+    # Number of messages buffered before writing them in bulk and committing.
+    # Large, so a channel costs few commits; the buffer is flushed and
+    # committed in one go, so concurrent channels never wait on each other.
+    COMMIT_INTERVAL = 10000
+
+    # Messages per batch handed from the history reader to the writer, and
+    # how many batches the reader may get ahead
+    HISTORY_BATCH_SIZE = 500
+    HISTORY_QUEUE_SIZE = 4
 
     def __init__(
         self,
@@ -186,6 +253,7 @@ class DiscordExtractor:
         engine: "Engine",
         sync_days: int = 7,
         fetch_reactions: bool = True,
+        channel_concurrency: int = 8,
     ):
         """
         Initialize the extractor.
@@ -195,11 +263,21 @@ class DiscordExtractor:
             engine: SQLAlchemy database engine
             sync_days: Number of days of history to sync
             fetch_reactions: Whether to fetch detailed reaction data
+            channel_concurrency: Maximum number of channels synced at once.
+                Each holds its own connection, so keep this at or below
+                the engine's pool size (POOL_SIZE in src.db.connection).
         """
         self.client = client
         self.engine = engine
         self.sync_days = sync_days
         self.fetch_reactions = fetch_reactions
+        self.channel_concurrency = channel_concurrency
+
+        # Users and emojis already written this run, so each is upserted once.
+        # Only committed rows go in: channels sync concurrently on their own
+        # sessions, and may only reference rows the others can see.
+        self._seen_user_ids: Set[int] = set()
+        self._seen_emoji_keys: Dict[tuple, int] = {}
 
         # Statistics
         self.stats = ExtractionStats()
@@ -223,6 +301,16 @@ class DiscordExtractor:
         # Import here to avoid circular imports
         from .db.connection import get_session
 
+        if self.engine.dialect.name == "sqlite":
+            # Bring databases created before the derived message columns and
+            # the year stats snapshots up to date. PostgreSQL databases get
+            # the columns from schema.sql or saas migration 004 instead.
+            with self.engine.connect() as conn:
+                if add_message_columns(conn):
+                    backfill_message_columns(conn)
+                create_year_stats_tables(conn)
+                conn.commit()
+
         with get_session(self.engine) as session:
             # 1. Sync server metadata
             await self._sync_server_metadata(session, guild)
@@ -230,8 +318,16 @@ class DiscordExtractor:
             # 2. Sync members
             await self._sync_members(session, guild)
 
-            # 3. Sync channels and messages
-            await self._sync_channels(session, guild)
+        # 3. Sync channels and messages, each channel on its own session
+        await self._sync_channels(guild)
+
+        with get_session(self.engine) as session:
+            # 4. Resolve reply authors now every channel's messages are stored
+            backfill_reply_authors(session, guild.id)
+
+            # 5. Refresh this server's precomputed stats the reports read
+            if self.engine.dialect.name == "sqlite":
+                refresh_year_stats(session, guild.id)
 
         logger.info(f"Sync complete. Stats: {self.stats.to_dict()}")
         return self.stats.to_dict()
@@ -259,59 +355,73 @@ class DiscordExtractor:
         session: Session,
         guild: GuildProtocol,
     ) -> None:
-        """Sync all guild members."""
-        member_count = 0
+        """Sync all guild members, writing only memberships that changed."""
+        stored = {
+            user_id: (nickname, utc_naive(joined_at), is_active)
+            for user_id, (nickname, joined_at, is_active) in get_server_members(session, guild.id).items()
+        }
+        users = []
+        members = []
         async for member in guild.fetch_members():
-            # Upsert user first
-            upsert_user(
-                session=session,
-                user_id=member.id,
-                username=member.name,
-                discriminator=member.discriminator,
-                global_name=member.global_name,
-                avatar_hash=extract_asset_hash(member.avatar),
-                is_bot=member.bot,
-                created_at=member.created_at,
-            )
-
-            # Then upsert server membership
-            upsert_server_member(
-                session=session,
-                server_id=guild.id,
-                user_id=member.id,
-                nickname=member.nick,
-                joined_at=member.joined_at,
-            )
-            member_count += 1
+            users.append(user_row(member))
+            # Upserts always leave the member active
+            if stored.get(member.id) != (member.nick, utc_naive(member.joined_at), True):
+                members.append({
+                    "server_id": guild.id,
+                    "user_id": member.id,
+                    "nickname": member.nick,
+                    "joined_at": member.joined_at,
+                })
+
+        # Users first: memberships reference them
+        bulk_upsert_users(session, users)
+        bulk_upsert_members(session, members)
+        self._seen_user_ids.update(row["user_id"] for row in users)
+
+        self.stats.users += len(users)
+        logger.debug(f"Synced {len(users)} members ({len(members)} changed)")
+
+    async def _sync_channels(self, guild: GuildProtocol) -> None:
+        """Sync all text channels and their messages, several at a time."""
+        cutoff_date = datetime.utcnow() - timedelta(days=self.sync_days)
+        semaphore = asyncio.Semaphore(self.channel_concurrency)
 
-        self.stats.users += member_count
-        logger.debug(f"Synced {member_count} members")
+        await asyncio.gather(*(
+            self._sync_channel(guild, channel, cutoff_date, semaphore)
+            for channel in guild.text_channels
+        ))
 
-    async def _sync_channels(
+    async def _sync_channel(
         self,
-        session: Session,
         guild: GuildProtocol,
+        channel: ChannelProtocol,
+        after: datetime,
+        semaphore: asyncio.Semaphore,
     ) -> None:
-        """Sync all text channels and their messages."""
-        cutoff_date = datetime.utcnow() - timedelta(days=self.sync_days)
+        """Sync one text channel and its messages on a session of its own."""
+        from .db.connection import get_session
 
-        for channel in guild.text_channels:
-            # Upsert channel
-            upsert_channel(
-                session=session,
-                channel_id=channel.id,
-                server_id=guild.id,
-                name=channel.name,
-                channel_type=0,  # Text channel
-                topic=channel.topic,
-                position=channel.position,
-                is_nsfw=channel.nsfw,
-                created_at=channel.created_at,
-            )
-            self.stats.channels += 1
+        async with semaphore:
+            with get_session(self.engine) as session:
+                # Upsert channel
+                upsert_channel(
+                    session=session,
+                    channel_id=channel.id,
+                    server_id=guild.id,
+                    name=channel.name,
+                    channel_type=0,  # Text channel
+                    topic=channel.topic,
+                    position=channel.position,
+                    is_nsfw=channel.nsfw,
+                    created_at=channel.created_at,
+                )
+                # Commit before awaiting Discord so no write stays open
+                # while other channels run
+                session.commit()
+                self.stats.channels += 1
 
-            # Sync messages
-            await self._sync_channel_messages(session, guild, channel, cutoff_date)
+                # Sync messages
+                await self._sync_channel_messages(session, guild, channel, after)
 
     async def _sync_channel_messages(
         self,
@@ -320,94 +430,170 @@ class DiscordExtractor:
         channel: ChannelProtocol,
         after: datetime,
     ) -> None:
-        """Sync messages for a single channel."""
-        message_count = 0
-
-        async for message in channel.history(limit=None, after=after):
-            # Ensure author exists
-            upsert_user(
-                session=session,
-                user_id=message.author.id,
-                username=message.author.name,
-                discriminator=message.author.discriminator,
-                global_name=message.author.global_name,
-                avatar_hash=extract_asset_hash(message.author.avatar),
-                is_bot=message.author.bot,
-                created_at=message.author.created_at,
-            )
-
-            # Determine reply info
-            reply_to_message_id = None
-            reply_to_author_id = None
-            if message.reference and message.reference.message_id:
-                reply_to_message_id = message.reference.message_id
-                # Try to get reply author from internal attribute if available
-                if hasattr(message, '_reply_to_author_id'):
-                    reply_to_author_id = message._reply_to_author_id
-
-            # Insert message (convert enum to int value)
-            msg_type = message.type.value if hasattr(message.type, 'value') else int(message.type)
-
-            insert_message(
-                session=session,
-                message_id=message.id,
-                server_id=guild.id,
-                channel_id=channel.id,
-                author_id=message.author.id,
-                content=message.content,
-                created_at=message.created_at,
-                edited_at=message.edited_at,
-                message_type=msg_type,
-                is_pinned=message.pinned,
-                is_tts=message.tts,
-                reply_to_message_id=reply_to_message_id,
-                reply_to_author_id=reply_to_author_id,
-                mentions_everyone=message.mention_everyone,
-                mention_count=len(message.mentions),
-                attachment_count=len(message.attachments),
-                embed_count=len(message.embeds),
-            )
-            message_count += 1
-
-            # Process mentions
-            for mentioned_user in message.mentions:
-                # Ensure mentioned user exists
-                upsert_user(
-                    session=session,
-                    user_id=mentioned_user.id,
-                    username=mentioned_user.name,
-                    discriminator=mentioned_user.discriminator,
-                    global_name=mentioned_user.global_name,
-                    avatar_hash=extract_asset_hash(mentioned_user.avatar),
-                    is_bot=mentioned_user.bot,
-                    created_at=mentioned_user.created_at,
-                )
-                insert_mention(
-                    session=session,
-                    message_id=message.id,
-                    mentioned_user_id=mentioned_user.id,
-                )
-                self.stats.mentions += 1
-
-            # Process reactions
-            if self.fetch_reactions and message.reactions:
-                await self._sync_message_reactions(session, guild, message)
+        """
+        Sync messages for a single channel.
 
-            # Commit periodically to avoid large transactions
-            if message_count % self.COMMIT_INTERVAL == 0:
-                session.commit()
-                logger.debug(f"Synced {message_count} messages in #{channel.name}")
+        A reader task pages through the history into a bounded queue while
+        this coroutine processes and writes the batches it has already
+        received, so Discord fetches overlap with the work on earlier pages.
+        """
+        message_count = 0
+        pending = PendingWrites(first_sync=not channel_has_messages(session, channel.id))
+        # End the check's transaction so the connection isn't left idle in
+        # a transaction while the history is read
+        session.commit()
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.HISTORY_QUEUE_SIZE)
+        reader = asyncio.create_task(self._read_history(channel, after, queue))
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+
+                for message in batch:
+                    await self._queue_message(guild, channel, message, pending)
+                    message_count += 1
+
+                    # Write out and commit periodically to avoid large transactions
+                    if message_count % self.COMMIT_INTERVAL == 0:
+                        self._flush(session, pending)
+                        logger.debug(f"Synced {message_count} messages in #{channel.name}")
+        finally:
+            # Stops the reader if writing failed; a no-op once it has finished
+            reader.cancel()
+
+        self._flush(session, pending)
 
         self.stats.messages += message_count
         logger.info(f"Synced {message_count} messages from #{channel.name}")
 
+    async def _read_history(
+        self,
+        channel: ChannelProtocol,
+        after: datetime,
+        queue: asyncio.Queue,
+    ) -> None:
+        """
+        Page through a channel's history into a queue, in batches.
+
+        Ends with None, or with the exception that stopped the read so the
+        writer re-raises it instead of waiting forever.
+        """
+        try:
+            batch = []
+            async for message in channel.history(limit=None, after=after):
+                batch.append(message)
+                if len(batch) == self.HISTORY_BATCH_SIZE:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(None)
+
+    async def _queue_message(
+        self,
+        guild: GuildProtocol,
+        channel: ChannelProtocol,
+        message: MessageProtocol,
+        pending: PendingWrites,
+    ) -> None:
+        """Queue a message with its author, mentions and reactions."""
+        # Ensure author exists
+        self._queue_user(pending, message.author)
+
+        # Reply authors are resolved in one pass after the sync
+        reply_to_message_id = None
+        if message.reference and message.reference.message_id:
+            reply_to_message_id = message.reference.message_id
+
+        # Insert message (convert enum to int value)
+        msg_type = message.type.value if hasattr(message.type, 'value') else int(message.type)
+
+        pending.messages.append({
+            "message_id": message.id,
+            "server_id": guild.id,
+            "channel_id": channel.id,
+            "author_id": message.author.id,
+            "content": message.content,
+            "created_at": message.created_at,
+            "edited_at": message.edited_at,
+            "message_type": msg_type,
+            "is_pinned": message.pinned,
+            "is_tts": message.tts,
+            "reply_to_message_id": reply_to_message_id,
+            "mentions_everyone": message.mention_everyone,
+            "mention_count": len(message.mentions),
+            "attachment_count": len(message.attachments),
+            "embed_count": len(message.embeds),
+        })
+
+        # Process mentions
+        for mentioned_user in message.mentions:
+            # Ensure mentioned user exists
+            self._queue_user(pending, mentioned_user)
+            pending.mentions.append({
+                "message_id": message.id,
+                "mentioned_user_id": mentioned_user.id,
+            })
+            self.stats.mentions += 1
+
+        # Process reactions
+        if self.fetch_reactions and message.reactions:
+            await self._sync_message_reactions(guild, message, pending)
+
+    def _queue_user(self, pending: PendingWrites, user: UserProtocol) -> None:
+        """Queue a user upsert unless the user is already written or queued."""
+        # Checked before building the row, so repeat authors skip the
+        # attribute reads (avatar may be a computed property on discord.py)
+        if user.id not in self._seen_user_ids and user.id not in pending.users:
+            pending.add_user(user)
+
+    def _flush(self, session: Session, pending: PendingWrites) -> None:
+        """Write everything queued, parents before children, and commit."""
+        # Re-running a sync rewrites anything lost, so skip the commit fsync
+        disable_synchronous_commit(session)
+        bulk_upsert_users(session, list(pending.users.values()))
+        # Cached only once committed: a rolled-back flush must not leave
+        # ids behind for rows that were never written
+        new_emoji_ids = {
+            key: upsert_emoji(session, **emoji)
+            for key, emoji in pending.emojis.items()
+            if key not in self._seen_emoji_keys
+        }
+        emoji_ids = ChainMap(new_emoji_ids, self._seen_emoji_keys)
+
+        if pending.first_sync:
+            copy_messages(session, pending.messages)
+        else:
+            bulk_insert_messages(session, pending.messages)
+        bulk_insert_mentions(session, pending.mentions)
+        bulk_insert_reactions(session, [
+            {
+                "message_id": reaction["message_id"],
+                "emoji_id": emoji_ids[reaction["emoji_key"]],
+                "user_id": reaction["user_id"],
+            }
+            for reaction in pending.reactions
+        ])
+        session.commit()
+
+        self._seen_user_ids.update(pending.users)
+        self._seen_emoji_keys.update(new_emoji_ids)
+        pending.clear()
+
     async def _sync_message_reactions(
         self,
-        session: Session,
         guild: GuildProtocol,
         message: MessageProtocol,
+        pending: PendingWrites,
     ) -> None:
-        """Sync reactions for a single message."""
+        """Queue reactions for a single message."""
         for reaction in message.reactions:
             # Handle emoji - can be str (unicode) or Emoji object (custom)
             emoji = reaction.emoji
@@ -424,36 +610,27 @@ class DiscordExtractor:
                 is_custom = emoji.id is not None
                 is_animated = getattr(emoji, 'animated', False)
 
-            emoji_id = upsert_emoji(
-                session=session,
-                name=emoji_name,
-                discord_id=emoji_discord_id,
-                is_custom=is_custom,
-                server_id=guild.id if is_custom else None,
-                is_animated=is_animated,
-            )
-
-            # Get all users who reacted
-            async for user in reaction.users():
+            emoji_server_id = guild.id if is_custom else None
+            emoji_key = (emoji_name, emoji_server_id)
+            if emoji_key not in self._seen_emoji_keys:
+                pending.emojis.setdefault(emoji_key, {
+                    "name": emoji_name,
+                    "discord_id": emoji_discord_id,
+                    "is_custom": is_custom,
+                    "server_id": emoji_server_id,
+                    "is_animated": is_animated,
+                })
+
+            # Get all users who reacted, then queue them in one go
+            users = [user async for user in reaction.users()]
+            for user in users:
                 # Ensure user exists
-                upsert_user(
-                    session=session,
-                    user_id=user.id,
-                    username=user.name,
-                    discriminator=user.discriminator,
-                    global_name=user.global_name,
-                    avatar_hash=extract_asset_hash(user.avatar),
-                    is_bot=user.bot,
-                    created_at=user.created_at,
-                )
-
-                insert_reaction(
-                    session=session,
-                    message_id=message.id,
-                    emoji_id=emoji_id,
-                    user_id=user.id,
-                )
-                self.stats.reactions += 1
+                self._queue_user(pending, user)
+            pending.reactions.extend(
+                {"message_id": message.id, "emoji_key": emoji_key, "user_id": user.id}
+                for user in users
+            )
+            self.stats.reactions += len(users)
 
 
 async def run_extraction(
@@ -462,6 +639,7 @@ async def run_extraction(
     guild_id: int,
     sync_days: int = 7,
     fetch_reactions: bool = True,
+    channel_concurrency: int = 8,
 ) -> dict:
     """
     Convenience function to run extraction.
@@ -472,6 +650,7 @@ async def run_extraction(
         guild_id: Server to sync
         sync_days: Days of history
         fetch_reactions: Whether to fetch detailed reactions
+        channel_concurrency: Maximum number of channels synced at once
 
     Returns:
         Statistics dictionary
@@ -481,5 +660,6 @@ async def run_extraction(
         engine=engine,
         sync_days=sync_days,
         fetch_reactions=fetch_reactions,
+        channel_concurrency=channel_concurrency,
     )
     return await extractor.sync_server(guild_id)
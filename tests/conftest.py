@@ -3,16 +3,19 @@ Pytest configuration and fixtures.
 
 Provides database setup, mock Discord data, and common test utilities.
 """
+import copy
 import os
 import pytest
 import asyncio
 from datetime import datetime, timedelta
-from typing import Generator
+from typing import Any, Dict, Generator, List, Tuple
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
+from src.db.queries import _message_values
 from tests.mocks import (
     MockDiscordClient,
     MockGuild,
@@ -25,11 +28,38 @@ from tests.mocks import (
 # TEST DATABASE CONFIGURATION
 # =============================================================================
 
-# Use SQLite in-memory for tests (fast, no external dependencies)
+# pytest-xdist worker running this process ("master" without xdist). Each
+# worker names its own databases, so they never share one.
+WORKER_ID = os.getenv("PYTEST_XDIST_WORKER", "master")
+
+# Use SQLite in-memory for tests (fast, no external dependencies). The named
+# shared-cache database is the same one from every connection, rather than a
+# new empty database per connection as with plain :memory:.
 # For PostgreSQL-specific tests, override with TEST_DATABASE_URL env var
 TEST_DATABASE_URL = os.getenv(
     "TEST_DATABASE_URL",
-    "sqlite:///:memory:"
+    f"sqlite+pysqlite:///file:testdb_{WORKER_ID}?mode=memory&cache=shared&uri=true"
+)
+
+# Separate database with the secondary indexes, for tests that inspect them
+TEST_INDEXED_DATABASE_URL = (
+    f"sqlite+pysqlite:///file:testdb_{WORKER_ID}_indexed?mode=memory&cache=shared&uri=true"
+)
+
+# Separate database preloaded with mock_guild, for tests that query synced data
+TEST_POPULATED_DATABASE_URL = (
+    f"sqlite+pysqlite:///file:testdb_{WORKER_ID}_populated?mode=memory&cache=shared&uri=true"
+)
+
+# The test database is thrown away after the run, so skip durability work
+# on every write. Foreign keys stay off (SQLite's default) unless a test
+# turns them on to exercise them.
+TEST_SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=OFF",
+    "PRAGMA cache_size=-65536",  # 64 MB
 )
 
 
@@ -49,127 +79,201 @@ def event_loop():
 # DATABASE FIXTURES
 # =============================================================================
 
-def get_sqlite_schema():
-    """
-    Generate SQLite-compatible schema.
+# SQLite-compatible schema. SQLite doesn't support some PostgreSQL features,
+# so we simplify. Tables and the unique indexes upserts rely on come first;
+# the lookup indexes are kept apart, since the small test tables gain
+# nothing from them but every insert would maintain them.
+_SQLITE_TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS servers (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        icon_hash TEXT,
+        owner_id INTEGER,
+        member_count INTEGER,
+        created_at TIMESTAMP,
+        first_synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_synced_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        discriminator TEXT,
+        global_name TEXT,
+        avatar_hash TEXT,
+        is_bot INTEGER DEFAULT 0,
+        created_at TIMESTAMP,
+        first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS server_members (
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        nickname TEXT,
+        joined_at TIMESTAMP,
+        is_active INTEGER DEFAULT 1,
+        PRIMARY KEY (server_id, user_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS channels (
+        id INTEGER PRIMARY KEY,
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        name TEXT NOT NULL,
+        type INTEGER NOT NULL,
+        parent_id INTEGER,
+        topic TEXT,
+        position INTEGER,
+        is_nsfw INTEGER DEFAULT 0,
+        created_at TIMESTAMP,
+        is_archived INTEGER DEFAULT 0,
+        last_synced_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
+        author_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+        content TEXT,
+        created_at TIMESTAMP NOT NULL,
+        edited_at TIMESTAMP,
+        message_type INTEGER DEFAULT 0,
+        is_pinned INTEGER DEFAULT 0,
+        is_tts INTEGER DEFAULT 0,
+        reply_to_message_id INTEGER,
+        reply_to_author_id INTEGER,
+        thread_id INTEGER,
+        mentions_everyone INTEGER DEFAULT 0,
+        mention_count INTEGER DEFAULT 0,
+        attachment_count INTEGER DEFAULT 0,
+        embed_count INTEGER DEFAULT 0,
+        has_poll INTEGER DEFAULT 0,
+        word_count INTEGER,
+        char_count INTEGER,
+        created_hour INTEGER,
+        lol_count INTEGER DEFAULT 0,
+        lmao_count INTEGER DEFAULT 0,
+        haha_count INTEGER DEFAULT 0,
+        hehe_count INTEGER DEFAULT 0,
+        link_count INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS message_mentions (
+        message_id INTEGER REFERENCES messages(id) ON DELETE CASCADE,
+        mentioned_user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        PRIMARY KEY (message_id, mentioned_user_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS emojis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_id INTEGER,
+        name TEXT NOT NULL,
+        is_custom INTEGER DEFAULT 0,
+        server_id INTEGER,
+        is_animated INTEGER DEFAULT 0,
+        UNIQUE(name, server_id)
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_emojis_unicode_name ON emojis(name) WHERE server_id IS NULL;
+
+    CREATE TABLE IF NOT EXISTS reactions (
+        message_id INTEGER REFERENCES messages(id) ON DELETE CASCADE,
+        emoji_id INTEGER REFERENCES emojis(id) ON DELETE CASCADE,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        reacted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_super_reaction INTEGER DEFAULT 0,
+        PRIMARY KEY (message_id, emoji_id, user_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS user_year_stats (
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        total_msgs INTEGER NOT NULL DEFAULT 0,
+        longest_msg INTEGER NOT NULL DEFAULT 0,
+        questions_asked INTEGER NOT NULL DEFAULT 0,
+        late_night INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (server_id, user_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS channel_year_stats (
+        channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
+        user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        server_id INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+        msgs INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (channel_id, user_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS pair_year_stats (
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        user_lo INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        user_hi INTEGER REFERENCES users(id) ON DELETE CASCADE,
+        lo_to_hi INTEGER NOT NULL DEFAULT 0,
+        hi_to_lo INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (server_id, user_lo, user_hi)
+    );
+
+    CREATE TABLE IF NOT EXISTS sync_state (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
+        channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
+        sync_type TEXT NOT NULL,
+        last_message_id INTEGER,
+        oldest_message_id INTEGER,
+        status TEXT DEFAULT 'pending',
+        started_at TIMESTAMP,
+        completed_at TIMESTAMP,
+        message_count INTEGER DEFAULT 0,
+        error_message TEXT,
+        UNIQUE(server_id, channel_id, sync_type)
+    );
+"""
 
-    SQLite doesn't support some PostgreSQL features, so we simplify.
-    """
-    return """
-        CREATE TABLE IF NOT EXISTS servers (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            icon_hash TEXT,
-            owner_id INTEGER,
-            member_count INTEGER,
-            created_at TIMESTAMP,
-            first_synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_synced_at TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT NOT NULL,
-            discriminator TEXT,
-            global_name TEXT,
-            avatar_hash TEXT,
-            is_bot INTEGER DEFAULT 0,
-            created_at TIMESTAMP,
-            first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS server_members (
-            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            nickname TEXT,
-            joined_at TIMESTAMP,
-            is_active INTEGER DEFAULT 1,
-            PRIMARY KEY (server_id, user_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS channels (
-            id INTEGER PRIMARY KEY,
-            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
-            name TEXT NOT NULL,
-            type INTEGER NOT NULL,
-            parent_id INTEGER,
-            topic TEXT,
-            position INTEGER,
-            is_nsfw INTEGER DEFAULT 0,
-            created_at TIMESTAMP,
-            is_archived INTEGER DEFAULT 0,
-            last_synced_at TIMESTAMP
-        );
-
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY,
-            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
-            channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
-            author_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-            content TEXT,
-            created_at TIMESTAMP NOT NULL,
-            edited_at TIMESTAMP,
-            message_type INTEGER DEFAULT 0,
-            is_pinned INTEGER DEFAULT 0,
-            is_tts INTEGER DEFAULT 0,
-            reply_to_message_id INTEGER,
-            reply_to_author_id INTEGER,
-            thread_id INTEGER,
-            mentions_everyone INTEGER DEFAULT 0,
-            mention_count INTEGER DEFAULT 0,
-            attachment_count INTEGER DEFAULT 0,
-            embed_count INTEGER DEFAULT 0,
-            has_poll INTEGER DEFAULT 0,
-            word_count INTEGER,
-            char_count INTEGER
-        );
-
-        CREATE TABLE IF NOT EXISTS message_mentions (
-            message_id INTEGER REFERENCES messages(id) ON DELETE CASCADE,
-            mentioned_user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            PRIMARY KEY (message_id, mentioned_user_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS emojis (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            discord_id INTEGER,
-            name TEXT NOT NULL,
-            is_custom INTEGER DEFAULT 0,
-            server_id INTEGER,
-            is_animated INTEGER DEFAULT 0,
-            UNIQUE(name, server_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS reactions (
-            message_id INTEGER REFERENCES messages(id) ON DELETE CASCADE,
-            emoji_id INTEGER REFERENCES emojis(id) ON DELETE CASCADE,
-            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-            reacted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            is_super_reaction INTEGER DEFAULT 0,
-            PRIMARY KEY (message_id, emoji_id, user_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS sync_state (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            server_id INTEGER REFERENCES servers(id) ON DELETE CASCADE,
-            channel_id INTEGER REFERENCES channels(id) ON DELETE CASCADE,
-            sync_type TEXT NOT NULL,
-            last_message_id INTEGER,
-            oldest_message_id INTEGER,
-            status TEXT DEFAULT 'pending',
-            started_at TIMESTAMP,
-            completed_at TIMESTAMP,
-            message_count INTEGER DEFAULT 0,
-            error_message TEXT,
-            UNIQUE(server_id, channel_id, sync_type)
-        );
-
-        CREATE INDEX IF NOT EXISTS idx_messages_channel_time ON messages(channel_id, created_at DESC);
-        CREATE INDEX IF NOT EXISTS idx_messages_author_time ON messages(author_id, created_at DESC);
-        CREATE INDEX IF NOT EXISTS idx_messages_server_time ON messages(server_id, created_at DESC);
-        CREATE INDEX IF NOT EXISTS idx_reactions_user ON reactions(user_id);
-        CREATE INDEX IF NOT EXISTS idx_reactions_message ON reactions(message_id);
-    """
+_SQLITE_INDEXES_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_messages_channel_time ON messages(channel_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_messages_author_time ON messages(author_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_messages_server_time ON messages(server_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_reactions_user ON reactions(user_id);
+    CREATE INDEX IF NOT EXISTS idx_reactions_message ON reactions(message_id);
+    CREATE INDEX IF NOT EXISTS idx_messages_reply_to ON messages(reply_to_message_id) WHERE reply_to_message_id IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS idx_mentions_user ON message_mentions(mentioned_user_id, message_id);
+"""
+
+
+def get_sqlite_schema() -> str:
+    """Return the SQLite-compatible test schema, indexes included."""
+    return _SQLITE_TABLES_SQL + _SQLITE_INDEXES_SQL
+
+
+def _create_test_engine(url: str, schema_sql: str) -> Engine:
+    """Create an engine for a test database and apply schema_sql to it."""
+    options = {}
+    if url.startswith("sqlite"):
+        # One connection for every session and thread: the database lives
+        # only as long as a connection to it stays open
+        options = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+    engine = create_engine(url, echo=False, **options)
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _apply_test_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in TEST_SQLITE_PRAGMAS:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+
+    # Create tables in one executescript pass rather than a statement at a time
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript(schema_sql)
+        raw.commit()
+    finally:
+        raw.close()
+
+    return engine
 
 
 @pytest.fixture(scope="session")
@@ -177,63 +281,187 @@ def db_engine() -> Generator[Engine, None, None]:
     """
     Create test database engine.
 
-    Uses SQLite in-memory for fast, isolated tests.
+    Uses SQLite in-memory for fast, isolated tests. Only the tables and
+    their unique indexes are created; see db_engine_indexed. Like any
+    fixture it is set up on first request, so runs of tests that never ask
+    for a database (the mock and generator tests) skip the DDL entirely.
     """
-    engine = create_engine(
-        TEST_DATABASE_URL,
-        echo=False,
-        connect_args={"check_same_thread": False} if "sqlite" in TEST_DATABASE_URL else {},
-    )
+    engine = _create_test_engine(TEST_DATABASE_URL, _SQLITE_TABLES_SQL)
 
-    # Create tables
-    schema = get_sqlite_schema()
-    with engine.connect() as conn:
-        for statement in schema.split(';'):
-            statement = statement.strip()
-            if statement:
-                conn.execute(text(statement))
-        conn.commit()
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def db_engine_indexed() -> Generator[Engine, None, None]:
+    """Engine for a separate test database that also has the lookup indexes."""
+    engine = _create_test_engine(TEST_INDEXED_DATABASE_URL, get_sqlite_schema())
 
     yield engine
 
     engine.dispose()
 
 
+def _rollback_session(engine: Engine) -> Generator[Session, None, None]:
+    """
+    Yield a session whose work is rolled back afterwards, commits included.
+
+    The session joins an outer transaction and turns its own commits into
+    SAVEPOINT releases, so rolling that transaction back discards everything
+    written through it without deleting any rows.
+    """
+    connection = engine.connect()
+    dbapi_connection = connection.connection.driver_connection
+    if engine.dialect.name == "sqlite":
+        # pysqlite only opens a transaction before DML, so the first SAVEPOINT
+        # would start the outer transaction and its RELEASE would commit it.
+        # Issue BEGIN explicitly on this connection instead.
+        dbapi_connection.isolation_level = None
+        event.listen(connection, "begin", lambda conn: conn.exec_driver_sql("BEGIN"))
+
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+
+    yield session
+
+    session.close()
+    transaction.rollback()
+    if engine.dialect.name == "sqlite":
+        dbapi_connection.isolation_level = ""
+    connection.close()
+
+
 @pytest.fixture
 def db_session(db_engine: Engine) -> Generator[Session, None, None]:
     """
     Create database session for tests.
 
-    Each test gets a fresh session, rolled back after the test.
+    Everything the test writes, commits included, is rolled back afterwards.
     """
-    SessionFactory = sessionmaker(bind=db_engine)
-    session = SessionFactory()
+    yield from _rollback_session(db_engine)
 
-    yield session
 
-    session.rollback()
-    session.close()
+def _sqlite_timestamp(value):
+    """Format datetimes the way SQLAlchemy stores them in SQLite."""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+
+def _guild_to_rows(guild: MockGuild) -> Dict[str, Tuple[List[str], List[tuple]]]:
+    """
+    Flatten a mock guild into (columns, rows) per table, in insert order.
+
+    Rows match what the extractor would store, except reply_to_author_id,
+    which is left for backfill_reply_authors to resolve.
+    """
+    users = [(m.id, m.name, m.discriminator, m.global_name, int(m.bot)) for m in guild._members]
+    members = [(guild.id, m.id, m.nick, _sqlite_timestamp(m.joined_at)) for m in guild._members]
+    channels = [(c.id, guild.id, c.name, 0, c.topic, c.position) for c in guild._channels]
+
+    message_columns: List[str] = []
+    messages: List[tuple] = []
+    mentions: List[tuple] = []
+    emoji_ids: Dict[str, int] = {}
+    reactions: List[tuple] = []
+    for channel in guild._channels:
+        for message in channel._messages:
+            values: Dict[str, Any] = _message_values(
+                message_id=message.id,
+                server_id=guild.id,
+                channel_id=channel.id,
+                author_id=message.author.id,
+                content=message.content,
+                created_at=message.created_at,
+                message_type=message.type,
+                reply_to_message_id=message.reference.message_id if message.reference else None,
+                mention_count=len(message.mentions),
+            )
+            message_columns = list(values)
+            messages.append(tuple(_sqlite_timestamp(v) for v in values.values()))
+            mentions.extend((message.id, user_id) for user_id in {u.id for u in message.mentions})
+            for reaction in message.reactions:
+                emoji_id = emoji_ids.setdefault(reaction.emoji.name, len(emoji_ids) + 1)
+                reactions.extend((message.id, emoji_id, user.id) for user in reaction._users)
+
+    return {
+        "servers": (["id", "name", "owner_id", "member_count"],
+                    [(guild.id, guild.name, guild.owner_id, guild.member_count)]),
+        "users": (["id", "username", "discriminator", "global_name", "is_bot"], users),
+        "server_members": (["server_id", "user_id", "nickname", "joined_at"], members),
+        "channels": (["id", "server_id", "name", "type", "topic", "position"], channels),
+        "messages": (message_columns, messages),
+        "message_mentions": (["message_id", "mentioned_user_id"], mentions),
+        "emojis": (["id", "name"], [(i, name) for name, i in emoji_ids.items()]),
+        "reactions": (["message_id", "emoji_id", "user_id"], reactions),
+    }
+
+
+@pytest.fixture(scope="session")
+def populated_engine(mock_guild: MockGuild) -> Generator[Engine, None, None]:
+    """
+    Engine for a separate test database holding mock_guild, loaded once.
+
+    Each table is filled with a single executemany, all in one transaction.
+    Treat it as read-only, or write through populated_db.
+    """
+    engine = _create_test_engine(TEST_POPULATED_DATABASE_URL, _SQLITE_TABLES_SQL)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.driver_connection.cursor()
+        for table, (columns, rows) in _guild_to_rows(mock_guild).items():
+            placeholders = ", ".join("?" * len(columns))
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.fixture
+def populated_db(populated_engine: Engine) -> Generator[Session, None, None]:
+    """Session on the mock_guild database; its writes are rolled back afterwards."""
+    yield from _rollback_session(populated_engine)
+
+
+@pytest.fixture(scope="session")
+def session_conn(db_engine: Engine) -> Generator[Connection, None, None]:
+    """A connection to the test database held open for the whole session."""
+    conn = db_engine.connect()
+
+    yield conn
+
+    conn.close()
 
 
 @pytest.fixture
-def clean_db(db_engine: Engine) -> Generator[Engine, None, None]:
+def clean_db(db_engine: Engine, session_conn: Connection) -> Generator[Engine, None, None]:
     """
     Provide a clean database for tests that need isolation.
 
-    Truncates all tables before the test.
+    Truncates all tables before the test, over the session-wide connection.
     """
-    with db_engine.connect() as conn:
-        # Delete all data (order matters for FK constraints)
-        conn.execute(text("DELETE FROM reactions"))
-        conn.execute(text("DELETE FROM message_mentions"))
-        conn.execute(text("DELETE FROM messages"))
-        conn.execute(text("DELETE FROM emojis"))
-        conn.execute(text("DELETE FROM channels"))
-        conn.execute(text("DELETE FROM server_members"))
-        conn.execute(text("DELETE FROM users"))
-        conn.execute(text("DELETE FROM servers"))
-        conn.execute(text("DELETE FROM sync_state"))
-        conn.commit()
+    # Delete all data (order matters for FK constraints)
+    session_conn.execute(text("DELETE FROM user_year_stats"))
+    session_conn.execute(text("DELETE FROM channel_year_stats"))
+    session_conn.execute(text("DELETE FROM pair_year_stats"))
+    session_conn.execute(text("DELETE FROM reactions"))
+    session_conn.execute(text("DELETE FROM message_mentions"))
+    session_conn.execute(text("DELETE FROM messages"))
+    session_conn.execute(text("DELETE FROM emojis"))
+    session_conn.execute(text("DELETE FROM channels"))
+    session_conn.execute(text("DELETE FROM server_members"))
+    session_conn.execute(text("DELETE FROM users"))
+    session_conn.execute(text("DELETE FROM servers"))
+    session_conn.execute(text("DELETE FROM sync_state"))
+    session_conn.commit()
 
     yield db_engine
 
@@ -242,12 +470,14 @@ def clean_db(db_engine: Engine) -> Generator[Engine, None, None]:
 # MOCK DISCORD FIXTURES
 # =============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_guild() -> MockGuild:
     """
     Create a test server with predictable data.
 
-    Uses a fixed seed for reproducibility.
+    Uses a fixed seed for reproducibility. Generated once per session and
+    shared, so tests must treat it as read-only; use mock_guild_mutable to
+    add or change data.
     """
     return create_test_server(
         user_count=30,
@@ -258,6 +488,12 @@ def mock_guild() -> MockGuild:
     )
 
 
+@pytest.fixture
+def mock_guild_mutable(mock_guild: MockGuild) -> MockGuild:
+    """A private deep copy of mock_guild that a test may modify."""
+    return copy.deepcopy(mock_guild)
+
+
 @pytest.fixture
 def mock_client(mock_guild: MockGuild) -> MockDiscordClient:
     """Create a mock Discord client with a test server."""
@@ -266,9 +502,9 @@ def mock_client(mock_guild: MockGuild) -> MockDiscordClient:
     return client
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def small_mock_guild() -> MockGuild:
-    """Create a minimal test server for focused tests."""
+    """Create a minimal test server for focused tests (shared, read-only)."""
     return create_test_server(
         user_count=5,
         channel_count=1,
@@ -278,9 +514,9 @@ def small_mock_guild() -> MockGuild:
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def large_mock_guild() -> MockGuild:
-    """Create a larger test server for stress tests."""
+    """Create a larger test server for stress tests (shared, read-only)."""
     return create_test_server(
         user_count=100,
         channel_count=10,
@@ -292,7 +528,11 @@ def large_mock_guild() -> MockGuild:
 
 @pytest.fixture
 def generator() -> DiscordDataGenerator:
-    """Create a data generator with fixed seed."""
+    """
+    Create a data generator with fixed seed.
+
+    Kept per test: each generate_* call advances its random state.
+    """
     return DiscordDataGenerator(seed=42)
 
 
@@ -8,7 +8,7 @@ from __future__ import annotations
 
 from typing import Optional, List
 
-from .discord_objects import MockGuild, MockChannel
+from .discord_objects import IdIndex, MockGuild, MockChannel
 from .generators import DiscordDataGenerator
 
 
@@ -30,6 +30,7 @@ class MockDiscordClient:
         self.guilds: List[MockGuild] = guilds or []
         self._is_ready = False
         self._is_closed = False
+        self._guild_index = IdIndex()
 
     def get_guild(self, guild_id: int) -> Optional[MockGuild]:
         """
@@ -37,10 +38,7 @@ class MockDiscordClient:
 
         Matches discord.Client.get_guild() signature.
         """
-        for guild in self.guilds:
-            if guild.id == guild_id:
-                return guild
-        return None
+        return self._guild_index.get(self.guilds, guild_id)
 
     def get_channel(self, channel_id: int) -> Optional[MockChannel]:
         """
@@ -49,9 +47,9 @@ class MockDiscordClient:
         Matches discord.Client.get_channel() signature.
         """
         for guild in self.guilds:
-            for channel in guild._channels:
-                if channel.id == channel_id:
-                    return channel
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
         return None
 
     async def wait_until_ready(self) -> None:
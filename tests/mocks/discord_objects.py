@@ -6,9 +6,12 @@ to real Discord or using simulated data.
 """
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Optional, List, AsyncIterator, TYPE_CHECKING
+from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, List, Dict, Any, AsyncIterator, Sequence, TYPE_CHECKING
 
 if TYPE_CHECKING:
     pass
@@ -16,14 +19,86 @@ if TYPE_CHECKING:
 # Discord epoch: January 1, 2015 00:00:00 UTC in milliseconds
 DISCORD_EPOCH = 1420070400000
 
+# Unix epoch as a naive UTC datetime, like the rest of the mock timestamps
+_UNIX_EPOCH = datetime(1970, 1, 1)
 
+
+@lru_cache(maxsize=100_000)
 def snowflake_to_datetime(snowflake: int) -> datetime:
-    """Convert Discord snowflake ID to datetime."""
+    """Convert Discord snowflake ID to datetime (cached: datetimes are immutable)."""
     timestamp_ms = (snowflake >> 22) + DISCORD_EPOCH
-    return datetime.utcfromtimestamp(timestamp_ms / 1000)
+    # Exact integer arithmetic; utcfromtimestamp is deprecated since 3.12
+    return _UNIX_EPOCH + timedelta(milliseconds=timestamp_ms)
+
+
+class IdIndex:
+    """
+    Lookup by ID over a list of mock objects.
+
+    The dict is rebuilt whenever the list is replaced or changes length, so
+    tests can keep appending to the underlying list directly.
+    """
+
+    def __init__(self):
+        self._source: Optional[list] = None
+        self._size = -1
+        self._by_id: Dict[int, Any] = {}
+
+    def get(self, items: list, item_id: int) -> Optional[Any]:
+        """Return the first item in items with the given ID, or None."""
+        if items is not self._source or len(items) != self._size:
+            # Reversed so the first of any duplicate IDs wins, as in a scan
+            self._by_id = {item.id: item for item in reversed(items)}
+            self._source, self._size = items, len(items)
+        return self._by_id.get(item_id)
 
 
-@dataclass
+class MessageTimeline:
+    """
+    A channel's messages sorted by created_at, for history() range queries.
+
+    Like IdIndex, it is rebuilt whenever the list is replaced or changes
+    length, so tests can append messages in any order.
+    """
+
+    def __init__(self):
+        self._source: Optional[list] = None
+        self._size = -1
+        self._keys: List[datetime] = []
+        self._oldest_first: list = []
+        self._newest_first: list = []
+
+    def select(
+        self,
+        messages: list,
+        after: Optional[datetime],
+        before: Optional[datetime],
+        oldest_first: bool,
+        limit: Optional[int] = None,
+    ) -> list:
+        """Up to limit messages created strictly between after and before, in order."""
+        if messages is not self._source or len(messages) != self._size:
+            by_time = attrgetter("created_at")
+            self._oldest_first = sorted(messages, key=by_time)
+            # Same tie order as messages.sort(key=..., reverse=True)
+            self._newest_first = sorted(reversed(messages), key=by_time)[::-1]
+            self._keys = [m.created_at for m in self._oldest_first]
+            self._source, self._size = messages, len(messages)
+
+        lo = 0 if after is None else bisect_right(self._keys, after)
+        hi = len(self._keys) if before is None else bisect_left(self._keys, before)
+        ordered = self._oldest_first
+        if not oldest_first:
+            total = len(self._keys)
+            lo, hi = total - hi, total - lo
+            ordered = self._newest_first
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        # The one list built per call
+        return ordered[lo:hi]
+
+
+@dataclass(slots=True, eq=False)
 class MockUser:
     """
     Matches discord.User signature exactly.
@@ -65,7 +140,7 @@ class MockUser:
         return False
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class MockMember(MockUser):
     """
     Matches discord.Member signature.
@@ -82,7 +157,7 @@ class MockMember(MockUser):
         return self.nick or self.global_name or self.name
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class MockEmoji:
     """
     Matches discord.PartialEmoji / discord.Emoji signature.
@@ -94,6 +169,12 @@ class MockEmoji:
     name: str
     animated: bool = False
 
+    # Emojis key reaction lookups; hash their identity once
+    _hash: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._hash = hash((self.id, self.name))
+
     @property
     def is_custom_emoji(self) -> bool:
         """Whether this is a custom emoji (vs unicode)."""
@@ -112,7 +193,7 @@ class MockEmoji:
         return self.name
 
     def __hash__(self):
-        return hash((self.id, self.name))
+        return self._hash
 
     def __eq__(self, other):
         if isinstance(other, MockEmoji):
@@ -120,7 +201,7 @@ class MockEmoji:
         return False
 
 
-@dataclass
+@dataclass(slots=True)
 class MockReaction:
     """
     Matches discord.Reaction signature.
@@ -145,7 +226,7 @@ class MockReaction:
             yield user
 
 
-@dataclass
+@dataclass(slots=True)
 class MockMessageReference:
     """
     Matches discord.MessageReference signature.
@@ -162,7 +243,7 @@ class MockMessageReference:
         return None
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class MockMessage:
     """
     Matches discord.Message signature exactly.
@@ -177,13 +258,15 @@ class MockMessage:
     edited_at: Optional[datetime] = None
     tts: bool = False
     mention_everyone: bool = False
-    mentions: List[MockUser] = field(default_factory=list)
+    # Most messages have none of these, so they default to a shared empty
+    # tuple instead of a new list each; assign a list to populate them
+    mentions: Sequence[MockUser] = ()
     pinned: bool = False
     type: int = 0  # MessageType.default = 0, reply = 19
     reference: Optional[MockMessageReference] = None
-    reactions: List[MockReaction] = field(default_factory=list)
-    attachments: List = field(default_factory=list)
-    embeds: List = field(default_factory=list)
+    reactions: Sequence[MockReaction] = ()
+    attachments: Sequence = ()
+    embeds: Sequence = ()
 
     # Internal: for tracking reply target author (used in extraction)
     _reply_to_author_id: Optional[int] = field(default=None, repr=False)
@@ -210,7 +293,7 @@ class MockMessage:
         return False
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class MockChannel:
     """
     Matches discord.TextChannel signature.
@@ -225,6 +308,7 @@ class MockChannel:
     nsfw: bool = False
     category_id: Optional[int] = None
     _messages: List[MockMessage] = field(default_factory=list, repr=False)
+    _timeline: MessageTimeline = field(default_factory=MessageTimeline, repr=False, compare=False)
 
     @property
     def mention(self) -> str:
@@ -255,30 +339,14 @@ class MockChannel:
         In real discord.py, this makes paginated API calls.
         discord.py handles rate limiting automatically.
         """
-        messages = self._messages.copy()
-
-        # Filter by time range
-        if after is not None:
-            if isinstance(after, datetime):
-                messages = [m for m in messages if m.created_at > after]
-            else:
-                # Could be a snowflake or message object
-                after_time = after if isinstance(after, datetime) else snowflake_to_datetime(after)
-                messages = [m for m in messages if m.created_at > after_time]
-
-        if before is not None:
-            if isinstance(before, datetime):
-                messages = [m for m in messages if m.created_at < before]
-            else:
-                before_time = before if isinstance(before, datetime) else snowflake_to_datetime(before)
-                messages = [m for m in messages if m.created_at < before_time]
-
-        # Sort order: newest first by default
-        messages.sort(key=lambda m: m.created_at, reverse=not oldest_first)
-
-        # Apply limit
-        if limit is not None:
-            messages = messages[:limit]
+        # Could be a snowflake rather than a datetime
+        if after is not None and not isinstance(after, datetime):
+            after = snowflake_to_datetime(after)
+        if before is not None and not isinstance(before, datetime):
+            before = snowflake_to_datetime(before)
+
+        # Filter by time range and limit; newest first by default
+        messages = self._timeline.select(self._messages, after, before, oldest_first, limit)
 
         for msg in messages:
             yield msg
@@ -286,8 +354,13 @@ class MockChannel:
     def __hash__(self):
         return hash(self.id)
 
+    def __eq__(self, other):
+        if isinstance(other, MockChannel):
+            return self.id == other.id
+        return False
 
-@dataclass
+
+@dataclass(slots=True, eq=False)
 class MockGuild:
     """
     Matches discord.Guild signature.
@@ -301,6 +374,8 @@ class MockGuild:
     member_count: int = 0
     _members: List[MockMember] = field(default_factory=list, repr=False)
     _channels: List[MockChannel] = field(default_factory=list, repr=False)
+    _member_index: IdIndex = field(default_factory=IdIndex, repr=False, compare=False)
+    _channel_index: IdIndex = field(default_factory=IdIndex, repr=False, compare=False)
 
     @property
     def text_channels(self) -> List[MockChannel]:
@@ -338,17 +413,16 @@ class MockGuild:
 
     def get_member(self, user_id: int) -> Optional[MockMember]:
         """Get a member by ID."""
-        for member in self._members:
-            if member.id == user_id:
-                return member
-        return None
+        return self._member_index.get(self._members, user_id)
 
     def get_channel(self, channel_id: int) -> Optional[MockChannel]:
         """Get a channel by ID."""
-        for channel in self._channels:
-            if channel.id == channel_id:
-                return channel
-        return None
+        return self._channel_index.get(self._channels, channel_id)
 
     def __hash__(self):
         return hash(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, MockGuild):
+            return self.id == other.id
+        return False
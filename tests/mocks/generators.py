@@ -9,11 +9,12 @@ Generates data that matches real-world Discord server patterns:
 """
 from __future__ import annotations
 
-import calendar
 import random
+from bisect import bisect
 import string
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Callable, List, Dict, Tuple, Optional
 
 from .discord_objects import (
     MockUser,
@@ -27,6 +28,10 @@ from .discord_objects import (
     DISCORD_EPOCH,
 )
 
+_UNIX_EPOCH = datetime(1970, 1, 1)
+_UNIX_EPOCH_UTC = _UNIX_EPOCH.replace(tzinfo=timezone.utc)
+_ONE_MS = timedelta(milliseconds=1)
+
 
 # =============================================================================
 # REALISTIC DISTRIBUTION CONSTANTS
@@ -53,6 +58,11 @@ REPLY_PROBABILITY = 0.35      # 35% of messages are replies
 REACTION_PROBABILITY = 0.20   # 20% of messages get at least one reaction
 MENTION_PROBABILITY = 0.15    # 15% of messages mention someone
 
+# Time-of-day pattern: peak hours are 10:00-22:59
+PEAK_START_HOUR = 10
+PEAK_END_HOUR = 23
+PEAK_HOUR_PROBABILITY = 0.70  # Share of messages drawn from peak windows only
+
 # Common unicode emoji with realistic usage frequency
 COMMON_EMOJIS: List[Tuple[str, float]] = [
     ("👍", 0.25),   # Thumbs up - most common
@@ -141,8 +151,9 @@ class DiscordDataGenerator:
         if created_at is None:
             created_at = self._base_time
 
-        # Use calendar.timegm to treat naive datetime as UTC
-        timestamp_ms = int(calendar.timegm(created_at.timetuple()) * 1000) - DISCORD_EPOCH
+        # Naive datetimes are treated as UTC; integer division keeps the ms
+        epoch = _UNIX_EPOCH if created_at.tzinfo is None else _UNIX_EPOCH_UTC
+        timestamp_ms = (created_at - epoch) // _ONE_MS - DISCORD_EPOCH
         self._snowflake_counter += 1
 
         # Construct snowflake: timestamp | worker | process | increment
@@ -159,28 +170,64 @@ class DiscordDataGenerator:
         """Generate a random lowercase string."""
         return ''.join(self._random.choices(string.ascii_lowercase, k=length))
 
-    def _random_timestamp(
+    def _peak_windows(
         self,
         start: datetime,
         end: datetime
+    ) -> Tuple[List[float], List[float]]:
+        """
+        Locate the peak-hour windows that fall within [start, end].
+
+        Returns:
+            (offsets, cum_lengths): each window's start, in seconds after
+            ``start``, and the running total of window lengths in seconds
+        """
+        offsets: List[float] = []
+        cum_lengths: List[float] = []
+        total = 0.0
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            window_start = max(day + timedelta(hours=PEAK_START_HOUR), start)
+            window_end = min(day + timedelta(hours=PEAK_END_HOUR), end)
+            if window_start < window_end:
+                total += (window_end - window_start).total_seconds()
+                offsets.append((window_start - start).total_seconds())
+                cum_lengths.append(total)
+            day += timedelta(days=1)
+        return offsets, cum_lengths
+
+    def _random_timestamp(
+        self,
+        start: datetime,
+        end: datetime,
+        peak_windows: Optional[Tuple[List[float], List[float]]] = None
     ) -> datetime:
         """
         Generate a timestamp with realistic hour distribution.
 
-        Biases towards peak hours (10am-10pm) to match real Discord usage.
+        Biases towards peak hours (10am-10pm) to match real Discord usage:
+        with PEAK_HOUR_PROBABILITY the time is drawn uniformly from the peak
+        windows, otherwise uniformly from the whole range. Either way it
+        stays within [start, end].
+
+        Args:
+            start: Earliest timestamp
+            end: Latest timestamp
+            peak_windows: Result of _peak_windows(start, end), when the
+                caller draws many timestamps from the same range
         """
-        delta = end - start
-        random_seconds = self._random.random() * delta.total_seconds()
-        timestamp = start + timedelta(seconds=random_seconds)
+        if peak_windows is None:
+            peak_windows = self._peak_windows(start, end)
+        offsets, cum_lengths = peak_windows
 
-        # Bias towards peak hours (10am-10pm)
-        hour = timestamp.hour
-        if hour < 10 or hour > 22:
-            if self._random.random() < 0.7:  # 70% chance to shift
-                new_hour = self._random.randint(10, 22)
-                timestamp = timestamp.replace(hour=new_hour)
+        if cum_lengths and self._random.random() < PEAK_HOUR_PROBABILITY:
+            point = self._random.random() * cum_lengths[-1]
+            i = bisect(cum_lengths, point, 0, len(cum_lengths) - 1)
+            seconds = offsets[i] + point - (cum_lengths[i - 1] if i else 0.0)
+        else:
+            seconds = self._random.random() * (end - start).total_seconds()
 
-        return timestamp
+        return start + timedelta(seconds=seconds)
 
     def _generate_message_content(self) -> str:
         """Generate realistic message content."""
@@ -216,17 +263,24 @@ class DiscordDataGenerator:
 
         return users
 
-    def _pick_author_by_activity(self, users: List[MockUser]) -> MockUser:
+    def _build_author_sampler(self, users: List[MockUser]) -> Callable[[], MockUser]:
         """
-        Pick a message author weighted by activity level.
+        Return a function that picks an author weighted by activity level.
 
-        Power users write disproportionately more messages.
+        The cumulative weights are built once, and each pick is one random()
+        and a bisect: the same draw random.choices makes, minus its setup.
         """
-        weights = []
-        for user in users:
-            level = getattr(user, '_activity_level', 'casual')
-            weights.append(ACTIVITY_WEIGHTS[level])
-        return self._random.choices(users, weights=weights, k=1)[0]
+        cum_weights = list(accumulate(
+            ACTIVITY_WEIGHTS[user._activity_level] for user in users
+        ))
+        total = cum_weights[-1] + 0.0
+        last = len(users) - 1
+        rand = self._random.random
+
+        def pick() -> MockUser:
+            return users[bisect(cum_weights, rand() * total, 0, last)]
+
+        return pick
 
     def _add_reactions(
         self,
@@ -239,40 +293,48 @@ class DiscordDataGenerator:
         - 20% of messages get reactions
         - Exponential distribution for reactor count
         - Common emoji used more frequently
+
+        Reactors are drawn with random.sample, which picks k distinct users
+        without copying the population once it is large relative to k.
         """
+        rand = self._random.random
+        choices = self._random.choices
+        sample = self._random.sample
+        expovariate = self._random.expovariate
+        emoji_counts = [1, 2, 3, 4, 5]
+        emoji_cum_weights = list(accumulate([0.5, 0.25, 0.15, 0.07, 0.03]))
+        emoji_names = [name for name, _ in COMMON_EMOJIS]
+        max_emojis = len(emoji_names)
+        max_reactors = len(users)
+
         for msg in messages:
-            if self._random.random() > REACTION_PROBABILITY:
+            if rand() > REACTION_PROBABILITY:
                 continue
 
             # Number of different emoji on this message (1-5, weighted low)
-            emoji_count = self._random.choices(
-                [1, 2, 3, 4, 5],
-                weights=[0.5, 0.25, 0.15, 0.07, 0.03],
-                k=1
-            )[0]
+            emoji_count = choices(emoji_counts, cum_weights=emoji_cum_weights, k=1)[0]
 
             # Sample emoji (without replacement)
-            selected_emojis = self._random.sample(
-                COMMON_EMOJIS,
-                min(emoji_count, len(COMMON_EMOJIS))
-            )
+            selected_emojis = sample(emoji_names, min(emoji_count, max_emojis))
 
-            for emoji_name, _ in selected_emojis:
+            reactions = []
+            for emoji_name in selected_emojis:
                 # Exponential distribution for reactor count
-                reactor_count = max(1, int(self._random.expovariate(0.3)))
-                reactor_count = min(reactor_count, len(users))
+                reactor_count = max(1, int(expovariate(0.3)))
+                reactor_count = min(reactor_count, max_reactors)
 
                 # Sample reactors (can include message author - self-react is common)
-                reactors = self._random.sample(users, reactor_count)
+                reactors = sample(users, reactor_count)
 
                 emoji = MockEmoji(id=None, name=emoji_name)
                 reaction = MockReaction(
                     message=msg,
                     emoji=emoji,
-                    count=len(reactors),
+                    count=reactor_count,
                     _users=reactors,
                 )
-                msg.reactions.append(reaction)
+                reactions.append(reaction)
+            msg.reactions = reactions
 
     def generate_messages(
         self,
@@ -288,15 +350,28 @@ class DiscordDataGenerator:
         - Activity-weighted author selection
         - 35% reply probability
         - 15% mention probability
-        - Peak hour time bias
+        - Peak hour time bias (70% drawn from 10:00-22:59 windows)
         - Reactions added after all messages generated
+
+        The RNG methods, the mention-count weights and the peak windows
+        are resolved once before the loop.
         """
         messages: List[MockMessage] = []
         recent_messages: List[MockMessage] = []
+        pick_author = self._build_author_sampler(users)
+        rand = self._random.random
+        choice = self._random.choice
+        choices = self._random.choices
+        sample = self._random.sample
+        mention_counts = [1, 2, 3]
+        mention_cum_weights = list(accumulate([0.7, 0.2, 0.1]))
+        max_mentions = len(users)
+        guild_id = channel.guild.id if channel.guild else None
+        peak_windows = self._peak_windows(start_date, end_date)
 
         for _ in range(count):
-            author = self._pick_author_by_activity(users)
-            created_at = self._random_timestamp(start_date, end_date)
+            author = pick_author()
+            created_at = self._random_timestamp(start_date, end_date, peak_windows)
 
             msg = MockMessage(
                 id=self._next_snowflake(created_at),
@@ -304,33 +379,28 @@ class DiscordDataGenerator:
                 author=author,
                 content=self._generate_message_content(),
                 created_at=created_at,
-                mentions=[],
-                reactions=[],
             )
 
             # Maybe make it a reply (35% chance)
-            if recent_messages and self._random.random() < REPLY_PROBABILITY:
+            if recent_messages and rand() < REPLY_PROBABILITY:
                 # Reply to one of the last 20 messages
-                reply_target = self._random.choice(recent_messages[-20:])
+                reply_target = choice(recent_messages[-20:])
                 msg.reference = MockMessageReference(
                     message_id=reply_target.id,
                     channel_id=channel.id,
-                    guild_id=channel.guild.id if channel.guild else None,
+                    guild_id=guild_id,
                 )
                 msg.type = 19  # MessageType.reply
                 msg._reply_to_author_id = reply_target.author.id
 
             # Maybe add mentions (15% chance)
-            if self._random.random() < MENTION_PROBABILITY:
-                mention_count = self._random.choices(
-                    [1, 2, 3],
-                    weights=[0.7, 0.2, 0.1],
+            if rand() < MENTION_PROBABILITY:
+                mention_count = choices(
+                    mention_counts,
+                    cum_weights=mention_cum_weights,
                     k=1
                 )[0]
-                msg.mentions = self._random.sample(
-                    users,
-                    min(mention_count, len(users))
-                )
+                msg.mentions = sample(users, min(mention_count, max_mentions))
 
             messages.append(msg)
             recent_messages.append(msg)
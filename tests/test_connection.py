@@ -0,0 +1,100 @@
+"""
+Tests for database connection management.
+"""
+import gc
+import weakref
+
+from sqlalchemy import create_engine, text
+
+from src.db import connection
+from src.db.connection import get_engine, get_session, init_database
+
+
+class TestGetEngine:
+    """Tests for engine creation."""
+
+    def test_sqlite_connections_are_tuned(self, tmp_path, monkeypatch):
+        """SQLite connections should get the analytics PRAGMAs."""
+        monkeypatch.setattr(connection, "TEST_DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+        engine = get_engine(test=True)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+            assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+
+        engine.dispose()
+
+    def test_statement_batching_and_cache_sizes(self, tmp_path, monkeypatch):
+        """Bulk INSERT pages and the compiled cache should use the configured sizes."""
+        monkeypatch.setattr(connection, "TEST_DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+        engine = get_engine(test=True)
+
+        assert engine.dialect.insertmanyvalues_page_size == connection.INSERT_PAGE_SIZE
+        assert engine._compiled_cache.capacity == connection.QUERY_CACHE_SIZE
+
+        engine.dispose()
+
+    def test_pool_is_sized_for_concurrent_sync(self, tmp_path, monkeypatch):
+        """The pool should hold a connection per concurrently synced channel."""
+        monkeypatch.setattr(connection, "TEST_DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+        engine = get_engine(test=True)
+
+        assert engine.pool.size() == connection.POOL_SIZE
+        assert engine.pool._max_overflow == connection.POOL_MAX_OVERFLOW
+        assert engine.pool._recycle == connection.POOL_RECYCLE
+
+        engine.dispose()
+
+    def test_in_memory_sqlite_url(self, monkeypatch):
+        """In-memory SQLite should skip the QueuePool sizing options."""
+        monkeypatch.setattr(connection, "TEST_DATABASE_URL", "sqlite:///:memory:")
+        engine = get_engine(test=True)
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+
+        engine.dispose()
+
+
+class TestGetSession:
+    """Tests for session handling."""
+
+    def test_sessions_do_not_keep_engine_alive(self):
+        """An engine used for sessions should still be garbage-collected."""
+        engine = create_engine("sqlite:///:memory:")
+        with get_session(engine) as session:
+            assert session.execute(text("SELECT 1")).scalar() == 1
+        ref = weakref.ref(engine)
+
+        del engine, session
+        gc.collect()
+
+        assert ref() is None
+
+
+class TestInitDatabase:
+    """Tests for schema initialisation."""
+
+    def test_runs_statements_containing_semicolons(self, tmp_path):
+        """Trigger bodies must not be split apart on their inner ';'."""
+        schema = tmp_path / "schema.sql"
+        schema.write_text(
+            "CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT);\n"
+            "CREATE TABLE IF NOT EXISTS audit (item_id INTEGER);\n"
+            "CREATE TRIGGER IF NOT EXISTS items_audit AFTER INSERT ON items\n"
+            "BEGIN\n"
+            "    INSERT INTO audit (item_id) VALUES (NEW.id);\n"
+            "END;\n"
+        )
+        engine = create_engine(f"sqlite:///{tmp_path / 'init.db'}")
+
+        init_database(engine, str(schema))
+        init_database(engine, str(schema))  # idempotent
+
+        with engine.connect() as conn:
+            conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a')"))
+            assert conn.execute(text("SELECT item_id FROM audit")).scalar() == 1
+
+        engine.dispose()
@@ -5,7 +5,7 @@ Validates that extraction works identically with mock data
 as it would with real Discord data.
 """
 import pytest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from sqlalchemy import text
 
 from src.extractor import DiscordExtractor, run_extraction
@@ -144,6 +144,164 @@ class TestDiscordExtractor:
             result = conn.execute(text("SELECT COUNT(*) FROM emojis"))
             assert result.scalar() > 0
 
+    @pytest.mark.asyncio
+    async def test_sync_upserts_each_emoji_once(self, clean_db, mock_guild, monkeypatch):
+        """Repeated emojis should be served from the extractor's cache."""
+        import src.extractor as extractor_module
+
+        calls = []
+        real_upsert_emoji = extractor_module.upsert_emoji
+
+        def counting_upsert_emoji(session, **kwargs):
+            calls.append((kwargs["name"], kwargs["server_id"]))
+            return real_upsert_emoji(session, **kwargs)
+
+        monkeypatch.setattr(extractor_module, "upsert_emoji", counting_upsert_emoji)
+
+        client = MockDiscordClient(guilds=[mock_guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(
+            client=client,
+            engine=clean_db,
+            sync_days=7,
+            fetch_reactions=True,
+        )
+
+        stats = await extractor.sync_server(mock_guild.id)
+
+        assert stats["reactions"] > len(calls)
+        assert len(calls) == len(set(calls))
+
+    def test_failed_flush_does_not_cache_emoji_ids(self, clean_db, mock_guild, monkeypatch):
+        """Emoji ids from a rolled-back flush must not be reused later."""
+        import src.extractor as extractor_module
+        from src.db.connection import get_session
+        from src.extractor import PendingWrites
+
+        def failing_bulk_insert_reactions(session, reactions):
+            raise RuntimeError("reaction insert failed")
+
+        monkeypatch.setattr(extractor_module, "bulk_insert_reactions", failing_bulk_insert_reactions)
+
+        extractor = DiscordExtractor(client=MockDiscordClient(guilds=[mock_guild]), engine=clean_db)
+        pending = PendingWrites()
+        pending.emojis[("👍", None)] = {"name": "👍"}
+
+        with pytest.raises(RuntimeError):
+            with get_session(clean_db) as session:
+                extractor._flush(session, pending)
+
+        assert extractor._seen_emoji_keys == {}
+
+    @pytest.mark.asyncio
+    async def test_resync_skips_unchanged_members(self, clean_db, mock_guild, monkeypatch):
+        """A second sync should not rewrite memberships that did not change."""
+        import src.extractor as extractor_module
+
+        written = []
+        real_bulk_upsert_members = extractor_module.bulk_upsert_members
+
+        def recording_bulk_upsert_members(session, members):
+            written.append(len(members))
+            return real_bulk_upsert_members(session, members)
+
+        monkeypatch.setattr(extractor_module, "bulk_upsert_members", recording_bulk_upsert_members)
+
+        client = MockDiscordClient(guilds=[mock_guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(client=client, engine=clean_db, sync_days=7)
+
+        await extractor.sync_server(mock_guild.id)
+        await extractor.sync_server(mock_guild.id)
+
+        assert written[0] > 0
+        assert written[1] == 0
+
+    @pytest.mark.asyncio
+    async def test_resync_skips_members_with_aware_join_dates(self, clean_db, mock_guild, monkeypatch):
+        """UTC-aware join dates, as discord.py returns them, should match the stored ones."""
+        import src.extractor as extractor_module
+
+        for member in mock_guild._members:
+            if member.joined_at is not None:
+                member.joined_at = member.joined_at.replace(tzinfo=timezone.utc)
+
+        written = []
+        real_bulk_upsert_members = extractor_module.bulk_upsert_members
+
+        def recording_bulk_upsert_members(session, members):
+            written.append(len(members))
+            return real_bulk_upsert_members(session, members)
+
+        monkeypatch.setattr(extractor_module, "bulk_upsert_members", recording_bulk_upsert_members)
+
+        client = MockDiscordClient(guilds=[mock_guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(client=client, engine=clean_db, sync_days=7)
+
+        await extractor.sync_server(mock_guild.id)
+        await extractor.sync_server(mock_guild.id)
+
+        assert written[0] > 0
+        assert written[1] == 0
+
+    @pytest.mark.asyncio
+    async def test_sync_upgrades_older_sqlite_database(self, tmp_path, small_mock_guild):
+        """Syncing into a database without the derived columns should add them."""
+        from sqlalchemy import create_engine
+        from src.db.queries import MESSAGE_DERIVED_COLUMNS
+        from tests.conftest import get_sqlite_schema
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        raw = engine.raw_connection()
+        try:
+            raw.driver_connection.executescript(get_sqlite_schema())
+            raw.driver_connection.executescript(
+                "DROP INDEX IF EXISTS idx_messages_author_hour;"
+                "DROP TABLE user_year_stats; DROP TABLE channel_year_stats; DROP TABLE pair_year_stats;"
+                + "".join(f"ALTER TABLE messages DROP COLUMN {c};" for c in MESSAGE_DERIVED_COLUMNS)
+            )
+        finally:
+            raw.close()
+
+        client = MockDiscordClient(guilds=[small_mock_guild])
+        client._is_ready = True
+        extractor = DiscordExtractor(client=client, engine=engine, sync_days=7)
+
+        await extractor.sync_server(small_mock_guild.id)
+
+        with engine.connect() as conn:
+            assert conn.execute(text(
+                "SELECT COUNT(*) FROM messages WHERE created_hour IS NULL"
+            )).scalar() == 0
+            assert conn.execute(text("SELECT COUNT(*) FROM user_year_stats")).scalar() > 0
+        engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_sync_with_limited_channel_concurrency(self, clean_db, mock_guild):
+        """Channels synced a couple at a time should all be stored."""
+        client = MockDiscordClient(guilds=[mock_guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(
+            client=client,
+            engine=clean_db,
+            sync_days=7,
+            fetch_reactions=True,
+            channel_concurrency=2,
+        )
+
+        stats = await extractor.sync_server(mock_guild.id)
+
+        assert stats["channels"] == len(mock_guild.text_channels)
+        with clean_db.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM channels")).scalar() == stats["channels"]
+            assert conn.execute(text("SELECT COUNT(*) FROM messages")).scalar() == stats["messages"]
+            assert conn.execute(text("SELECT COUNT(*) FROM reactions")).scalar() == stats["reactions"]
+
     @pytest.mark.asyncio
     async def test_sync_respects_date_filter(self, clean_db, generator):
         """Only messages within sync_days should be extracted."""
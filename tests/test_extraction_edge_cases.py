@@ -281,7 +281,6 @@ class TestReplyChains:
             created_at=datetime.utcnow(),
             type=19,
             reference=MockMessageReference(message_id=1, channel_id=1, guild_id=1),
-            _reply_to_author_id=user.id,
         )
 
         channel._messages.extend([original, reply])
@@ -661,6 +660,62 @@ class TestMultipleChannels:
             assert result.scalar() == 5
 
 
+class TestHistoryReading:
+    """Tests for reading channel history ahead of the writer."""
+
+    @pytest.mark.asyncio
+    async def test_history_split_across_batches(self, clean_db, monkeypatch):
+        """Every message should be stored when history spans several batches."""
+        monkeypatch.setattr(DiscordExtractor, "HISTORY_BATCH_SIZE", 2)
+
+        guild = MockGuild(id=1, name="Test", owner_id=1)
+        channel = MockChannel(id=1, name="channel", guild=guild)
+        user = MockMember(id=1, name="user", guild=guild)
+        guild._channels.append(channel)
+        guild._members.append(user)
+
+        for i in range(5):
+            channel._messages.append(MockMessage(
+                id=100 + i,
+                channel=channel,
+                author=user,
+                content=f"msg {i}",
+                created_at=datetime.utcnow(),
+            ))
+
+        client = MockDiscordClient(guilds=[guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(client=client, engine=clean_db, sync_days=7)
+        stats = await extractor.sync_server(guild.id)
+
+        assert stats["messages"] == 5
+        with clean_db.connect() as conn:
+            result = conn.execute(text("SELECT COUNT(*) FROM messages"))
+            assert result.scalar() == 5
+
+    @pytest.mark.asyncio
+    async def test_history_error_is_raised(self, clean_db, monkeypatch):
+        """A failure while paging history should surface, not hang the sync."""
+        guild = MockGuild(id=1, name="Test", owner_id=1)
+        channel = MockChannel(id=1, name="channel", guild=guild)
+        guild._channels.append(channel)
+
+        async def failing_history(self, limit=None, after=None):
+            raise RuntimeError("history unavailable")
+            yield  # pragma: no cover - makes this an async generator
+
+        # Mock objects use __slots__, so patch the class rather than the instance
+        monkeypatch.setattr(MockChannel, "history", failing_history)
+
+        client = MockDiscordClient(guilds=[guild])
+        client._is_ready = True
+
+        extractor = DiscordExtractor(client=client, engine=clean_db, sync_days=7)
+        with pytest.raises(RuntimeError, match="history unavailable"):
+            await extractor.sync_server(guild.id)
+
+
 class TestDateFiltering:
     """Tests for date-based filtering edge cases."""
 
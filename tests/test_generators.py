@@ -12,6 +12,7 @@ from tests.mocks import (
     MockGuild,
     MockChannel,
     create_test_server,
+    snowflake_to_datetime,
 )
 from tests.mocks.generators import (
     ACTIVITY_PATTERNS,
@@ -94,6 +95,15 @@ class TestSnowflakeGeneration:
         # Should be within 1 second
         assert abs((extracted - known_time).total_seconds()) < 1
 
+    def test_snowflake_keeps_milliseconds(self):
+        """Naive and UTC-aware timestamps should encode the same milliseconds."""
+        gen = DiscordDataGenerator(seed=42)
+        naive = datetime(2024, 1, 15, 12, 0, 0, 123456)
+        aware = naive.replace(tzinfo=timezone.utc)
+
+        assert snowflake_to_datetime(gen._next_snowflake(naive)) == naive.replace(microsecond=123000)
+        assert gen._next_snowflake(aware) >> 22 == gen._next_snowflake(naive) >> 22
+
 
 class TestUserGeneration:
     """Tests for user generation edge cases."""
@@ -230,6 +240,19 @@ class TestMessageGeneration:
             assert msg.created_at >= start - timedelta(seconds=1)
             assert msg.created_at <= end + timedelta(seconds=1)
 
+    def test_peak_hours_favored(self):
+        """Most timestamps should fall in peak hours, none past the end."""
+        gen = DiscordDataGenerator(seed=42)
+        start = datetime(2024, 1, 1, 15, 30)
+        end = datetime(2024, 1, 8, 3, 0)
+        windows = gen._peak_windows(start, end)
+
+        timestamps = [gen._random_timestamp(start, end, windows) for _ in range(2000)]
+
+        assert all(start <= ts <= end for ts in timestamps)
+        peak = sum(1 for ts in timestamps if 10 <= ts.hour <= 22)
+        assert 0.80 < peak / len(timestamps) < 0.92
+
     def test_reply_probability_approximate(self):
         """About 35% of messages should be replies."""
         gen = DiscordDataGenerator(seed=42)
@@ -88,6 +88,14 @@ class TestMockUser:
 class TestMockMember:
     """Tests for MockMember edge cases."""
 
+    def test_member_equality_and_hash_by_id(self):
+        """Members should compare and hash by ID like users."""
+        member1 = MockMember(id=123, name="member", nick="one")
+        member2 = MockMember(id=123, name="member", nick="two")
+
+        assert member1 == member2
+        assert len({member1, member2}) == 1
+
     def test_member_inherits_user_properties(self):
         """Member should inherit all User properties."""
         member = MockMember(
@@ -372,6 +380,37 @@ class TestMockChannel:
         oldest_first = [m async for m in channel.history(limit=None, oldest_first=True)]
         assert oldest_first[0].created_at < oldest_first[-1].created_at
 
+    @pytest.mark.asyncio
+    async def test_history_range_after_out_of_order_appends(self):
+        """Range queries should see messages appended out of order after a query."""
+        guild = MockGuild(id=1, name="Guild", owner_id=1)
+        channel = MockChannel(id=1, name="channel", guild=guild)
+        user = MockUser(id=1, name="user")
+
+        now = datetime.now(timezone.utc)
+        for i in (3, 1, 4):
+            channel._messages.append(MockMessage(
+                id=i, channel=channel, author=user, content=f"Message {i}",
+                created_at=now - timedelta(hours=10 - i),
+            ))
+        assert [m.id async for m in channel.history(limit=None)] == [4, 3, 1]
+
+        for i in (0, 2, 5):
+            channel._messages.append(MockMessage(
+                id=i, channel=channel, author=user, content=f"Message {i}",
+                created_at=now - timedelta(hours=10 - i),
+            ))
+
+        after = now - timedelta(hours=9)   # message 1
+        before = now - timedelta(hours=5)  # message 5
+        newest = [m.id async for m in channel.history(after=after, before=before, limit=None)]
+        oldest = [m.id async for m in channel.history(
+            after=after, before=before, limit=2, oldest_first=True
+        )]
+
+        assert newest == [4, 3, 2]
+        assert oldest == [2, 3]
+
 
 class TestMockReaction:
     """Tests for MockReaction edge cases."""
@@ -492,6 +531,19 @@ class TestMockGuild:
         not_found = guild.get_member(999)
         assert not_found is None
 
+    def test_get_member_after_appending(self):
+        """Members appended after a lookup should still be found."""
+        guild = MockGuild(id=1, name="Guild", owner_id=1)
+        guild._members.append(MockMember(id=123, name="first", guild=guild))
+        assert guild.get_member(456) is None
+
+        guild._members.append(MockMember(id=456, name="late", guild=guild))
+        assert guild.get_member(456).name == "late"
+
+        guild._members = [MockMember(id=789, name="replaced", guild=guild)]
+        assert guild.get_member(123) is None
+        assert guild.get_member(789).name == "replaced"
+
     def test_get_channel(self):
         """Get channel by ID."""
         guild = MockGuild(id=1, name="Guild", owner_id=1)
@@ -605,3 +657,10 @@ class TestSnowflakeConversion:
         newer_dt = snowflake_to_datetime(newer_snowflake)
 
         assert newer_dt > older_dt
+
+    def test_created_at_is_computed_once(self):
+        """Objects should keep the datetime derived from their snowflake."""
+        user = MockUser(id=(150000000 << 22) | 7, name="user")
+
+        assert user.created_at is user.created_at
+        assert user.created_at == snowflake_to_datetime(user.id)
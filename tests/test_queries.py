@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from src.db.models import Server, User, Channel, Message
 from src.db.queries import (
     upsert_server,
     upsert_user,
@@ -17,6 +18,14 @@ from src.db.queries import (
     insert_mention,
     upsert_emoji,
     insert_reaction,
+    bulk_upsert_users,
+    bulk_insert_messages,
+    copy_messages,
+    channel_has_messages,
+    _copy_field,
+    backfill_message_columns,
+    backfill_reply_authors,
+    refresh_year_stats,
 )
 
 
@@ -25,7 +34,7 @@ class TestUpsertServer:
 
     def test_insert_new_server(self, db_session):
         """Should insert a new server."""
-        server = upsert_server(
+        server_id = upsert_server(
             db_session,
             server_id=123456789,
             name="Test Server",
@@ -33,8 +42,9 @@ class TestUpsertServer:
             member_count=100,
         )
         db_session.commit()
+        server = db_session.get(Server, server_id)
 
-        assert server is not None
+        assert server_id == 123456789
         assert server.id == 123456789
         assert server.name == "Test Server"
         assert server.owner_id == 111
@@ -52,49 +62,53 @@ class TestUpsertServer:
         db_session.commit()
 
         # Update
-        server = upsert_server(
+        server_id = upsert_server(
             db_session,
             server_id=100,
             name="Updated Name",
             member_count=100,
         )
         db_session.commit()
+        server = db_session.get(Server, server_id)
 
         assert server.name == "Updated Name"
         assert server.member_count == 100
 
     def test_server_with_null_owner(self, db_session):
         """Server can have null owner."""
-        server = upsert_server(
+        server_id = upsert_server(
             db_session,
             server_id=200,
             name="Orphan Server",
             owner_id=None,
         )
         db_session.commit()
+        server = db_session.get(Server, server_id)
 
         assert server.owner_id is None
 
     def test_server_with_unicode_name(self, db_session):
         """Server can have unicode name."""
-        server = upsert_server(
+        server_id = upsert_server(
             db_session,
             server_id=300,
             name="日本語サーバー 🎮",
         )
         db_session.commit()
+        server = db_session.get(Server, server_id)
 
         assert server.name == "日本語サーバー 🎮"
 
     def test_server_with_very_long_name(self, db_session):
         """Server with maximum length name."""
         long_name = "A" * 100
-        server = upsert_server(
+        server_id = upsert_server(
             db_session,
             server_id=400,
             name=long_name,
         )
         db_session.commit()
+        server = db_session.get(Server, server_id)
 
         assert server.name == long_name
 
@@ -104,7 +118,7 @@ class TestUpsertUser:
 
     def test_insert_new_user(self, db_session):
         """Should insert a new user."""
-        user = upsert_user(
+        user_id = upsert_user(
             db_session,
             user_id=111222333,
             username="testuser",
@@ -112,6 +126,7 @@ class TestUpsertUser:
             global_name="Test User",
         )
         db_session.commit()
+        user = db_session.get(User, user_id)
 
         assert user.id == 111222333
         assert user.username == "testuser"
@@ -126,37 +141,40 @@ class TestUpsertUser:
         )
         db_session.commit()
 
-        user = upsert_user(
+        user_id = upsert_user(
             db_session,
             user_id=500,
             username="new_name",
             global_name="New Display",
         )
         db_session.commit()
+        user = db_session.get(User, user_id)
 
         assert user.username == "new_name"
         assert user.global_name == "New Display"
 
     def test_bot_user(self, db_session):
         """Bot flag should be stored correctly."""
-        user = upsert_user(
+        user_id = upsert_user(
             db_session,
             user_id=600,
             username="BotUser",
             is_bot=True,
         )
         db_session.commit()
+        user = db_session.get(User, user_id)
 
         assert user.is_bot is True
 
     def test_user_with_special_characters(self, db_session):
         """Username with special characters."""
-        user = upsert_user(
+        user_id = upsert_user(
             db_session,
             user_id=700,
             username="user'with\"special<chars>",
         )
         db_session.commit()
+        user = db_session.get(User, user_id)
 
         assert user.username == "user'with\"special<chars>"
 
@@ -170,7 +188,7 @@ class TestUpsertChannel:
         upsert_server(db_session, server_id=1, name="Server")
         db_session.commit()
 
-        channel = upsert_channel(
+        channel_id = upsert_channel(
             db_session,
             channel_id=1001,
             server_id=1,
@@ -179,6 +197,7 @@ class TestUpsertChannel:
             topic="Welcome to general!",
         )
         db_session.commit()
+        channel = db_session.get(Channel, channel_id)
 
         assert channel.id == 1001
         assert channel.name == "general"
@@ -197,7 +216,7 @@ class TestUpsertChannel:
         )
         db_session.commit()
 
-        channel = upsert_channel(
+        channel_id = upsert_channel(
             db_session,
             channel_id=2001,
             server_id=2,
@@ -206,13 +225,14 @@ class TestUpsertChannel:
             topic="New topic",
         )
         db_session.commit()
+        channel = db_session.get(Channel, channel_id)
 
         assert channel.topic == "New topic"
 
     def test_nsfw_channel(self, db_session):
         """NSFW flag should be stored."""
         upsert_server(db_session, server_id=3, name="Server")
-        channel = upsert_channel(
+        channel_id = upsert_channel(
             db_session,
             channel_id=3001,
             server_id=3,
@@ -221,6 +241,7 @@ class TestUpsertChannel:
             is_nsfw=True,
         )
         db_session.commit()
+        channel = db_session.get(Channel, channel_id)
 
         assert channel.is_nsfw is True
 
@@ -236,7 +257,7 @@ class TestInsertMessage:
         upsert_channel(db_session, channel_id=30, server_id=10, name="ch", channel_type=0)
         db_session.commit()
 
-        msg = insert_message(
+        msg_id = insert_message(
             db_session,
             message_id=1000,
             server_id=10,
@@ -246,12 +267,59 @@ class TestInsertMessage:
             created_at=datetime.utcnow(),
         )
         db_session.commit()
+        msg = db_session.get(Message, msg_id)
 
         assert msg.id == 1000
         assert msg.content == "Hello world!"
         assert msg.word_count == 2
         assert msg.char_count == 12
 
+    def test_insert_message_stores_created_hour(self, db_session):
+        """Should store the hour of day the message was sent."""
+        upsert_server(db_session, server_id=19, name="Server")
+        upsert_user(db_session, user_id=29, username="author")
+        upsert_channel(db_session, channel_id=39, server_id=19, name="ch", channel_type=0)
+        db_session.commit()
+
+        msg_id = insert_message(
+            db_session,
+            message_id=1009,
+            server_id=19,
+            channel_id=39,
+            author_id=29,
+            content="up late",
+            created_at=datetime(2024, 3, 1, 2, 30),
+        )
+        db_session.commit()
+        msg = db_session.get(Message, msg_id)
+
+        assert msg.created_hour == 2
+
+    def test_insert_message_stores_laugh_and_link_counts(self, db_session):
+        """Should count laughs case-insensitively and links per message."""
+        upsert_server(db_session, server_id=18, name="Server")
+        upsert_user(db_session, user_id=28, username="author")
+        upsert_channel(db_session, channel_id=38, server_id=18, name="ch", channel_type=0)
+        db_session.commit()
+
+        msg_id = insert_message(
+            db_session,
+            message_id=1008,
+            server_id=18,
+            channel_id=38,
+            author_id=28,
+            content="LOL lol hahaha see https://a.example and http://b.example",
+            created_at=datetime.utcnow(),
+        )
+        db_session.commit()
+        msg = db_session.get(Message, msg_id)
+
+        assert msg.lol_count == 2
+        assert msg.lmao_count == 0
+        assert msg.haha_count == 1
+        assert msg.hehe_count == 0
+        assert msg.link_count == 2
+
     def test_message_with_empty_content(self, db_session):
         """Message can have empty content."""
         upsert_server(db_session, server_id=11, name="Server")
@@ -259,7 +327,7 @@ class TestInsertMessage:
         upsert_channel(db_session, channel_id=31, server_id=11, name="ch", channel_type=0)
         db_session.commit()
 
-        msg = insert_message(
+        msg_id = insert_message(
             db_session,
             message_id=1001,
             server_id=11,
@@ -269,6 +337,7 @@ class TestInsertMessage:
             created_at=datetime.utcnow(),
         )
         db_session.commit()
+        msg = db_session.get(Message, msg_id)
 
         assert msg.content == ""
         assert msg.word_count == 0
@@ -294,7 +363,7 @@ class TestInsertMessage:
         db_session.commit()
 
         # Try to insert duplicate (should be ignored)
-        msg = insert_message(
+        msg_id = insert_message(
             db_session,
             message_id=1002,
             server_id=12,
@@ -304,6 +373,7 @@ class TestInsertMessage:
             created_at=datetime.utcnow(),
         )
         db_session.commit()
+        msg = db_session.get(Message, msg_id)
 
         # Should still have first content
         assert msg.content == "First"
@@ -327,7 +397,7 @@ class TestInsertMessage:
         )
 
         # Reply
-        reply = insert_message(
+        reply_id = insert_message(
             db_session,
             message_id=1004,
             server_id=13,
@@ -340,6 +410,7 @@ class TestInsertMessage:
             reply_to_author_id=23,
         )
         db_session.commit()
+        reply = db_session.get(Message, reply_id)
 
         assert reply.reply_to_message_id == 1003
         assert reply.reply_to_author_id == 23
@@ -352,7 +423,7 @@ class TestInsertMessage:
         db_session.commit()
 
         content = "Hello 👋 World 🌍 日本語"
-        msg = insert_message(
+        msg_id = insert_message(
             db_session,
             message_id=1005,
             server_id=14,
@@ -362,6 +433,7 @@ class TestInsertMessage:
             created_at=datetime.utcnow(),
         )
         db_session.commit()
+        msg = db_session.get(Message, msg_id)
 
         assert msg.content == content
 
@@ -439,6 +511,21 @@ class TestUpsertEmoji:
         db_session.commit()
 
         assert id1 == id2
+        result = db_session.execute(text("SELECT COUNT(*) FROM emojis WHERE name = '❤️'"))
+        assert result.scalar() == 1
+
+    def test_same_custom_emoji_returns_same_id(self, db_session):
+        """Same custom emoji on the same server should return same ID."""
+        upsert_server(db_session, server_id=71, name="Server")
+        db_session.commit()
+
+        id1 = upsert_emoji(db_session, name="party", discord_id=1, is_custom=True, server_id=71)
+        id2 = upsert_emoji(db_session, name="party", discord_id=1, is_custom=True, server_id=71)
+        id3 = upsert_emoji(db_session, name="party", is_custom=False)
+        db_session.commit()
+
+        assert id1 == id2
+        assert id3 != id1
 
     def test_different_emojis_different_ids(self, db_session):
         """Different emojis should have different IDs."""
@@ -595,3 +682,263 @@ class TestServerMember:
             text("SELECT nickname FROM server_members WHERE server_id = 130 AND user_id = 131")
         )
         assert result.scalar() is None
+
+
+class TestBulkWrites:
+    """Tests for the multi-row write helpers."""
+
+    def test_bulk_upsert_users_keeps_last_copy(self, db_session):
+        """Duplicate ids in one batch should collapse to the last row."""
+        bulk_upsert_users(db_session, [
+            {"user_id": 151, "username": "old"},
+            {"user_id": 152, "username": "other"},
+            {"user_id": 151, "username": "new"},
+        ])
+        db_session.commit()
+
+        result = db_session.execute(
+            text("SELECT username FROM users WHERE id IN (151, 152) ORDER BY id")
+        )
+        assert [r[0] for r in result] == ["new", "other"]
+
+    def test_bulk_insert_messages_skips_existing(self, db_session):
+        """Should insert new messages with derived columns and skip known ids."""
+        upsert_server(db_session, server_id=150, name="Server")
+        upsert_user(db_session, user_id=153, username="author")
+        upsert_channel(db_session, channel_id=154, server_id=150, name="ch", channel_type=0)
+        db_session.commit()
+
+        message = {
+            "message_id": 1500,
+            "server_id": 150,
+            "channel_id": 154,
+            "author_id": 153,
+            "content": "lol see https://example.com",
+            "created_at": datetime(2024, 5, 1, 9, 30),
+        }
+        bulk_insert_messages(db_session, [message])
+        bulk_insert_messages(db_session, [
+            dict(message, content="changed"),
+            dict(message, message_id=1501, content="second"),
+        ])
+        db_session.commit()
+
+        rows = db_session.execute(text(
+            "SELECT id, content, created_hour, lol_count, link_count "
+            "FROM messages WHERE id IN (1500, 1501) ORDER BY id"
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            (1500, "lol see https://example.com", 9, 1, 1),
+            (1501, "second", 9, 0, 0),
+        ]
+
+    def test_copy_messages_falls_back_outside_postgres(self, db_session):
+        """On SQLite, copy_messages should insert like bulk_insert_messages."""
+        upsert_server(db_session, server_id=155, name="Server")
+        upsert_user(db_session, user_id=156, username="author")
+        upsert_channel(db_session, channel_id=157, server_id=155, name="ch", channel_type=0)
+        db_session.commit()
+        assert not channel_has_messages(db_session, 157)
+
+        copy_messages(db_session, [{
+            "message_id": 1550,
+            "server_id": 155,
+            "channel_id": 157,
+            "author_id": 156,
+            "content": "hello",
+            "created_at": datetime(2024, 5, 1, 9, 30),
+        }])
+        db_session.commit()
+
+        assert channel_has_messages(db_session, 157)
+
+    def test_copy_field_escapes_text_format(self):
+        """COPY text fields should escape separators and mark NULLs."""
+        assert _copy_field(None) == "\\N"
+        assert _copy_field(True) == "t"
+        assert _copy_field(12) == "12"
+        assert _copy_field("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+    def test_writes_bypass_identity_map(self, db_session):
+        """Write helpers should not load ORM objects into the session."""
+        upsert_server(db_session, server_id=158, name="Server")
+        upsert_user(db_session, user_id=159, username="author")
+        upsert_channel(db_session, channel_id=160, server_id=158, name="ch", channel_type=0)
+        upsert_emoji(db_session, name="wave", discord_id=1, is_custom=True, server_id=158)
+        upsert_emoji(db_session, name="🌊", is_custom=False)
+        db_session.commit()
+
+        assert len(db_session.identity_map) == 0
+
+
+class TestRefreshYearStats:
+    """Tests for the persisted year stats refresh."""
+
+    def _seed(self, db_session):
+        upsert_server(db_session, server_id=140, name="Server")
+        upsert_user(db_session, user_id=141, username="alice")
+        upsert_user(db_session, user_id=142, username="bob")
+        upsert_user(db_session, user_id=143, username="bot", is_bot=True)
+        upsert_channel(db_session, channel_id=144, server_id=140, name="ch", channel_type=0)
+        db_session.commit()
+
+        messages = [
+            (1400, 141, "anyone around?", datetime(2024, 3, 1, 2, 0), None),
+            (1401, 142, "yes", datetime(2024, 3, 1, 2, 5), 1400),
+            (1402, 141, "great, thanks", datetime(2024, 3, 1, 12, 0), 1401),
+            (1403, 141, "and again", datetime(2024, 3, 1, 12, 5), 1401),
+            (1404, 143, "beep", datetime(2024, 3, 1, 12, 10), 1403),
+            (1405, 142, "hi bot", datetime(2024, 3, 1, 12, 15), 1404),
+        ]
+        for message_id, author_id, content, created_at, reply_to in messages:
+            insert_message(
+                db_session,
+                message_id=message_id,
+                server_id=140,
+                channel_id=144,
+                author_id=author_id,
+                content=content,
+                created_at=created_at,
+                reply_to_message_id=reply_to,
+            )
+        db_session.commit()
+
+    def test_totals_match_generated_messages(self, populated_db, mock_guild):
+        """Per-user totals should add up to the generated human messages."""
+        refresh_year_stats(populated_db)
+
+        human_messages = sum(
+            1 for ch in mock_guild._channels for m in ch._messages if not m.author.bot
+        )
+        total = populated_db.execute(text("SELECT SUM(total_msgs) FROM user_year_stats")).scalar()
+        assert total == human_messages
+
+    def test_user_stats_exclude_bots(self, db_session):
+        """Should total each human's messages and skip bots."""
+        self._seed(db_session)
+        refresh_year_stats(db_session)
+        db_session.commit()
+
+        rows = db_session.execute(text(
+            "SELECT user_id, total_msgs, longest_msg, questions_asked, late_night "
+            "FROM user_year_stats WHERE user_id IN (141, 142, 143) ORDER BY user_id"
+        )).all()
+        assert [tuple(r) for r in rows] == [
+            (141, 3, 14, 1, 1),
+            (142, 2, 6, 0, 1),
+        ]
+
+    def test_pair_stats_count_human_replies_both_ways(self, db_session):
+        """Should count replies per unordered human pair, in each direction."""
+        self._seed(db_session)
+        refresh_year_stats(db_session)
+        db_session.commit()
+
+        rows = db_session.execute(text(
+            "SELECT user_lo, user_hi, lo_to_hi, hi_to_lo, total FROM pair_year_stats "
+            "WHERE user_lo IN (141, 142, 143)"
+        )).all()
+        assert [tuple(r) for r in rows] == [(141, 142, 2, 1, 3)]
+
+    def test_refresh_replaces_previous_snapshot(self, db_session):
+        """Refreshing twice should not double-count."""
+        self._seed(db_session)
+        refresh_year_stats(db_session)
+        refresh_year_stats(db_session)
+        db_session.commit()
+
+        result = db_session.execute(text("SELECT SUM(msgs) FROM channel_year_stats WHERE channel_id = 144"))
+        assert result.scalar() == 5
+
+    def test_server_refresh_leaves_other_servers(self, db_session):
+        """A per-server refresh should only rebuild that server's rows."""
+        self._seed(db_session)
+        upsert_server(db_session, server_id=150, name="Other")
+        upsert_channel(db_session, channel_id=154, server_id=150, name="ch", channel_type=0)
+        insert_message(
+            db_session, message_id=1500, server_id=150, channel_id=154,
+            author_id=141, content="elsewhere?", created_at=datetime(2024, 3, 2, 12, 0),
+        )
+        refresh_year_stats(db_session)
+        db_session.execute(text("DELETE FROM messages WHERE server_id = 140"))
+        refresh_year_stats(db_session, server_id=140)
+        db_session.commit()
+
+        rows = db_session.execute(text(
+            "SELECT server_id, total_msgs, questions_asked FROM user_year_stats WHERE user_id = 141"
+        )).all()
+        assert [tuple(r) for r in rows] == [(150, 1, 1)]
+
+
+class TestBackfillReplyAuthors:
+    """Tests for resolving reply authors after a sync."""
+
+    def test_fills_authors_of_stored_replies(self, db_session):
+        """Replies should take the author of the stored message they reference."""
+        upsert_server(db_session, server_id=170, name="Server")
+        upsert_user(db_session, user_id=171, username="asker")
+        upsert_user(db_session, user_id=172, username="answerer")
+        upsert_channel(db_session, channel_id=173, server_id=170, name="a", channel_type=0)
+        upsert_channel(db_session, channel_id=174, server_id=170, name="b", channel_type=0)
+        created_at = datetime(2024, 5, 1, 9, 30)
+        bulk_insert_messages(db_session, [
+            {"message_id": 1701, "server_id": 170, "channel_id": 174, "author_id": 172,
+             "content": "yes", "created_at": created_at, "reply_to_message_id": 1700},
+            {"message_id": 1700, "server_id": 170, "channel_id": 173, "author_id": 171,
+             "content": "question?", "created_at": created_at},
+            {"message_id": 1702, "server_id": 170, "channel_id": 173, "author_id": 171,
+             "content": "old", "created_at": created_at, "reply_to_message_id": 999},
+        ])
+        db_session.commit()
+
+        assert backfill_reply_authors(db_session, 170) == 1
+        db_session.commit()
+
+        rows = db_session.execute(text(
+            "SELECT id, reply_to_author_id FROM messages WHERE server_id = 170 ORDER BY id"
+        )).all()
+        assert [tuple(r) for r in rows] == [(1700, None), (1701, 171), (1702, None)]
+
+    def test_fills_generated_replies(self, populated_db, mock_guild):
+        """Every generated reply should get the author of its target."""
+        messages = {m.id: m for ch in mock_guild._channels for m in ch._messages}
+        expected = {
+            m.id: messages[m.reference.message_id].author.id
+            for m in messages.values() if m.reference
+        }
+
+        assert backfill_reply_authors(populated_db, mock_guild.id) == len(expected)
+
+        rows = populated_db.execute(text(
+            "SELECT id, reply_to_author_id FROM messages WHERE reply_to_author_id IS NOT NULL"
+        )).all()
+        assert dict(rows) == expected
+
+
+class TestBackfillMessageColumns:
+    """Tests for backfilling stored per-message columns."""
+
+    def test_adds_and_fills_missing_columns(self):
+        """Older message tables should gain the columns, filled from content."""
+        from sqlalchemy import create_engine
+
+        engine = create_engine("sqlite:///:memory:")
+        with engine.connect() as conn:
+            conn.execute(text(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT, "
+                "created_at TIMESTAMP NOT NULL, char_count INTEGER)"
+            ))
+            conn.execute(text(
+                "INSERT INTO messages (id, content, created_at) "
+                "VALUES (1, 'LOL see https://x.example', '2024-03-01 03:15:00')"
+            ))
+            conn.commit()
+
+            backfill_message_columns(conn)
+
+            row = conn.execute(text(
+                "SELECT created_hour, char_count, lol_count, link_count FROM messages"
+            )).one()
+        engine.dispose()
+
+        assert tuple(row) == (3, 25, 1, 1)
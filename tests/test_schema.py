@@ -182,9 +182,9 @@ class TestSchemaConstraints:
 class TestIndexes:
     """Test that indexes exist and are functional."""
 
-    def test_message_indexes_exist(self, clean_db):
+    def test_message_indexes_exist(self, db_engine_indexed):
         """Message indexes should exist for common queries."""
-        with clean_db.connect() as conn:
+        with db_engine_indexed.connect() as conn:
             # SQLite way to check indexes
             result = conn.execute(text(
                 "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='messages'"
@@ -195,9 +195,9 @@ class TestIndexes:
             assert any("channel" in idx.lower() for idx in indexes)
             assert any("author" in idx.lower() for idx in indexes)
 
-    def test_reaction_indexes_exist(self, clean_db):
+    def test_reaction_indexes_exist(self, db_engine_indexed):
         """Reaction indexes should exist."""
-        with clean_db.connect() as conn:
+        with db_engine_indexed.connect() as conn:
             result = conn.execute(text(
                 "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='reactions'"
             ))
@@ -205,3 +205,28 @@ class TestIndexes:
 
             assert any("user" in idx.lower() for idx in indexes)
             assert any("message" in idx.lower() for idx in indexes)
+
+    def test_reply_and_mention_indexes_exist(self, db_engine_indexed):
+        """Reply and mention lookups should be indexed."""
+        with db_engine_indexed.connect() as conn:
+            result = conn.execute(text("SELECT name FROM sqlite_master WHERE type='index'"))
+            indexes = {row[0] for row in result.fetchall()}
+
+            assert "idx_messages_reply_to" in indexes
+            assert "idx_mentions_user" in indexes
+
+    def test_models_declare_reply_and_mention_indexes(self):
+        """Tables created from the models should get the same indexes."""
+        from sqlalchemy import create_engine
+        from src.db.models import Base
+
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+
+        with engine.connect() as conn:
+            result = conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type='index'"))
+            indexes = dict(result.fetchall())
+
+        assert "WHERE reply_to_message_id IS NOT NULL" in indexes["idx_messages_reply_to"]
+        assert "(mentioned_user_id, message_id)" in indexes["idx_mentions_user"]
+        engine.dispose()